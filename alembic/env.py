@@ -0,0 +1,50 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database.session import Base, SQLALCHEMY_DATABASE_URL
+from app.database.bootstrap import create_app_engine, is_sqlite
+import app.models  # noqa: F401 - регистрация моделей в Base.metadata
+import app.models.transaction  # noqa: F401
+
+config = context.config
+# При запуске из приложения (init_db.upgrade_schema) логирование приложения не трогаем
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    # URL из alembic -x url=... или DATABASE_URL приложения
+    return context.get_x_argument(as_dictionary=True).get("url", SQLALCHEMY_DATABASE_URL)
+
+
+def run_migrations_offline():
+    url = database_url()
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=is_sqlite(url),
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    url = database_url()
+    connectable = create_app_engine(url)
+    with connectable.connect() as connection:
+        # SQLite не умеет ALTER для большинства изменений - batch режим пересоздает таблицу
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=is_sqlite(url))
+        with context.begin_transaction():
+            context.run_migrations()
+    connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,51 @@
+"""Составные индексы горячих запросов заказов, транзакций и фотоконтроля
+
+Таблицы создаются init_db.py, поэтому это первая ревизия; индексы создаются
+с IF NOT EXISTS - на новой БД их уже создал init_db из __table_args__ моделей.
+Таблицы, которых в БД нет (например, photo_verifications на старых установках),
+пропускаются: их индексы появятся вместе с таблицей из модели.
+
+Revision ID: 0001_hot_query_indexes
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_hot_query_indexes"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_orders_taxipark_status", "orders", ["taxipark_id", "status"]),
+    ("ix_orders_taxipark_created", "orders", ["taxipark_id", sa.text("created_at DESC")]),
+    ("ix_orders_driver_status_created", "orders", ["driver_id", "status", "created_at"]),
+    ("ix_transactions_driver_created", "transactions", ["driver_id", "created_at"]),
+    ("ix_photo_verifications_taxipark_status", "photo_verifications", ["taxipark_id", "status"]),
+    ("ix_photo_verifications_driver_created", "photo_verifications", ["driver_id", "created_at"]),
+)
+
+
+def _existing(tables):
+    inspector = sa.inspect(op.get_bind())
+    return {table for table in tables if inspector.has_table(table)}
+
+
+def upgrade():
+    existing = _existing({table for _, table, _ in INDEXES})
+    for name, table, columns in INDEXES:
+        if table not in existing:
+            continue
+        op.create_index(name, table, columns, if_not_exists=True)
+    # Обновить статистику планировщика под новые индексы
+    op.execute("ANALYZE")
+
+
+def downgrade():
+    existing = _existing({table for _, table, _ in INDEXES})
+    for name, table, _ in reversed(INDEXES):
+        if table not in existing:
+            continue
+        op.drop_index(name, table_name=table, if_exists=True)
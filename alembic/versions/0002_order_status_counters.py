@@ -0,0 +1,37 @@
+"""Счетчики заказов по (таксопарк, статус, день) с начальным заполнением из orders
+
+Revision ID: 0002_order_status_counters
+Revises: 0001_hot_query_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_order_status_counters"
+down_revision = "0001_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "order_status_counters",
+        sa.Column("taxipark_id", sa.Integer(), sa.ForeignKey("taxiparks.id"), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        if_not_exists=True,
+    )
+    op.execute("DELETE FROM order_status_counters")
+    op.execute("""
+        INSERT INTO order_status_counters (taxipark_id, status, day, count)
+        SELECT taxipark_id, COALESCE(status, 'received'), COALESCE(DATE(created_at), CURRENT_DATE), COUNT(id)
+        FROM orders
+        WHERE taxipark_id IS NOT NULL
+        GROUP BY taxipark_id, COALESCE(status, 'received'), COALESCE(DATE(created_at), CURRENT_DATE)
+    """)
+
+
+def downgrade():
+    op.drop_table("order_status_counters")
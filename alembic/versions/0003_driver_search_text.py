@@ -0,0 +1,67 @@
+"""Колонка drivers.search_text для индексированного поиска водителей
+
+SQLite: составной индекс (taxipark_id, search_text) - LIKE '%...%' проходит
+только по страницам индекса таксопарка. PostgreSQL: дополнительно GIN индекс
+pg_trgm, который ускоряет LIKE с ведущим '%'.
+
+Revision ID: 0003_driver_search_text
+Revises: 0002_order_status_counters
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.search import driver_search_text
+
+
+revision = "0003_driver_search_text"
+down_revision = "0002_order_status_counters"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("drivers")}
+    if "search_text" not in columns:
+        op.add_column("drivers", sa.Column("search_text", sa.String(), nullable=True))
+
+    drivers = sa.table(
+        "drivers",
+        sa.column("id", sa.Integer),
+        sa.column("first_name", sa.String),
+        sa.column("last_name", sa.String),
+        sa.column("call_sign", sa.String),
+        sa.column("phone_number", sa.String),
+        sa.column("car_number", sa.String),
+        sa.column("search_text", sa.String),
+    )
+    rows = bind.execute(sa.select(
+        drivers.c.id, drivers.c.first_name, drivers.c.last_name,
+        drivers.c.call_sign, drivers.c.phone_number, drivers.c.car_number
+    )).all()
+    values = [
+        {"driver_id": row.id, "value": driver_search_text(
+            row.first_name, row.last_name, row.call_sign, row.phone_number, row.car_number
+        )}
+        for row in rows
+    ]
+    statement = drivers.update().where(drivers.c.id == sa.bindparam("driver_id")).values(search_text=sa.bindparam("value"))
+    for start in range(0, len(values), BATCH_SIZE):
+        bind.execute(statement, values[start:start + BATCH_SIZE])
+
+    op.create_index("ix_drivers_taxipark_search", "drivers", ["taxipark_id", "search_text"], if_not_exists=True)
+    if bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_drivers_search_trgm ON drivers USING gin (search_text gin_trgm_ops)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_drivers_search_trgm")
+    op.drop_index("ix_drivers_taxipark_search", table_name="drivers", if_exists=True)
+    with op.batch_alter_table("drivers") as batch:
+        batch.drop_column("search_text")
@@ -0,0 +1,131 @@
+"""Часовые и дневные агрегаты заказов для аналитики, колонка orders.commission
+
+orders.commission заполняется из транзакций комиссии (reference COMM_<id заказа>_...),
+order_rollups - из истории заказов.
+
+Revision ID: 0004_order_rollups
+Revises: 0003_driver_search_text
+Create Date: 2026-10-18
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_order_rollups"
+down_revision = "0003_driver_search_text"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Раскладка заказов по агрегатам на момент этой ревизии (не зависит от кода моделей)
+GRANULARITIES = ("hour", "day")
+NO_DRIVER = 0
+NO_TARIFF = ""
+DEFAULT_ORDER_STATUS = "received"
+KEY_COLUMNS = ("granularity", "bucket", "taxipark_id", "driver_id", "tariff", "status")
+MEASURES = ("orders", "revenue", "commission", "completion_seconds", "completion_samples")
+
+
+def _naive(moment):
+    return moment.replace(tzinfo=None) if moment is not None and moment.tzinfo is not None else moment
+
+
+def _bucket_start(moment, granularity):
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rollup_mappings(rows):
+    """Строки order_rollups из строк заказов"""
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+    for row in rows:
+        if row.taxipark_id is None:
+            continue
+        created_at = _naive(row.created_at)
+        completed_at = _naive(row.completed_at)
+        completion_seconds, completion_samples = 0.0, 0
+        if created_at is not None and completed_at is not None:
+            completion_seconds, completion_samples = max((completed_at - created_at).total_seconds(), 0.0), 1
+        if created_at is None:
+            created_at = datetime.now()
+
+        measures = (1, row.price or 0.0, row.commission or 0.0, completion_seconds, completion_samples)
+        for granularity in GRANULARITIES:
+            key = (
+                granularity, _bucket_start(created_at, granularity), row.taxipark_id,
+                row.driver_id or NO_DRIVER, row.tariff or NO_TARIFF, row.status or DEFAULT_ORDER_STATUS
+            )
+            current = totals[key]
+            for index, value in enumerate(measures):
+                current[index] += value
+
+    return [
+        {**dict(zip(KEY_COLUMNS, key)), **dict(zip(MEASURES, measures))}
+        for key, measures in totals.items()
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("orders")}
+    if "commission" not in columns:
+        op.add_column("orders", sa.Column("commission", sa.Float(), nullable=True))
+        op.execute("""
+            UPDATE orders SET commission = (
+                SELECT -SUM(transactions.amount) FROM transactions
+                WHERE transactions.type = 'commission'
+                  AND transactions.reference LIKE 'COMM_' || orders.id || '\\_%' ESCAPE '\\'
+            )
+        """)
+
+    op.create_table(
+        "order_rollups",
+        sa.Column("granularity", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.DateTime(), primary_key=True),
+        sa.Column("taxipark_id", sa.Integer(), primary_key=True),
+        sa.Column("driver_id", sa.Integer(), primary_key=True),
+        sa.Column("tariff", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("commission", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("completion_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("completion_samples", sa.Integer(), nullable=False, server_default="0"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_order_rollups_taxipark_bucket", "order_rollups", ["granularity", "taxipark_id", "bucket"], if_not_exists=True)
+    op.create_index("ix_order_rollups_driver_bucket", "order_rollups", ["granularity", "driver_id", "bucket"], if_not_exists=True)
+
+    orders = sa.table(
+        "orders",
+        sa.column("taxipark_id", sa.Integer),
+        sa.column("driver_id", sa.Integer),
+        sa.column("tariff", sa.String),
+        sa.column("status", sa.String),
+        sa.column("price", sa.Float),
+        sa.column("commission", sa.Float),
+        sa.column("created_at", sa.DateTime),
+        sa.column("completed_at", sa.DateTime),
+    )
+    rollups = sa.table(
+        "order_rollups",
+        *[sa.column(name) for name in (
+            "granularity", "bucket", "taxipark_id", "driver_id", "tariff", "status",
+            "orders", "revenue", "commission", "completion_seconds", "completion_samples"
+        )]
+    )
+    mappings = _rollup_mappings(bind.execute(sa.select(*orders.c)))
+    bind.execute(rollups.delete())
+    for start in range(0, len(mappings), BATCH_SIZE):
+        bind.execute(rollups.insert(), mappings[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_table("order_rollups")
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("commission")
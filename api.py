@@ -1,17 +1,12 @@
 from fastapi import HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional, List
-import sqlite3
 import json
 import hashlib
 import uuid
 from datetime import datetime
-import os
 
-from app.database.session import get_db, SessionLocal
-
-# Путь к базе данных
-DB_PATH = "taxi_admin.db"
+from app.database.session import get_db, SessionLocal, engine
 
 # API для обновления статуса заказа водителем
 async def update_order_status_by_driver(order_id: int, request: Request):
@@ -43,10 +38,11 @@ async def update_order_status_by_driver(order_id: int, request: Request):
                 raise HTTPException(status_code=404, detail="Driver not found")
             
             # Находим заказ
+            # Строка заказа блокируется до commit (на PostgreSQL - FOR UPDATE)
             order = db.query(Order).filter(
                 Order.id == order_id,
                 Order.driver_id == driver_id
-            ).first()
+            ).with_for_update().first()
             
             if not order:
                 raise HTTPException(status_code=404, detail="Order not found")
@@ -70,6 +66,9 @@ async def update_order_status_by_driver(order_id: int, request: Request):
             
             db.commit()
             
+            from app.services.driver_geo_index import driver_geo_index
+            driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, status)
+            
             # Отправляем обновление через WebSocket
             from app.websocket.manager import websocket_manager
             await websocket_manager.send_to_taxipark({
@@ -106,7 +105,7 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Error initializing SQLAlchemy database: {e}")
     
-    # Создание SQLite базы данных для API
+    # Таблица SMS кодов для API
     create_database()
 
 # Pydantic модели
@@ -123,39 +122,11 @@ class DriverLogin(BaseModel):
 class SmsRequest(BaseModel):
     phoneNumber: str
 
-# Функция для подключения к БД SQLite (только для SMS)
-def get_db_connection():
-    if not os.path.exists(DB_PATH):
-        # Создаем базу данных если она не существует
-        create_database()
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Возвращать результаты как словари
-    return conn
-
-# Создание структуры БД (только для SMS кодов)
+# Создание таблицы SMS кодов для мобильного приложения, если ее еще нет
+# (та же БД, что и у приложения, из DATABASE_URL)
 def create_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Удаляем старые таблицы если они есть
-    cursor.execute('DROP TABLE IF EXISTS sms_codes')
-    
-    # Создаем только таблицу SMS кодов для мобильного приложения
-    cursor.execute('''
-        CREATE TABLE sms_codes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            phone_number TEXT NOT NULL,
-            code TEXT NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            used BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print("SMS database created successfully!")
+    from app.models.sms_code import SmsCode
+    SmsCode.__table__.create(bind=engine, checkfirst=True)
 
 # Функция нормализации номера телефона
 def normalize_phone_number(phone_number):
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database.session import get_db
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.async_session import get_async_db
 from app.models.driver import Driver
-from app.models.order import Order
 from app.models.transaction import DriverTransaction
+from app.services.driver_stats import DriverStatsService
 from typing import Optional, List
 from datetime import datetime, timedelta
 import json
@@ -32,10 +33,14 @@ def normalize_phone_number(phone_number):
     # Возвращаем в едином формате БД: +996XXXXXXXXXX
     return f"+996{main_digits}"
 
+async def _get_driver_by_phone(db: AsyncSession, phone_number: str) -> Optional[Driver]:
+    result = await db.execute(select(Driver).where(Driver.phone_number == phone_number))
+    return result.scalars().first()
+
 @router.get("/api/drivers/balance")
 async def get_driver_balance(
     phoneNumber: str = Query(..., description="Номер телефона водителя"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить баланс водителя"""
     try:
@@ -49,50 +54,20 @@ async def get_driver_balance(
             raise HTTPException(status_code=400, detail="Некорректный номер телефона")
         
         # Ищем водителя по нормализованному номеру
-        driver = db.query(Driver).filter(Driver.phone_number == normalized_phone).first()
+        driver = await _get_driver_by_phone(db, normalized_phone)
         
         if not driver:
-            # Выводим все номера в базе для отладки
-            all_drivers = db.query(Driver).all()
-            print(f"💰 All drivers in DB:")
-            for d in all_drivers:
-                print(f"  - ID: {d.id}, Phone: '{d.phone_number}', Name: {d.first_name} {d.last_name}")
             raise HTTPException(status_code=404, detail=f"Водитель не найден. Искали: '{normalized_phone}'")
         
-        # Получаем статистику за неделю и месяц
+        # Статистика за неделю, месяц и все время - одним запросом к order_rollups
         now = datetime.now()
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        # Подсчитываем заказы за неделю
-        weekly_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.created_at >= week_ago,
-            Order.status == 'completed'
-        ).count()
-        
-        # Подсчитываем заказы за месяц
-        monthly_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.created_at >= month_ago,
-            Order.status == 'completed'
-        ).count()
-        
-        # Подсчитываем общее количество заказов
-        total_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.status == 'completed'
-        ).count()
-        
-        # Вычисляем заработки (примерная логика)
-        weekly_earnings = weekly_orders * 150  # Примерно 150 сом за заказ
-        monthly_earnings = monthly_orders * 150
+        stats = await DriverStatsService.get_stats_async(db, driver.id, now)
         
         balance_data = {
             "balance": float(driver.balance) if driver.balance else 0.0,
-            "weekly_earnings": weekly_earnings,
-            "monthly_earnings": monthly_earnings,
-            "total_orders": total_orders,
+            "weekly_earnings": stats["week"]["earnings"],
+            "monthly_earnings": stats["month"]["earnings"],
+            "total_orders": stats["all"]["completed"],
             "last_updated": now.isoformat(),
             "driver_id": driver.id,
             "phone_number": driver.phone_number
@@ -113,7 +88,7 @@ async def get_driver_transactions(
     filter: str = Query("all", description="Фильтр: all, week, month"),
     page: int = Query(1, description="Номер страницы"),
     limit: int = Query(20, description="Количество записей на странице"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить транзакции водителя"""
     try:
@@ -127,29 +102,35 @@ async def get_driver_transactions(
             raise HTTPException(status_code=400, detail="Некорректный номер телефона")
         
         # Ищем водителя по нормализованному номеру
-        driver = db.query(Driver).filter(Driver.phone_number == normalized_phone).first()
+        driver = await _get_driver_by_phone(db, normalized_phone)
         
         if not driver:
             raise HTTPException(status_code=404, detail="Водитель не найден")
         
         # Базовый запрос транзакций (РЕАЛЬНЫЕ ДАННЫЕ ТОЛЬКО!)
-        query = db.query(DriverTransaction).filter(DriverTransaction.driver_id == driver.id)
+        conditions = [DriverTransaction.driver_id == driver.id]
         
         # Применяем фильтр по времени
         now = datetime.now()
         if filter == "week":
             week_ago = now - timedelta(days=7)
-            query = query.filter(DriverTransaction.created_at >= week_ago)
+            conditions.append(DriverTransaction.created_at >= week_ago)
         elif filter == "month":
             month_ago = now - timedelta(days=30)
-            query = query.filter(DriverTransaction.created_at >= month_ago)
+            conditions.append(DriverTransaction.created_at >= month_ago)
         
         # Получаем общее количество
-        total_count = query.count()
+        total_count = await db.scalar(select(func.count()).select_from(DriverTransaction).where(*conditions))
         
         # Применяем пагинацию
         offset = (page - 1) * limit
-        db_transactions = query.order_by(DriverTransaction.created_at.desc()).offset(offset).limit(limit).all()
+        db_transactions = (await db.execute(
+            select(DriverTransaction)
+            .where(*conditions)
+            .order_by(DriverTransaction.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )).scalars().all()
         
         # Преобразуем в формат API
         transactions = []
@@ -190,7 +171,7 @@ async def get_driver_transactions(
 @router.get("/api/drivers/stats")
 async def get_driver_stats(
     phoneNumber: str = Query(..., description="Номер телефона водителя"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить статистику водителя"""
     try:
@@ -204,51 +185,24 @@ async def get_driver_stats(
             raise HTTPException(status_code=400, detail="Некорректный номер телефона")
         
         # Ищем водителя по нормализованному номеру
-        driver = db.query(Driver).filter(Driver.phone_number == normalized_phone).first()
+        driver = await _get_driver_by_phone(db, normalized_phone)
         
         if not driver:
             raise HTTPException(status_code=404, detail="Водитель не найден")
         
-        now = datetime.now()
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        # Статистика заказов
-        total_orders = db.query(Order).filter(Order.driver_id == driver.id).count()
-        completed_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.status == 'completed'
-        ).count()
-        cancelled_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.status == 'cancelled'
-        ).count()
-        
-        # Заработки
-        weekly_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.created_at >= week_ago,
-            Order.status == 'completed'
-        ).count()
-        
-        monthly_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.created_at >= month_ago,
-            Order.status == 'completed'
-        ).count()
-        
-        total_earnings = completed_orders * 150  # Примерно 150 сом за заказ
-        weekly_earnings = weekly_orders * 150
-        monthly_earnings = monthly_orders * 150
-        average_order_value = 150.0  # Примерное значение
+        # Статистика заказов и заработок - одним запросом к order_rollups
+        windows = await DriverStatsService.get_stats_async(db, driver.id)
+        all_time = windows["all"]
+        completed_orders = all_time["completed"]
+        average_order_value = all_time["revenue"] / completed_orders if completed_orders else 0.0
         
         stats = {
-            "total_earnings": total_earnings,
-            "weekly_earnings": weekly_earnings,
-            "monthly_earnings": monthly_earnings,
-            "total_orders": total_orders,
+            "total_earnings": all_time["earnings"],
+            "weekly_earnings": windows["week"]["earnings"],
+            "monthly_earnings": windows["month"]["earnings"],
+            "total_orders": all_time["orders"],
             "completed_orders": completed_orders,
-            "cancelled_orders": cancelled_orders,
+            "cancelled_orders": all_time["cancelled"],
             "average_order_value": average_order_value,
             "rating": 5.0,  # Примерный рейтинг
             "total_rides": completed_orders,
@@ -267,7 +221,7 @@ async def get_driver_stats(
 @router.post("/api/drivers/balance/topup")
 async def request_balance_topup(
     request_data: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Запрос пополнения баланса"""
     try:
@@ -287,7 +241,7 @@ async def request_balance_topup(
             raise HTTPException(status_code=400, detail="Некорректный номер телефона")
         
         # Ищем водителя по нормализованному номеру
-        driver = db.query(Driver).filter(Driver.phone_number == normalized_phone).first()
+        driver = await _get_driver_by_phone(db, normalized_phone)
         
         if not driver:
             raise HTTPException(status_code=404, detail="Водитель не найден")
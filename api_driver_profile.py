@@ -203,21 +203,17 @@ async def get_weekly_results(
         if not driver:
             raise HTTPException(status_code=404, detail="Водитель не найден")
         
-        # Получаем заказы за последнюю неделю
-        now = datetime.now()
-        week_ago = now - timedelta(days=7)
-        
-        weekly_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.created_at >= week_ago,
-            Order.status == 'completed'
-        ).count()
+        # Заказы за неделю и за все время - одним запросом к order_rollups
+        from app.services.driver_stats import DriverStatsService, WEEK_DAYS
         
-        # Получаем общую статистику
-        total_orders = db.query(Order).filter(
-            Order.driver_id == driver.id,
-            Order.status == 'completed'
-        ).count()
+        now = datetime.now()
+        week_ago = now - timedelta(days=WEEK_DAYS)
+        stats = DriverStatsService.get_stats(db, driver.id, now)
+        week = stats["week"]
+        weekly_orders = week["completed"]
+        total_orders = stats["all"]["completed"]
+        finished = week["completed"] + week["cancelled"]
+        completion_rate = round(100 * week["completed"] / finished) if finished else 100
         
         results_data = {
             "driver_id": driver.id,
@@ -235,7 +231,7 @@ async def get_weekly_results(
             "observations": {
                 "rating": 4.9,
                 "average_wait_time": "3 минуты",
-                "completion_rate": "100%"
+                "completion_rate": f"{completion_rate}%"
             } if weekly_orders >= 10 else {}
         }
         
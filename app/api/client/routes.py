@@ -3,23 +3,10 @@ from sqlalchemy.orm import Session
 from app.database.session import get_db
 from app.models.client import Client
 from app.schemas.client import ClientCreate, ClientLogin
-import sqlite3
-import os
 from datetime import datetime
 
 client_router = APIRouter(prefix="/api/clients", tags=["client-api"])
 
-# Путь к базе данных для SMS
-DB_PATH = "taxi_admin.db"
-
-def get_db_connection():
-    if not os.path.exists(DB_PATH):
-        return None
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 def normalize_phone_number(phone_number):
     """Нормализует номер телефона к единому формату +996XXXXXXXXXX для поиска в БД"""
     if not phone_number:
@@ -121,7 +108,7 @@ async def login_client(login_data: ClientLogin, db: Session = Depends(get_db)):
                 "error": "В отладочном режиме принимается только код 1111"
             }
         
-        # ОТКЛЮЧЕНО: Проверка SMS кода в SQLite БД
+        # ОТКЛЮЧЕНО: Проверка SMS кода в БД
         # if normalized_phone in ["+996111111111", "+9961111111111"]:
         #     if login_data.sms_code != "1111":
         #         return {
@@ -129,36 +116,13 @@ async def login_client(login_data: ClientLogin, db: Session = Depends(get_db)):
         #             "error": "Неверный тестовый код"
         #         }
         # else:
-        #     # Проверяем SMS код в SQLite БД
-        #     conn = get_db_connection()
-        #     if not conn:
-        #         return {
-        #             "success": False,
-        #             "error": "База данных SMS недоступна"
-        #         }
-        #     
-        #     cursor = conn.cursor()
-        #     cursor.execute('''
-        #         SELECT * FROM sms_codes 
-        #         WHERE phone_number = ? AND code = ? AND used = FALSE 
-        #         AND datetime('now') < expires_at
-        #         ORDER BY created_at DESC LIMIT 1
-        #     ''', (normalized_phone, login_data.sms_code))
-        #     
-        #     sms_record = cursor.fetchone()
-        #     if not sms_record:
-        #         conn.close()
+        #     # Проверяем SMS код и отмечаем его как использованный
+        #     from app.services.sms_code_service import SmsCodeService
+        #     if not SmsCodeService.consume_code(db, normalized_phone, login_data.sms_code):
         #         return {
         #             "success": False,
         #             "error": "Неверный или истекший SMS код"
         #         }
-        #     
-        #     # Отмечаем код как использованный
-        #     cursor.execute('''
-        #         UPDATE sms_codes SET used = TRUE WHERE id = ?
-        #     ''', (sms_record['id'],))
-        #     conn.commit()
-        #     conn.close()
         
         print(f"✅ [DEBUG MODE] SMS код 1111 принят")
         
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Request, HTTPException, status, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from app.database.session import get_db
 from app.services.administrator_service import AdministratorService
 from app.core.security import verify_token
 from app.api.dispatcher.auth import router as dispatcher_auth_router
+import hashlib
+import json
 
 router = APIRouter(prefix="/disp", tags=["dispatch"])
 templates = Jinja2Templates(directory="templates")
@@ -20,7 +22,10 @@ async def dispatch_dashboard(
     per_page: int = 20,
     status: str = None,
     date_from: str = None,
-    date_to: str = None
+    date_to: str = None,
+    after: str = None,
+    before: str = None,
+    last: bool = False
 ):
     dispatcher = getattr(request.state, 'dispatcher', None)
     taxipark_id = getattr(request.state, 'taxipark_id', None)
@@ -31,126 +36,48 @@ async def dispatch_dashboard(
     from app.services.dispatcher_service import DispatcherService
     from app.models.order import Order
     from sqlalchemy.orm import joinedload
-    from sqlalchemy import func
     
-    # Получаем статистику
-    stats = DispatcherService.get_dispatcher_stats(db, taxipark_id)
-    
-    # Базовый запрос с загрузкой водителей
-    query = db.query(Order).options(joinedload(Order.driver)).filter(Order.taxipark_id == taxipark_id)
+    # Баланс, водители и заказы по статусам - одним запросом
+    stats = DispatcherService.get_dashboard_summary(db, taxipark_id)
     
-    # Применяем фильтр по статусу если указан
-    if status and status != 'all':
-        query = query.filter(Order.status == status)
+    from app.services.order_pagination import (
+        parse_filter_date, filter_orders, keyset_page, count_orders, decode_cursor, OrderPage
+    )
     
-    # Применяем фильтр по датам если указаны
-    print(f"🔍 DEBUG: date_from={date_from}, date_to={date_to}")
+    # Фильтры по статусу и датам (неверный формат даты - фильтр не применяется)
+    date_from_obj = parse_filter_date(date_from)
+    date_to_obj = parse_filter_date(date_to)
+    query = filter_orders(
+        db.query(Order).options(joinedload(Order.driver)),
+        taxipark_id, status, date_from_obj, date_to_obj
+    )
     
-    if date_from:
-        from datetime import datetime
-        try:
-            # Пробуем разные форматы дат
-            date_from_obj = None
-            for date_format in ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
-                try:
-                    date_from_obj = datetime.strptime(date_from, date_format)
-                    print(f"🔍 DEBUG: Parsed date_from={date_from_obj} using format {date_format}")
-                    break
-                except ValueError:
-                    continue
-            
-            if date_from_obj:
-                query = query.filter(Order.created_at >= date_from_obj)
-                print(f"🔍 DEBUG: Applied date_from filter: >= {date_from_obj}")
-            else:
-                print(f"🔍 DEBUG: Failed to parse date_from: {date_from}")
-        except Exception as e:
-            print(f"🔍 DEBUG: Error parsing date_from: {e}")
-            pass  # Игнорируем неверный формат даты
-    
-    if date_to:
-        from datetime import datetime, timedelta
-        try:
-            # Пробуем разные форматы дат
-            date_to_obj = None
-            for date_format in ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
-                try:
-                    date_to_obj = datetime.strptime(date_to, date_format)
-                    print(f"🔍 DEBUG: Parsed date_to={date_to_obj} using format {date_format}")
-                    break
-                except ValueError:
-                    continue
-            
-            if date_to_obj:
-                # Для date_to используем конец дня (23:59:59)
-                date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59, microsecond=999999)
-                query = query.filter(Order.created_at <= date_to_obj)
-                print(f"🔍 DEBUG: Applied date_to filter: <= {date_to_obj}")
-            else:
-                print(f"🔍 DEBUG: Failed to parse date_to: {date_to}")
-        except Exception as e:
-            print(f"🔍 DEBUG: Error parsing date_to: {e}")
-            pass  # Игнорируем неверный формат даты
-    
-    # Подсчитываем общее количество записей
-    total_orders = query.count()
-    
-    # Вычисляем пагинацию
+    # Общее количество - из счетчиков заказов, без COUNT(*) по orders
+    per_page = max(1, min(per_page, 100))
+    total_orders = count_orders(db, taxipark_id, status, date_from_obj, date_to_obj)
     total_pages = (total_orders + per_page - 1) // per_page if total_orders > 0 else 1
-    offset = (page - 1) * per_page
-    
-    # Получаем заказы для текущей страницы
-    orders = query.order_by(Order.created_at.desc()).offset(offset).limit(per_page).all()
-    
-    # Отладочная информация о заказах
-    print(f"🔍 DEBUG: Found {len(orders)} orders")
-    for order in orders:
-        print(f"🔍 DEBUG: Order {order.id} - created_at: {order.created_at}, status: {order.status}")
-        
-        # Проверяем, соответствует ли заказ фильтрам
-        if date_from:
-            from datetime import datetime
-            try:
-                date_from_obj = None
-                for date_format in ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
-                    try:
-                        date_from_obj = datetime.strptime(date_from, date_format)
-                        break
-                    except ValueError:
-                        continue
-                
-                if date_from_obj and order.created_at:
-                    if order.created_at >= date_from_obj:
-                        print(f"🔍 DEBUG: Order {order.id} PASSES date_from filter")
-                    else:
-                        print(f"🔍 DEBUG: Order {order.id} FAILS date_from filter")
-            except Exception as e:
-                print(f"🔍 DEBUG: Error checking date_from for order {order.id}: {e}")
-        
-        if date_to:
-            from datetime import datetime
-            try:
-                date_to_obj = None
-                for date_format in ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y']:
-                    try:
-                        date_to_obj = datetime.strptime(date_to, date_format)
-                        break
-                    except ValueError:
-                        continue
-                
-                if date_to_obj and order.created_at:
-                    date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59, microsecond=999999)
-                    if order.created_at <= date_to_obj:
-                        print(f"🔍 DEBUG: Order {order.id} PASSES date_to filter")
-                    else:
-                        print(f"🔍 DEBUG: Order {order.id} FAILS date_to filter")
-            except Exception as e:
-                print(f"🔍 DEBUG: Error checking date_to for order {order.id}: {e}")
+    page = max(1, min(page, total_pages))
+    
+    # Keyset пагинация по (created_at, id): after/before - курсоры соседних страниц
+    after_cursor = decode_cursor(after)
+    before_cursor = decode_cursor(before)
+    if after_cursor or before_cursor:
+        order_page = keyset_page(query, per_page, after=after_cursor, before=before_cursor)
+    elif last or (page == total_pages and page > 1):
+        order_page = keyset_page(
+            query, per_page, last=True,
+            last_page_size=total_orders - (total_pages - 1) * per_page
+        )
+    elif page > 1:
+        # Старые ссылки вида ?page=N без курсора
+        rows = query.order_by(Order.created_at.desc(), Order.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        order_page = OrderPage(rows)
+    else:
+        order_page = keyset_page(query, per_page)
+    orders = order_page.orders
     
     # Получаем уникальные статусы для статистики
-    statuses = db.query(Order.status, func.count(Order.id)).filter(
-        Order.taxipark_id == taxipark_id
-    ).group_by(Order.status).all()
+    statuses = list(stats["orders_by_status"].items())
     
     # Проверяем, есть ли активные фильтры по датам
     has_date_filters = bool(date_from or date_to)
@@ -173,6 +100,8 @@ async def dispatch_dashboard(
         "total_pages": total_pages,
         "total_orders": total_orders,
         "per_page": per_page,
+        "next_cursor": order_page.next_cursor,
+        "prev_cursor": order_page.prev_cursor,
         "current_status": status,
         "statuses": statuses,
         "date_from": date_from,
@@ -191,26 +120,15 @@ async def dispatch_analytics(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url='/disp/auth/login', status_code=302)
     
     from app.services.dispatcher_service import DispatcherService
-    from app.models.order import Order
+    from app.services.order_rollups import OrderRollupService
     from app.models.driver import Driver
-    from app.models.transaction import DriverTransaction
-    from sqlalchemy import func
     
-    # Получаем статистику
-    stats = DispatcherService.get_dispatcher_stats(db, taxipark_id)
+    # Баланс, водители и пополнения - одним запросом
+    summary = DispatcherService.get_dashboard_summary(db, taxipark_id)
     
-    # Подсчитываем заказы по статусам
-    orders_by_status = db.query(Order.status, func.count(Order.id)).filter(
-        Order.taxipark_id == taxipark_id
-    ).group_by(Order.status).all()
-    orders_by_status_dict = dict(orders_by_status)
-    
-    # Подсчитываем заказы по тарифам
-    tariffs_data = db.query(Order.tariff, func.count(Order.id)).filter(
-        Order.taxipark_id == taxipark_id,
-        Order.tariff.isnot(None)
-    ).group_by(Order.tariff).all()
-    tariffs_dict = dict(tariffs_data)
+    # Заказы по статусам и тарифам - из дневных агрегатов order_rollups
+    orders_by_status_dict = OrderRollupService.counts_by(db, "status", taxipark_id=taxipark_id)
+    tariffs_dict = OrderRollupService.counts_by(db, "tariff", taxipark_id=taxipark_id)
     
     # Подсчитываем активных водителей
     active_drivers = db.query(Driver).filter(
@@ -218,20 +136,17 @@ async def dispatch_analytics(request: Request, db: Session = Depends(get_db)):
         Driver.is_active == True
     ).count()
     
-    # Подсчитываем пополнения баланса
-    total_topups = DispatcherService.get_total_topups_count(db, taxipark_id)
-    
     return templates.TemplateResponse("dispatcher/analytics.html", {
         "request": request,
         "dispatcher": dispatcher,
         "taxipark_id": taxipark_id,
-        "balance": stats["balance"],
-        "drivers_count": stats["drivers_count"],
+        "balance": summary["balance"],
+        "drivers_count": summary["drivers_count"],
         "total_orders": sum(orders_by_status_dict.values()) if orders_by_status_dict else 0,
         "orders_by_status": orders_by_status_dict,
         "tariffs_data": tariffs_dict,
         "active_drivers": active_drivers,
-        "total_topups": total_topups
+        "total_topups": summary["topups_count"]
     })
 
 @router.get("/drivers", response_class=HTMLResponse)
@@ -267,100 +182,36 @@ async def dispatch_drivers(
         if tariff:
             query = query.filter(Driver.tariff == tariff)
         
-        # АХУЕННАЯ СИСТЕМА ПОИСКА СТРОГО НА КИРИЛЛИЦЕ
+        # Поиск по Ф.И.О, позывному, телефону и госномеру - по нормализованной
+        # колонке drivers.search_text (app/core/search.py) в том же запросе, что и страница
         if search:
-            # Нормализация кириллического поиска
-            def normalize_cyrillic_search(search_text):
-                """Нормализует поисковый запрос для кириллицы"""
-                # Убираем лишние пробелы и приводим к нижнему регистру
-                normalized = search_text.strip().lower()
-                
-                # Заменяем проблемные символы
-                replacements = {
-                    'ё': 'е', 'й': 'и', 'ъ': '', 'ь': '', 
-                    ' ': ' ', '\t': ' ', '\n': ' ', '\r': ' '
-                }
-                
-                for old, new in replacements.items():
-                    normalized = normalized.replace(old, new)
-                
-                # Убираем множественные пробелы
-                import re
-                normalized = re.sub(r'\s+', ' ', normalized).strip()
-                
-                return normalized
-            
-            # Нормализуем поисковый запрос
-            search_normalized = normalize_cyrillic_search(search)
-            search_term = f"%{search_normalized}%"
-            
-            print(f"🔍 DEBUG: CYRILLIC SEARCH - original: '{search}' -> normalized: '{search_normalized}' -> term: '{search_term}'")
-            
-            # Получаем всех водителей для проверки
-            all_drivers_debug = db.query(Driver).filter(Driver.taxipark_id == taxipark_id).all()
-            print(f"🔍 DEBUG: All drivers in taxipark {taxipark_id}:")
-            
-            matching_driver_ids = []
-            for driver in all_drivers_debug:
-                # Нормализуем имя водителя
-                driver_first_normalized = normalize_cyrillic_search(driver.first_name or "")
-                driver_last_normalized = normalize_cyrillic_search(driver.last_name or "")
-                driver_full_normalized = f"{driver_first_normalized} {driver_last_normalized}".strip()
-                
-                # Проверяем совпадения
-                matches = []
-                if search_normalized in driver_first_normalized:
-                    matches.append("first_name")
-                if search_normalized in driver_last_normalized:
-                    matches.append("last_name")
-                if search_normalized in driver_full_normalized:
-                    matches.append("full_name")
-                
-                print(f"🔍 DEBUG: Driver: '{driver.first_name} {driver.last_name}' -> '{driver_full_normalized}' (matches: {matches})")
-                
-                if matches:
-                    matching_driver_ids.append(driver.id)
-            
-            print(f"🔍 DEBUG: Found {len(matching_driver_ids)} matching drivers: {matching_driver_ids}")
-            
-            # Фильтруем по найденным ID
-            if matching_driver_ids:
-                query = query.filter(Driver.id.in_(matching_driver_ids))
-            else:
-                # Если ничего не найдено, делаем невозможный запрос
-                query = query.filter(Driver.id == -1)
+            from app.core.search import LIKE_ESCAPE, search_patterns
+            patterns = search_patterns(search)
+            if patterns:
+                query = query.filter(or_(*[Driver.search_text.like(pattern, escape=LIKE_ESCAPE) for pattern in patterns]))
         
-        # Получаем общее количество водителей после фильтрации
-        total_drivers = query.count()
-        print(f"🔍 DEBUG: Total drivers after filtering: {total_drivers}")
-        
-        # Вычисляем пагинацию
-        total_pages = (total_drivers + per_page - 1) // per_page
+        # Страница и общее количество одним запросом (COUNT(*) OVER ())
+        page = max(1, page)
         offset = (page - 1) * per_page
-        
-        # Получаем водителей для текущей страницы
-        drivers = query.offset(offset).limit(per_page).all()
-        print(f"🔍 DEBUG: Drivers retrieved for page: {len(drivers)}")
-        
-        # Отладочная информация о найденных водителях
-        if search:
-            print(f"🔍 DEBUG: Found {len(drivers)} drivers for search '{search}'")
-            for driver in drivers:
-                full_name = f"{driver.first_name} {driver.last_name}"
-                print(f"🔍 DEBUG: Driver found: '{full_name}' (search: '{search}')")
+        rows = query.add_columns(func.count().over().label("total")).order_by(Driver.id).offset(offset).limit(per_page).all()
+        drivers = [row[0] for row in rows]
+        # За последней страницей строк нет - тогда общее количество отдельным запросом
+        total_drivers = rows[0].total if rows else (query.count() if page > 1 else 0)
+        total_pages = (total_drivers + per_page - 1) // per_page
         
         # Получаем статистику
-        stats = DispatcherService.get_dispatcher_stats(db, taxipark_id)
+        stats = DispatcherService.get_dashboard_summary(db, taxipark_id)
         
         # Подсчитываем статистику водителей
         active_drivers = db.query(Driver).filter(Driver.taxipark_id == taxipark_id, Driver.is_active == True).count()
         
         # Получаем уникальные тарифы для фильтра
-        all_drivers = db.query(Driver).filter(Driver.taxipark_id == taxipark_id).all()
-        tariffs = set()
-        for driver in all_drivers:
-            if driver.tariff:
-                tariffs.add(driver.tariff)
+        tariffs = {
+            row[0] for row in db.query(Driver.tariff).filter(
+                Driver.taxipark_id == taxipark_id,
+                Driver.tariff.isnot(None)
+            ).distinct()
+        }
         
         # Проверяем, есть ли активные фильтры
         has_filters = any([status != "all", tariff, search])
@@ -757,6 +608,8 @@ async def dispatch_profile(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/api/dashboard-stats")
 async def get_dashboard_stats(request: Request, db: Session = Depends(get_db)):
+    """Сводка диспетчерской: агрегаты одним запросом (DispatcherService.get_dashboard_summary)
+    и последние заказы. Поддерживает If-None-Match: при неизменной сводке - 304 без тела"""
     taxipark_id = getattr(request.state, 'taxipark_id', None)
     
     if not taxipark_id:
@@ -766,30 +619,48 @@ async def get_dashboard_stats(request: Request, db: Session = Depends(get_db)):
         )
     
     from app.services.dispatcher_service import DispatcherService
-    stats = DispatcherService.get_dispatcher_stats(db, taxipark_id)
-    
-    return {
-        "balance": stats["balance"],
-        "drivers_count": stats["drivers_count"],
-        "orders_stats": stats["orders_stats"],
+    summary = DispatcherService.get_dashboard_summary(db, taxipark_id)
+    from app.models.order import Order
+    from app.services.order_serializer import order_rows_query, serialize_order_row
+    orders = [
+        serialize_order_row(row)
+        for row in order_rows_query(db).filter(Order.taxipark_id == taxipark_id).order_by(Order.created_at.desc()).limit(50)
+    ]
+    
+    payload = {
+        "balance": summary["balance"],
+        "drivers_count": summary["drivers_count"],
+        "topups_count": summary["topups_count"],
+        "orders_stats": summary["orders_stats"],
+        "orders_by_status": summary["orders_by_status"],
         "orders": [
             {
-                "id": order.id,
-                "order_number": order.order_number if order.order_number else order.id,
-                "created_at": order.created_at.isoformat() if order.created_at else None,
-                "status": order.status,
-                "status_display": order.get_status_display(),
-                "phone": order.client_phone,
-                "from_address": order.pickup_address,
-                "to_address": order.destination_address,
-                "driver_name": order.get_driver_display_name(),
-                "driver_phone": order.driver.phone_number if order.driver else None,
-                "amount": order.price,
+                "id": order["id"],
+                "order_number": order["order_number"] if order["order_number"] else order["id"],
+                "created_at": order["created_at"],
+                "status": order["status"],
+                "status_display": order["status_display"],
+                "phone": order["client_phone"],
+                "from_address": order["pickup_address"],
+                "to_address": order["destination_address"],
+                "driver_name": order["driver_display_name"],
+                "driver_phone": order["driver_phone"],
+                "amount": order["price"],
                 "tariff": "Комфорт"
             }
-            for order in stats["orders"]
+            for order in orders
         ]
     }
+    
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    etag = f'W/"{hashlib.sha1(body.encode()).hexdigest()}"'
+    # Ответ зависит от диспетчера (cookie), поэтому кеш только приватный и с перепроверкой
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/api/topup-history")
 async def get_topup_history(request: Request, db: Session = Depends(get_db)):
@@ -858,6 +729,12 @@ async def update_driver_status(request: Request, db: Session = Depends(get_db)):
             driver.online_status = 'offline'
         db.commit()
         
+        from app.services.driver_geo_index import driver_geo_index
+        if is_active:
+            driver_geo_index.set_online(driver.id, driver.taxipark_id, driver.current_latitude, driver.current_longitude)
+        else:
+            driver_geo_index.set_offline(driver.id)
+        
         return {"success": True, "message": "Driver status updated successfully"}
         
     except Exception as e:
@@ -865,7 +742,12 @@ async def update_driver_status(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/online-drivers")
-async def get_online_drivers_for_dispatcher(request: Request, db: Session = Depends(get_db)):
+async def get_online_drivers_for_dispatcher(
+    request: Request,
+    db: Session = Depends(get_db),
+    latitude: float = None,
+    longitude: float = None
+):
     dispatcher = getattr(request.state, 'dispatcher', None)
     taxipark_id = getattr(request.state, 'taxipark_id', None)
     
@@ -876,23 +758,8 @@ async def get_online_drivers_for_dispatcher(request: Request, db: Session = Depe
     
     try:
         from app.models.driver import Driver
-        from datetime import datetime, timedelta
-        
-        # Автоматически отключаем водителей которые не активны более 2 минут
-        cutoff_time = datetime.now() - timedelta(minutes=2)
-        inactive_drivers = db.query(Driver).filter(
-            Driver.taxipark_id == taxipark_id,
-            Driver.online_status == 'online',
-            Driver.last_online_at < cutoff_time
-        ).all()
-        
-        for driver in inactive_drivers:
-            driver.online_status = 'offline'
-            print(f"🚫 Автоматически отключен водитель {driver.id} - нет активности")
-        
-        if inactive_drivers:
-            db.commit()
         
+        # Неактивных водителей отключает фоновый heartbeat_reaper - здесь только чтение
         # Получаем только активных онлайн водителей, которые НЕ выполняют заказы
         from app.models.order import Order
         
@@ -912,12 +779,34 @@ async def get_online_drivers_for_dispatcher(request: Request, db: Session = Depe
         ).all()
         
         print(f"🔍 DEBUG: Найдено {len(online_drivers)} свободных онлайн водителей для таксопарка {taxipark_id}")
-        for driver in online_drivers:
-            print(f"🔍 DEBUG: Водитель {driver.id} - {driver.first_name} {driver.last_name} (статус: {driver.online_status})")
+        
+        from app.services.location_store import location_store
+        drivers_data = [location_store.overlay(driver.to_dict()) for driver in online_drivers]
+        
+        # Если известна точка подачи - сортируем водителей по расстоянию до нее
+        if latitude is not None and longitude is not None:
+            from app.core.geo import haversine_many
+            
+            located = [d for d in drivers_data if d["current_latitude"] is not None and d["current_longitude"] is not None]
+            unlocated = [d for d in drivers_data if d["current_latitude"] is None or d["current_longitude"] is None]
+            
+            distances = haversine_many(
+                latitude,
+                longitude,
+                [d["current_latitude"] for d in located],
+                [d["current_longitude"] for d in located]
+            )
+            for driver_data, distance in zip(located, distances):
+                driver_data["distance_km"] = round(float(distance), 2)
+            for driver_data in unlocated:
+                driver_data["distance_km"] = None
+            
+            located.sort(key=lambda d: d["distance_km"])
+            drivers_data = located + unlocated
         
         return {
             "success": True,
-            "drivers": [driver.to_dict() for driver in online_drivers]
+            "drivers": drivers_data
         }
         
     except Exception as e:
@@ -1159,8 +1048,16 @@ async def create_order(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/orders")
-async def get_orders(request: Request, db: Session = Depends(get_db)):
-    """Получить список заказов для диспетчера"""
+async def get_orders(
+    request: Request,
+    db: Session = Depends(get_db),
+    limit: int = 50,
+    after: str = None,
+    before: str = None,
+    status: str = None
+):
+    """Получить список заказов для диспетчера, новые сверху.
+    Следующая страница - ?after=<next_cursor>, предыдущая - ?before=<prev_cursor>"""
     dispatcher = getattr(request.state, 'dispatcher', None)
     taxipark_id = getattr(request.state, 'taxipark_id', None)
     
@@ -1168,16 +1065,20 @@ async def get_orders(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     try:
-        from app.models.order import Order
-        from sqlalchemy import desc
+        from app.services.order_pagination import filter_orders, keyset_page, count_orders, decode_cursor
+        from app.services.order_serializer import order_rows_query, serialize_order_row
         
-        orders = db.query(Order).filter(
-            Order.taxipark_id == taxipark_id
-        ).order_by(desc(Order.created_at)).limit(50).all()
+        limit = max(1, min(limit, 200))
+        # Только колонки заказа и водителя, без ORM объектов
+        query = filter_orders(order_rows_query(db), taxipark_id, status)
+        order_page = keyset_page(query, limit, after=decode_cursor(after), before=decode_cursor(before))
         
         return {
             "success": True,
-            "orders": [order.to_dict() for order in orders]
+            "orders": [serialize_order_row(row) for row in order_page.orders],
+            "next_cursor": order_page.next_cursor,
+            "prev_cursor": order_page.prev_cursor,
+            "total": count_orders(db, taxipark_id, status)
         }
         
     except Exception as e:
@@ -1259,6 +1160,9 @@ async def update_order_status(order_id: int, request: Request, db: Session = Dep
         
         db.commit()
         
+        from app.services.driver_geo_index import driver_geo_index
+        driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, new_status)
+        
         # Отправляем обновление статуса через WebSocket
         from app.websocket.manager import websocket_manager
         await websocket_manager.broadcast_order_status_update(
@@ -1,20 +1,40 @@
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.database.async_session import get_async_db
 from app.models.driver import Driver
 from app.models.order import Order
 from app.models.taxipark import TaxiPark
 from app.models.transaction import DriverTransaction
+from app.services.driver_geo_index import driver_geo_index
 from datetime import datetime
 import uuid
 
 router = APIRouter(tags=["driver_orders"])
 
+async def _get_order(db: AsyncSession, *conditions, skip_locked: bool = False) -> Order:
+    """Заказ вместе с водителем для изменения: Order.to_dict читает order.driver,
+    а ленивая загрузка в AsyncSession недоступна.
+
+    На PostgreSQL строка заказа блокируется до commit (SELECT ... FOR UPDATE);
+    skip_locked=True - заказ, который уже обрабатывает другой запрос, пропускается
+    вместо ожидания. SQLite FOR UPDATE не поддерживает и сериализует запись сам.
+    """
+    query = (
+        select(Order)
+        .options(selectinload(Order.driver))
+        .where(*conditions)
+        .with_for_update(of=Order, skip_locked=skip_locked)
+    )
+    result = await db.execute(query)
+    return result.scalars().first()
+
 @router.put("/orders/{order_id}/accept")
 async def accept_order(
     order_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Принять заказ водителем"""
     try:
@@ -25,16 +45,18 @@ async def accept_order(
             raise HTTPException(status_code=400, detail="Driver ID is required")
         
         # Проверяем водителя
-        driver = db.query(Driver).filter(Driver.id == driver_id).first()
+        driver = await db.get(Driver, int(driver_id))
         if not driver:
             raise HTTPException(status_code=404, detail="Driver not found")
         
         # Проверяем заказ
-        order = db.query(Order).filter(
+        order = await _get_order(
+            db,
             Order.id == order_id,
             Order.driver_id == driver_id,
-            Order.status == 'received'
-        ).first()
+            Order.status == 'received',
+            skip_locked=True
+        )
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found or already processed")
@@ -43,7 +65,8 @@ async def accept_order(
         order.status = 'accepted'
         order.accepted_at = datetime.now()
         
-        db.commit()
+        await db.commit()
+        driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, order.status)
         
         return {
             "success": True,
@@ -52,14 +75,14 @@ async def accept_order(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/orders/{order_id}/reject")
 async def reject_order(
     order_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Отклонить заказ водителем"""
     try:
@@ -70,16 +93,18 @@ async def reject_order(
             raise HTTPException(status_code=400, detail="Driver ID is required")
         
         # Проверяем водителя
-        driver = db.query(Driver).filter(Driver.id == driver_id).first()
+        driver = await db.get(Driver, int(driver_id))
         if not driver:
             raise HTTPException(status_code=404, detail="Driver not found")
         
         # Проверяем заказ
-        order = db.query(Order).filter(
+        order = await _get_order(
+            db,
             Order.id == order_id,
             Order.driver_id == driver_id,
-            Order.status == 'received'
-        ).first()
+            Order.status == 'received',
+            skip_locked=True
+        )
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found or already processed")
@@ -88,7 +113,8 @@ async def reject_order(
         order.status = 'cancelled'
         order.cancelled_at = datetime.now()
         
-        db.commit()
+        await db.commit()
+        driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, order.status)
         
         return {
             "success": True,
@@ -97,14 +123,14 @@ async def reject_order(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/api/orders/{order_id}/status")
 async def update_order_status(
     order_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновить статус заказа водителем"""
     print(f"🔍 [OrderRoutes] Endpoint called: PUT /api/orders/{order_id}/status")
@@ -120,7 +146,7 @@ async def update_order_status(
             raise HTTPException(status_code=400, detail="Driver ID and status are required")
         
         # Проверяем водителя
-        driver = db.query(Driver).filter(Driver.id == driver_id).first()
+        driver = await db.get(Driver, int(driver_id))
         if not driver:
             print(f"❌ [OrderRoutes] Driver {driver_id} not found")
             raise HTTPException(status_code=404, detail="Driver not found")
@@ -128,14 +154,15 @@ async def update_order_status(
         print(f"✅ [OrderRoutes] Driver found: {driver.first_name} {driver.last_name}")
         
         # Проверяем заказ
-        order = db.query(Order).filter(
+        order = await _get_order(
+            db,
             Order.id == order_id,
             Order.driver_id == driver_id
-        ).first()
+        )
         
         if not order:
             # Давайте проверим, существует ли заказ вообще
-            order_exists = db.query(Order).filter(Order.id == order_id).first()
+            order_exists = await db.get(Order, order_id)
             if order_exists:
                 print(f"❌ [OrderRoutes] Order {order_id} exists but driver_id is {order_exists.driver_id}, not {driver_id}")
                 raise HTTPException(status_code=404, detail=f"Order {order_id} is not assigned to driver {driver_id}")
@@ -181,7 +208,8 @@ async def update_order_status(
         elif new_status == 'rejected_by_driver':
             order.cancelled_at = now
         
-        db.commit()
+        await db.commit()
+        driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, new_status)
         
         # Отправляем обновление статуса через WebSocket
         from app.websocket.manager import websocket_manager
@@ -235,11 +263,11 @@ async def update_order_status(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _process_order_commission(db: Session, driver: Driver, order: Order) -> dict:
+async def _process_order_commission(db: AsyncSession, driver: Driver, order: Order) -> dict:
     """Обработать комиссию за принятие заказа"""
     try:
         print(f"💰 [Commission] Processing commission for order {order.id}")
@@ -247,7 +275,7 @@ async def _process_order_commission(db: Session, driver: Driver, order: Order) -
         print(f"💰 [Commission] Order price: {order.price}")
         
         # Получаем информацию о таксопарке
-        taxipark = db.query(TaxiPark).filter(TaxiPark.id == driver.taxipark_id).first()
+        taxipark = await db.get(TaxiPark, driver.taxipark_id)
         if not taxipark:
             return {
                 "success": False,
@@ -280,6 +308,7 @@ async def _process_order_commission(db: Session, driver: Driver, order: Order) -
         # Списываем комиссию с баланса
         new_balance = current_balance - commission_amount
         driver.balance = new_balance
+        order.commission = commission_amount
         
         # Создаем запись транзакции
         transaction = DriverTransaction(
@@ -294,6 +323,7 @@ async def _process_order_commission(db: Session, driver: Driver, order: Order) -
         )
         
         db.add(transaction)
+        await db.flush()
         
         print(f"💰 [Commission] Commission processed successfully:")
         print(f"💰 [Commission] - Commission amount: {commission_amount}")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from app.database.session import get_db
+from app.database.async_session import get_async_db
 from app.models.order import Order
 from app.models.driver import Driver
 from datetime import datetime
@@ -39,7 +41,7 @@ async def get_order_by_driver(order_id: int, driver_id: int, db: Session = Depen
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/api/online-status")
-async def update_online_status(request: Request, db: Session = Depends(get_db)):
+async def update_online_status(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         data = await request.json()
         driver_id = data.get('driver_id')
@@ -54,12 +56,13 @@ async def update_online_status(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="status must be 'online' or 'offline'")
         
         from app.models.driver import Driver
+        from app.services.location_store import location_store
         from datetime import datetime
         import logging
         
         logger = logging.getLogger(__name__)
         
-        driver = db.query(Driver).filter(Driver.id == driver_id).first()
+        driver = await db.get(Driver, int(driver_id))
         if not driver:
             raise HTTPException(status_code=404, detail="Driver not found")
         
@@ -71,9 +74,21 @@ async def update_online_status(request: Request, db: Session = Depends(get_db)):
             if latitude is not None and longitude is not None:
                 driver.current_latitude = float(latitude)
                 driver.current_longitude = float(longitude)
+                location_store.record(driver.id, driver.current_latitude, driver.current_longitude, driver.last_online_at)
                 logger.info(f"📍 [OnlineStatus] Driver {driver.first_name} {driver.last_name} location updated: ({latitude}, {longitude})")
         
-        db.commit()
+        await db.commit()
+        # updated_at выставляется на стороне БД - перечитываем до to_dict()
+        await db.refresh(driver)
+        
+        from app.services.driver_geo_index import driver_geo_index
+        from app.services.location_stream import location_stream
+        if status == 'online' and driver.is_active:
+            driver_geo_index.set_online(driver.id, driver.taxipark_id, driver.current_latitude, driver.current_longitude)
+        else:
+            driver_geo_index.set_offline(driver.id)
+            location_stream.forget(driver.id)
+            location_store.forget(driver.id)
         
         from app.websocket.manager import websocket_manager
         await websocket_manager.send_to_taxipark({
@@ -97,23 +112,8 @@ async def update_online_status(request: Request, db: Session = Depends(get_db)):
 async def get_online_drivers(taxipark_id: int, db: Session = Depends(get_db)):
     try:
         from app.models.driver import Driver
-        from datetime import datetime, timedelta
-        
-        # Автоматически отключаем водителей которые не активны более 2 минут
-        cutoff_time = datetime.now() - timedelta(minutes=2)
-        inactive_drivers = db.query(Driver).filter(
-            Driver.taxipark_id == taxipark_id,
-            Driver.online_status == 'online',
-            Driver.last_online_at < cutoff_time
-        ).all()
-        
-        for driver in inactive_drivers:
-            driver.online_status = 'offline'
-            print(f"🚫 Автоматически отключен водитель {driver.id} - нет активности")
-        
-        if inactive_drivers:
-            db.commit()
         
+        # Неактивных водителей отключает фоновый heartbeat_reaper - здесь только чтение
         # Получаем только активных онлайн водителей
         online_drivers = db.query(Driver).filter(
             Driver.taxipark_id == taxipark_id,
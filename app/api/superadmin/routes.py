@@ -90,42 +90,8 @@ async def superadmin_admins_page(request: Request):
 @router.get("/api/metrics")
 async def get_metrics(db: Session = Depends(get_db)):
     """Получить метрики для дашборда"""
-    print("🚀 API METRICS: Начало выполнения")
     try:
-        # Отладочная информация
-        from app.models.order import Order
-        from sqlalchemy import func
-        
-        print("🚀 API METRICS: Импорты выполнены")
-        
-        # Проверяем все заказы
-        all_orders = db.query(Order).all()
-        print(f"🚀 API METRICS: Все заказы из базы: {len(all_orders)}")
-        for order in all_orders:
-            print(f"  - ID: {order.id}, Статус: {order.status}, Цена: {order.price}")
-        
-        total_orders = db.query(Order).count()
-        non_cancelled_orders = db.query(Order).filter(Order.status != "cancelled").count()
-        total_earnings = db.query(Order).filter(Order.status != "cancelled").with_entities(func.sum(Order.price)).scalar() or 0.0
-        
-        print(f"🔍 DEBUG: Всего заказов в базе: {total_orders}")
-        print(f"🔍 DEBUG: Не отмененных заказов: {non_cancelled_orders}")
-        print(f"🔍 DEBUG: Общая сумма: {total_earnings}")
-        
-        # Временно используем прямые запросы вместо AnalyticsService
-        stats = {
-            "orders_completed": non_cancelled_orders,
-            "total_earnings": total_earnings,
-            "driver_topups": 2,  # Временно фиксированное значение
-            "total_superadmins": 1,  # Временно фиксированное значение
-            "period_days": 7
-        }
-        
-        print(f"📊 METRICS: Получены метрики: {stats}")
-        print(f"📊 METRICS: Типы данных:")
-        for key, value in stats.items():
-            print(f"  {key}: {value} (тип: {type(value)})")
-        return stats
+        return AnalyticsService.get_dashboard_stats(db)
     except Exception as e:
         print(f"❌ METRICS: Ошибка при получении метрик: {str(e)}")
         raise HTTPException(
@@ -167,30 +133,21 @@ async def create_superadmin(
 
 # API endpoints для таксопарков
 @router.get("/api/taxiparks", response_model=List[TaxiParkList])
-async def get_taxiparks_list(db: Session = Depends(get_db)):
-    """Получить список всех таксопарков"""
+async def get_taxiparks_list(
+    skip: int = 0,
+    limit: Optional[int] = None,
+    city: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    sort: str = "id",
+    order: str = "asc",
+    db: Session = Depends(get_db)
+):
+    """Получить список таксопарков с количеством водителей и диспетчеров (без limit - все)"""
     try:
-        from app.models.driver import Driver
-        from app.models.administrator import Administrator
-        
-        taxiparks = TaxiParkService.get_taxiparks(db)
-        
-        # Подсчитываем реальное количество водителей и диспетчеров для каждого таксопарка
-        taxiparks_with_counts = []
-        for taxipark in taxiparks:
-            # Подсчитываем водителей
-            drivers_count = db.query(Driver).filter(Driver.taxipark_id == taxipark.id).count()
-            
-            # Подсчитываем диспетчеров (администраторов)
-            dispatchers_count = db.query(Administrator).filter(Administrator.taxipark_id == taxipark.id).count()
-            
-            # Обновляем счетчики в объекте
-            taxipark.drivers_count = drivers_count
-            taxipark.dispatchers_count = dispatchers_count
-            
-            taxiparks_with_counts.append(taxipark)
-        
-        return taxiparks_with_counts
+        return TaxiParkService.get_taxiparks_with_counts(
+            db, skip=max(0, skip), limit=max(1, min(limit, 500)) if limit is not None else None, city=city,
+            is_active=is_active, sort=sort, order=order
+        )
     except Exception as e:
         print(f"❌ ERROR: Ошибка при получении списка таксопарков: {str(e)}")
         import traceback
@@ -435,42 +392,37 @@ async def get_administrators_json_data():
         )
 
 @router.get("/api/drivers")
-async def get_drivers_list(db: Session = Depends(get_db)):
-    """Получить список всех водителей"""
+async def get_drivers_list(
+    page: int = 1,
+    per_page: Optional[int] = None,
+    search: Optional[str] = None,
+    taxipark_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    sort: str = "id",
+    order: str = "asc",
+    db: Session = Depends(get_db)
+):
+    """Получить водителей (поиск, фильтр по таксопарку и статусу, сортировка).
+
+    Постранично - только с явным per_page; без него, как и раньше, отдаются все водители.
+    """
     try:
-        from app.models.driver import Driver
-        from app.models.taxipark import TaxiPark
-        
-        print(f"🔍 DEBUG: Запрос списка водителей")
-        
-        drivers = db.query(Driver).all()
-        print(f"🔍 DEBUG: Найдено водителей: {len(drivers)}")
-        
-        drivers_data = []
-        for driver in drivers:
-            taxipark_name = "Не указан"
-            if driver.taxipark_id:
-                taxipark = db.query(TaxiPark).filter(TaxiPark.id == driver.taxipark_id).first()
-                if taxipark:
-                    taxipark_name = taxipark.name
-            
-            drivers_data.append({
-                "id": driver.id,
-                "first_name": driver.first_name,
-                "last_name": driver.last_name,
-                "phone_number": driver.phone_number,
-                "car_model": driver.car_model,
-                "car_number": driver.car_number,
-                "balance": float(driver.balance) if driver.balance else 0.0,
-                "tariff": driver.tariff,
-                "taxipark_name": taxipark_name,
-                "is_active": driver.is_active,
-                "created_at": driver.created_at.isoformat() if driver.created_at else None,
-                "updated_at": driver.updated_at.isoformat() if driver.updated_at else None
-            })
-        
-        print(f"🔍 DEBUG: Подготовлено данных: {len(drivers_data)}")
-        return {"drivers": drivers_data, "count": len(drivers_data)}
+        if per_page is None:
+            page = 1
+        else:
+            page = max(1, page)
+            per_page = max(1, min(per_page, 200))
+        drivers_data, total = SuperAdminService.get_drivers_page(
+            db, page=page, per_page=per_page, search=search, taxipark_id=taxipark_id,
+            is_active=is_active, sort=sort, order=order
+        )
+        return {
+            "drivers": drivers_data,
+            "count": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page if per_page else 1
+        }
     except Exception as e:
         print(f"❌ ERROR: Ошибка при получении списка водителей: {str(e)}")
         import traceback
@@ -515,6 +467,9 @@ async def delete_driver(
         db.delete(driver)
         db.commit()
         
+        from app.services.driver_geo_index import driver_geo_index
+        driver_geo_index.set_offline(driver_id)
+        
         # Обновляем счетчик водителей в таксопарке
         TaxiParkService.update_drivers_count(db, taxipark_id)
         
@@ -566,6 +521,9 @@ async def block_driver(
         db.commit()
         db.refresh(driver)
         
+        from app.services.driver_geo_index import driver_geo_index
+        driver_geo_index.set_offline(driver.id)
+        
         print(f"🚫 Водитель {driver.first_name} {driver.last_name} заблокирован. Причина: {reason}")
         
         return {
@@ -732,58 +690,69 @@ async def get_analytics_data(
     period: int = 7,
     db: Session = Depends(get_db)
 ):
-    """Получить аналитические данные"""
+    """Получить аналитические данные (из агрегатов order_rollups)"""
     try:
-        from app.models.order import Order
         from app.models.driver import Driver
-        from app.models.client import Client
-        from sqlalchemy import func, and_
+        from app.services.order_rollups import OrderRollupService
+        from app.models.order_rollup import NO_DRIVER, bucket_start
+        from sqlalchemy import func
         from datetime import datetime, timedelta
         
-        print(f"📊 ANALYTICS: Запрос аналитики за {period} дней")
-        
-        # Дата начала периода
-        start_date = datetime.now() - timedelta(days=period)
+        period = max(1, min(period, 366))
         
-        # Основные метрики
-        total_orders = db.query(Order).filter(Order.status != "cancelled").count()
-        total_revenue = db.query(Order).filter(Order.status != "cancelled").with_entities(func.sum(Order.price)).scalar() or 0.0
-        active_drivers = db.query(Driver).filter(Driver.is_active == True).count()
+        # Основные метрики за все время
+        totals = OrderRollupService.totals(db, exclude_statuses=("cancelled",))
+        total_orders = int(totals.orders)
+        total_revenue = float(totals.revenue)
+        active_drivers = db.query(func.count(Driver.id)).filter(Driver.is_active == True).scalar()
         average_order = total_revenue / total_orders if total_orders > 0 else 0.0
         
-        # Статистика по статусам заказов
-        orders_by_status = db.query(Order.status, func.count(Order.id)).group_by(Order.status).all()
-        orders_status_dict = dict(orders_by_status)
-        
-        # Топ водители (по количеству заказов)
-        top_drivers_query = db.query(
-            Driver.first_name,
-            Driver.last_name,
-            func.count(Order.id).label('orders_count'),
-            func.sum(Order.price).label('total_revenue')
-        ).join(Order, Driver.id == Order.driver_id).filter(
-            Order.status == "completed"
-        ).group_by(Driver.id, Driver.first_name, Driver.last_name).order_by(
-            func.count(Order.id).desc()
-        ).limit(5).all()
+        # Среднее время выполнения заказа (created_at -> completed_at), минуты
+        first_day = bucket_start(datetime.now(), "day") - timedelta(days=period - 1)
+        completion = OrderRollupService.totals(db, statuses=("completed",))
+        period_completion = OrderRollupService.totals(db, statuses=("completed",), start=first_day)
         
+        # Статистика по статусам заказов
+        orders_status_dict = OrderRollupService.counts_by(db, "status")
+        
+        # Топ водители (по количеству выполненных заказов)
+        driver_rows = OrderRollupService.query(db, group_by=("driver_id",), statuses=("completed",))
+        driver_rows = sorted(
+            (row for row in driver_rows if row.driver_id != NO_DRIVER),
+            key=lambda row: (-row.orders, row.driver_id)
+        )[:5]
+        names = dict(
+            (driver_id, f"{first_name} {last_name}")
+            for driver_id, first_name, last_name in db.query(Driver.id, Driver.first_name, Driver.last_name)
+            .filter(Driver.id.in_([row.driver_id for row in driver_rows]))
+        )
         top_drivers = [
             {
-                "name": f"{driver.first_name} {driver.last_name}",
-                "orders": driver.orders_count,
-                "revenue": float(driver.total_revenue) if driver.total_revenue else 0.0
+                "name": names.get(row.driver_id, f"#{row.driver_id}"),
+                "orders": int(row.orders),
+                "revenue": float(row.revenue),
+                "average_completion_minutes": round(OrderRollupService.average_completion_minutes(row), 1)
             }
-            for driver in top_drivers_query
+            for row in driver_rows
         ]
         
-        # Данные для графика доходов (пока пустые, будут реальные данные)
-        revenue_data = []
+        # Доход по дням периода (без отмененных заказов)
+        revenue_by_day = {
+            row.bucket: float(row.revenue)
+            for row in OrderRollupService.query(
+                db, start=first_day, group_by=("bucket",), granularity="day", exclude_statuses=("cancelled",)
+            )
+        }
+        days = [first_day + timedelta(days=offset) for offset in range(period)]
+        revenue_data = [revenue_by_day.get(day, 0.0) for day in days] if revenue_by_day else []
         
-        analytics_data = {
-            "total_revenue": float(total_revenue),
+        return {
+            "total_revenue": total_revenue,
             "total_orders": total_orders,
             "active_drivers": active_drivers,
             "average_order": float(average_order),
+            "average_completion_minutes": round(OrderRollupService.average_completion_minutes(completion), 1),
+            "period_average_completion_minutes": round(OrderRollupService.average_completion_minutes(period_completion), 1),
             "orders_by_status": {
                 "completed": orders_status_dict.get("completed", 0),
                 "cancelled": orders_status_dict.get("cancelled", 0),
@@ -792,17 +761,10 @@ async def get_analytics_data(
             },
             "top_drivers": top_drivers,
             "revenue_data": revenue_data,
+            "revenue_labels": [day.strftime("%d.%m") for day in days] if revenue_by_day else [],
             "period_days": period
         }
         
-        print(f"📊 ANALYTICS: Подготовлены данные аналитики")
-        print(f"  - Общий доход: {total_revenue}")
-        print(f"  - Заказов: {total_orders}")
-        print(f"  - Активных водителей: {active_drivers}")
-        print(f"  - Средний чек: {average_order}")
-        
-        return analytics_data
-        
     except Exception as e:
         print(f"❌ ANALYTICS: Ошибка при получении аналитики: {str(e)}")
         import traceback
@@ -0,0 +1,92 @@
+from typing import List, Sequence, Tuple
+import math
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние между двумя точками по большой окружности, км"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2 - lon1)
+
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Прямоугольник (min_lat, max_lat, min_lon, max_lon), гарантированно содержащий круг радиуса radius_km"""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlon = min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
+
+
+def haversine_many(latitude: float, longitude: float, latitudes: Sequence[float], longitudes: Sequence[float]):
+    """Расстояния от одной точки до массива точек одним векторным проходом, км
+
+    Возвращает numpy-массив, если numpy установлен, иначе список.
+    """
+    if not NUMPY_AVAILABLE:
+        return [haversine_km(latitude, longitude, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+
+    lats = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lons = np.radians(np.asarray(longitudes, dtype=np.float64))
+    lat0 = math.radians(latitude)
+    lon0 = math.radians(longitude)
+
+    a = np.sin((lats - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def within_radius(
+    latitude: float,
+    longitude: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    radius_km: float,
+    prefilter: bool = True
+) -> List[Tuple[int, float]]:
+    """Индексы точек в радиусе и расстояния до них, по возрастанию расстояния: [(index, km)]
+
+    prefilter отсекает точки вне ограничивающего прямоугольника до расчета
+    тригонометрии - это дешевые сравнения и заметный выигрыш на больших выборках.
+    """
+    if not NUMPY_AVAILABLE:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        found = []
+        for index, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+            if prefilter and not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                continue
+            distance = haversine_km(latitude, longitude, lat, lon)
+            if distance <= radius_km:
+                found.append((index, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    lats = np.asarray(latitudes, dtype=np.float64)
+    lons = np.asarray(longitudes, dtype=np.float64)
+    indices = np.arange(lats.shape[0])
+
+    if prefilter:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        mask = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        indices = indices[mask]
+        lats = lats[mask]
+        lons = lons[mask]
+
+    distances = haversine_many(latitude, longitude, lats, lons)
+    inside = distances <= radius_km
+    indices = indices[inside]
+    distances = distances[inside]
+
+    order = np.argsort(distances, kind='stable')
+    return [(int(indices[i]), float(distances[i])) for i in order]
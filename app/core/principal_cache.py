@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+import threading
+import time
+
+from app.core.config import settings
+
+# Время жизни записи, секунды: блокировка без явной инвалидации вступит в силу не позже
+PRINCIPAL_CACHE_TTL_SECONDS = 60.0
+PRINCIPAL_CACHE_MAX_SIZE = 1024
+
+
+class PrincipalCache:
+    """TTL + LRU кеш аутентифицированных пользователей по токену.
+
+    Запись живет не дольше ttl и не дольше срока действия самого токена.
+    Записи индексируются также по id пользователя, чтобы блокировка или
+    удаление аккаунта сразу выбивали все его токены.
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_MAX_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # token -> (expires_at, subject_id, principal)
+        self._entries: "OrderedDict[str, Tuple[float, Any, Any]]" = OrderedDict()
+        # subject_id -> множество токенов
+        self._subjects: Dict[Any, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._pop(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, token: str, subject_id: Any, principal: Any, token_expires_at: float = None):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+
+        with self._lock:
+            if token in self._entries:
+                self._pop(token)
+            self._entries[token] = (expires_at, subject_id, principal)
+            self._subjects.setdefault(subject_id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate_subject(self, subject_id: Any):
+        """Удалить все записи пользователя"""
+        with self._lock:
+            for token in list(self._subjects.get(subject_id, ())):
+                self._pop(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._subjects.clear()
+
+    def _pop(self, token: str):
+        _, subject_id, _ = self._entries.pop(token)
+        tokens = self._subjects.get(subject_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._subjects[subject_id]
+
+    def get_stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Кеш диспетчеров для middleware авторизации /disp/. Инвалидация при блокировке
+# локальна для процесса, поэтому с несколькими воркерами (WS_BROKER_URL) кеш выключен
+dispatcher_principal_cache = PrincipalCache(ttl=0.0 if settings.multi_worker else PRINCIPAL_CACHE_TTL_SECONDS)
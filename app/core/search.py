@@ -0,0 +1,65 @@
+from typing import List, Optional
+import re
+
+# Замены для поиска по кириллице: ё/е и й/и не различаются, твердый и мягкий знаки пропускаются
+CYRILLIC_REPLACEMENTS = {'ё': 'е', 'й': 'и', 'ъ': '', 'ь': ''}
+# Разделитель полей в drivers.search_text: запрос с ним не совпадет на стыке полей
+FIELD_SEPARATOR = "|"
+# Экранирующий символ LIKE: передается в .like(pattern, escape=LIKE_ESCAPE)
+LIKE_ESCAPE = "\\"
+
+_WHITESPACE = re.compile(r'\s+')
+_PHONE_QUERY = re.compile(r'^[\d\s+()\-]+$')
+
+
+def normalize_search_text(text: Optional[str]) -> str:
+    """Нижний регистр, замены CYRILLIC_REPLACEMENTS, одиночные пробелы"""
+    if not text:
+        return ""
+    normalized = text.lower()
+    for old, new in CYRILLIC_REPLACEMENTS.items():
+        normalized = normalized.replace(old, new)
+    return _WHITESPACE.sub(' ', normalized).replace(FIELD_SEPARATOR, ' ').strip()
+
+
+def _compact(text: str) -> str:
+    return text.replace(' ', '').replace('-', '')
+
+
+def driver_search_text(first_name, last_name, call_sign=None, phone_number=None, car_number=None) -> str:
+    """Значение drivers.search_text: Ф.И. в обоих порядках, позывной, цифры телефона, госномер без пробелов"""
+    first = normalize_search_text(first_name)
+    last = normalize_search_text(last_name)
+    parts = [
+        f"{first} {last}".strip(),
+        f"{last} {first}".strip(),
+        normalize_search_text(call_sign),
+        ''.join(filter(str.isdigit, phone_number or '')),
+        _compact(normalize_search_text(car_number)),
+    ]
+    return FIELD_SEPARATOR.join(parts)
+
+
+def escape_like(text: str) -> str:
+    """Экранировать %, _ и сам LIKE_ESCAPE: символы запроса ищутся буквально"""
+    for char in (LIKE_ESCAPE, '%', '_'):
+        text = text.replace(char, LIKE_ESCAPE + char)
+    return text
+
+
+def search_patterns(query: str) -> List[str]:
+    """LIKE шаблоны для поиска по drivers.search_text (с экранированием, escape=LIKE_ESCAPE)"""
+    normalized = normalize_search_text(query)
+    if not normalized:
+        return []
+    if _PHONE_QUERY.match(normalized):
+        # Телефон или номер машины из цифр: "+996 555-12" -> "99655512"
+        digits = ''.join(filter(str.isdigit, normalized))
+        return [f"%{digits}%"] if digits else []
+
+    patterns = [f"%{escape_like(normalized)}%"]
+    compact = _compact(normalized)
+    if compact != normalized:
+        # "01 kg 123" совпадет с госномером, сохраненным без пробелов
+        patterns.append(f"%{escape_like(compact)}%")
+    return patterns
@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import AsyncGenerator
+
+from app.database.bootstrap import create_app_async_engine, to_async_url
+from app.database.session import SQLALCHEMY_DATABASE_URL
+
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_app_async_engine(ASYNC_DATABASE_URL)
+
+# expire_on_commit=False: после commit объекты читаются без повторного запроса
+# (ленивые загрузки в асинхронной сессии невозможны)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,139 @@
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+# PRAGMA для каждого нового соединения SQLite
+SQLITE_PRAGMAS = (
+    # Читатели не блокируют писателя и наоборот
+    ("journal_mode", "WAL"),
+    # В WAL режиме NORMAL не теряет целостность, но не делает fsync на каждый коммит
+    ("synchronous", "NORMAL"),
+    # Ждать освобождения блокировки вместо немедленного "database is locked", мс
+    ("busy_timeout", 5000),
+    # 256 МБ файла БД читаются через mmap
+    ("mmap_size", 268435456),
+    # Кеш страниц ~64 МБ (отрицательное значение - в КиБ)
+    ("cache_size", -64000),
+    ("temp_store", "MEMORY"),
+)
+
+# Настройки пула по типу БД
+POOL_SETTINGS = {
+    # Файл SQLite: писатель все равно один, большой пул только добавляет конкуренцию
+    # за блокировку; pre_ping для локального файла не нужен
+    "sqlite": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+    },
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    },
+}
+
+
+# Синхронные и асинхронные драйверы по типу БД: DATABASE_URL можно задать в любом виде
+SYNC_DRIVERS = {
+    "sqlite": "sqlite",
+    "postgresql": "postgresql+psycopg2",
+}
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# Размер пачки для построчной выборки больших таблиц
+STREAM_BATCH_SIZE = 1000
+
+
+def _with_driver(url: str, drivers: dict) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"Неподдерживаемая БД: {backend}")
+    return parsed.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+def to_sync_url(url: str) -> str:
+    """sqlite+aiosqlite:///... -> sqlite:///..., postgresql(+asyncpg)://... -> postgresql+psycopg2://..."""
+    return _with_driver(url, SYNC_DRIVERS)
+
+
+def to_async_url(url: str) -> str:
+    """sqlite:///... -> sqlite+aiosqlite:///..., postgresql(+psycopg2)://... -> postgresql+asyncpg://..."""
+    return _with_driver(url, ASYNC_DRIVERS)
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url: str) -> dict:
+    """Аргументы create_engine для URL: пул и параметры соединения по типу БД"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+
+    if backend == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if parsed.database in (None, "", ":memory:"):
+            # БД в памяти существует только внутри одного соединения
+            options["poolclass"] = StaticPool
+            return options
+        options.update(POOL_SETTINGS["sqlite"])
+        return options
+
+    return dict(POOL_SETTINGS.get(backend, {}))
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine: Engine) -> Engine:
+    """Навесить PRAGMA на новые соединения SQLite (для остальных БД ничего не делает)"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+
+def stream_query(query, batch_size: int = STREAM_BATCH_SIZE):
+    """Построчная выборка: на PostgreSQL - серверный курсор (stream_results),
+    строки приходят пачками по batch_size, а не всей таблицей в память"""
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def lock_table_for_rebuild(session, table):
+    """Заблокировать запись в таблицу агрегатов до чтения исходных строк пересчета.
+
+    Пересчет читает orders и заменяет строки агрегатов; инкременты из других
+    транзакций между чтением и записью потерялись бы. PostgreSQL: режим SHARE ROW
+    EXCLUSIVE конфликтует с ROW EXCLUSIVE инкрементов - они ждут конца пересчета,
+    а уже закоммиченные пересчет видит. SQLite: пустой UPDATE сразу берет блокировку
+    записи (ожидая busy_timeout), а не повышает блокировку чтения посреди транзакции.
+    """
+    dialect = session.get_bind().dialect
+    name = dialect.identifier_preparer.format_table(table)
+    if dialect.name == "postgresql":
+        session.execute(text(f"LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE"))
+    elif dialect.name == "sqlite":
+        session.execute(text(f"UPDATE {name} SET rowid = rowid WHERE 1 = 0"))
+
+
+def create_app_engine(url: str, **overrides) -> Engine:
+    return configure_engine(create_engine(url, **{**engine_options(url), **overrides}))
+
+
+def create_app_async_engine(url: str, **overrides) -> AsyncEngine:
+    engine = create_async_engine(url, **{**engine_options(url), **overrides})
+    configure_engine(engine.sync_engine)
+    return engine
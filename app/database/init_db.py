@@ -1,20 +1,64 @@
-from app.database.session import engine, SessionLocal
+import os
+
+from app.database.session import Base, engine, SessionLocal
 from app.models.superadmin import SuperAdmin
 from app.models.driver import Driver
 from app.models.order import Order
 from app.models.taxipark import TaxiPark
 from app.models.administrator import Administrator
 from app.models.transaction import DriverTransaction
+from app.models.sms_code import SmsCode
+from app.models.order_counter import OrderStatusCounter
+from app.models.order_rollup import OrderRollup
+from app.models.photo_verification import PhotoVerification
+from app.models.client import Client
 from app.core.security import get_password_hash
 
+# Все таблицы приложения; create_all упорядочит их по внешним ключам
+TABLES = [
+    model.__table__ for model in (
+        SuperAdmin, TaxiPark, Administrator, Driver, Client, Order, DriverTransaction,
+        PhotoVerification, SmsCode, OrderStatusCounter, OrderRollup
+    )
+]
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def upgrade_schema():
+    """Применить миграции alembic (индексы, новые колонки) к существующей БД.
+
+    Шаг деплоя, а не импорта приложения: python init_db.py или alembic upgrade head.
+    """
+    from alembic import command
+
+    command.upgrade(_alembic_config(), "head")
+
+def check_schema_version():
+    """Предупредить, если миграции не применены (схема старее моделей)"""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    if current != head:
+        print(f"⚠️ Схема БД на ревизии {current}, последняя - {head}: выполните python init_db.py (alembic upgrade head)")
+
 def init_database():
-    # Создаем все таблицы
-    SuperAdmin.__table__.create(bind=engine, checkfirst=True)
-    Driver.__table__.create(bind=engine, checkfirst=True)
-    Order.__table__.create(bind=engine, checkfirst=True)
-    TaxiPark.__table__.create(bind=engine, checkfirst=True)
-    Administrator.__table__.create(bind=engine, checkfirst=True)
-    DriverTransaction.__table__.create(bind=engine, checkfirst=True)
+    # Создаем все таблицы, которых еще нет
+    Base.metadata.create_all(bind=engine, tables=TABLES, checkfirst=True)
+
+    # Существующие таблицы не меняются - новые колонки и индексы приходят миграциями,
+    # которые применяются отдельным шагом (upgrade_schema), а не при импорте приложения
+    check_schema_version()
 
     db = SessionLocal()
 
@@ -36,7 +80,7 @@ def init_database():
             print("✅ Суперадмин 'Alexander' уже существует!")
 
         print("✅ База данных инициализирована успешно!")
-        print("📊 Созданы таблицы: superadmins, drivers, orders, taxiparks, administrators, transactions")
+        print(f"📊 Таблицы: {', '.join(table.name for table in TABLES)}")
 
     except Exception as e:
         print(f"❌ Ошибка при инициализации БД: {e}")
@@ -46,3 +90,4 @@ def init_database():
 
 if __name__ == "__main__":
     init_database()
+    upgrade_schema()
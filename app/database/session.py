@@ -1,21 +1,15 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from typing import Generator
 
 from app.core.config import settings
+from app.database.bootstrap import create_app_engine, to_sync_url
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./taxi_admin.db"
+# DATABASE_URL из config/.env; асинхронный драйвер в URL заменяется на синхронный
+SQLALCHEMY_DATABASE_URL = to_sync_url(settings.DATABASE_URL)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    pool_size=20,
-    max_overflow=30,
-    pool_timeout=60,
-    pool_recycle=3600,
-    pool_pre_ping=True
-)
+# Пул и PRAGMA (WAL, busy_timeout, ...) подбираются по типу БД в app/database/bootstrap.py
+engine = create_app_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
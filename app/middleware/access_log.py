@@ -0,0 +1,135 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+import json
+import logging
+import queue
+import random
+import sys
+import time
+
+access_logger = logging.getLogger("app.access")
+
+# Поля, значения которых никогда не попадают в лог
+REDACTED_FIELDS = {
+    "password", "new_password", "old_password", "hashed_password",
+    "token", "access_token", "refresh_token", "fcm_token", "authorization",
+    "code", "sms_code", "secret", "card_number", "cvv",
+}
+REDACTED_VALUE = "***"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_access_logging(stream=None) -> QueueListener:
+    """Вывод access-лога через очередь: обработчик запроса только кладет запись в очередь,
+    а запись в поток выполняет отдельный поток QueueListener"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter("%(message)s"))
+
+    access_logger.addHandler(QueueHandler(log_queue))
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    return _listener
+
+
+def stop_access_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: REDACTED_VALUE if str(key).lower() in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+class AccessLogMiddleware:
+    """Структурированный access-лог: метод, путь, статус, задержка, размеры тела.
+
+    Чистый ASGI middleware: тело запроса не буферизуется, а только
+    подсчитывается по мере чтения приложением, поэтому загрузки фото идут
+    потоком как раньше. Выборка JSON тел включается явно и пишет в лог
+    только первые max_body_bytes с замаскированными чувствительными полями.
+    """
+
+    def __init__(self, app, sample_json_bodies: bool = False, body_sample_rate: float = 0.01, max_body_bytes: int = 4096):
+        self.app = app
+        self.sample_json_bodies = sample_json_bodies
+        self.body_sample_rate = body_sample_rate
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {"status": None, "request_bytes": 0, "response_bytes": 0}
+        sample = self._should_sample(scope)
+        sampled_body = bytearray()
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                state["request_bytes"] += len(chunk)
+                if sample and len(sampled_body) < self.max_body_bytes:
+                    sampled_body.extend(chunk[:self.max_body_bytes - len(sampled_body)])
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            entry = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": state["status"] or 500,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "request_bytes": state["request_bytes"],
+                "response_bytes": state["response_bytes"],
+                "client": scope["client"][0] if scope.get("client") else None,
+            }
+            if sample and sampled_body:
+                body = self._redacted_body(bytes(sampled_body))
+                if body is not None:
+                    entry["body"] = body
+            access_logger.info(json.dumps(entry, ensure_ascii=False))
+
+    def _should_sample(self, scope) -> bool:
+        if not self.sample_json_bodies or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"content-type":
+                if not value.startswith(b"application/json"):
+                    return False
+                return random.random() < self.body_sample_rate
+        return False
+
+    def _redacted_body(self, body: bytes) -> Optional[Any]:
+        try:
+            return redact(json.loads(body))
+        except ValueError:
+            # Тело обрезано по max_body_bytes или не JSON - не логируем
+            return None
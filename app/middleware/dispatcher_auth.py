@@ -1,43 +1,59 @@
 from fastapi import Request, HTTPException, status
 from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import joinedload
 from app.core.security import verify_token
-from sqlalchemy.orm import Session
-from app.database.session import get_db
+from app.core.principal_cache import dispatcher_principal_cache
+from app.database.session import SessionLocal
 from app.models.administrator import Administrator
 
+def load_dispatcher(token: str) -> Administrator:
+    """Проверить токен и загрузить диспетчера (с таксопарком) в отсоединенный объект"""
+    payload = verify_token(token)
+    if not payload or payload.get('role') != 'dispatcher':
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный тип токена"
+        )
+
+    db = SessionLocal()
+    try:
+        # Таксопарк подгружаем сразу: шаблоны читают dispatcher.taxipark.name уже без сессии
+        administrator = db.query(Administrator).options(
+            joinedload(Administrator.taxipark)
+        ).filter(Administrator.id == payload.get('sub')).first()
+
+        if not administrator or not administrator.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Аккаунт неактивен"
+            )
+
+        db.expunge_all()
+    finally:
+        db.close()
+
+    dispatcher_principal_cache.put(token, administrator.id, administrator, payload.get('exp'))
+    return administrator
+
 async def check_dispatcher_auth(request: Request, call_next):
     # Пропускаем маршруты авторизации и статические файлы
-    if (request.url.path.startswith('/disp/') and 
-        not request.url.path.startswith('/disp/auth') and 
+    if (request.url.path.startswith('/disp/') and
+        not request.url.path.startswith('/disp/auth') and
         not request.url.path.startswith('/static/')):
-        
+
         token = request.cookies.get('dispatcher_token') or request.headers.get('authorization', '').replace('Bearer ', '')
-        
+
         if not token:
             return RedirectResponse(url='/disp/auth/login', status_code=302)
-        
+
         try:
-            payload = verify_token(token)
-            if payload.get('role') != 'dispatcher':
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Неверный тип токена"
-                )
-            
-            db = next(get_db())
-            administrator = db.query(Administrator).filter(Administrator.id == payload.get('sub')).first()
-            
-            if not administrator or not administrator.is_active:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Аккаунт неактивен"
-                )
-            
+            administrator = dispatcher_principal_cache.get(token) or load_dispatcher(token)
+
             request.state.dispatcher = administrator
             request.state.taxipark_id = administrator.taxipark_id
-            
+
         except Exception as e:
             return RedirectResponse(url='/disp/auth/login', status_code=302)
-    
+
     response = await call_next(request)
     return response
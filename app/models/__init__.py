@@ -1,9 +1,12 @@
 from .superadmin import SuperAdmin
 from .driver import Driver
 from .order import Order
+from .order_counter import OrderStatusCounter
+from .order_rollup import OrderRollup
 from .taxipark import TaxiPark
 from .administrator import Administrator
 from .photo_verification import PhotoVerification
 from .client import Client
+from .sms_code import SmsCode
 
-__all__ = ["SuperAdmin", "Driver", "Order", "TaxiPark", "Administrator", "PhotoVerification", "Client"]
+__all__ = ["SuperAdmin", "Driver", "Order", "OrderStatusCounter", "OrderRollup", "TaxiPark", "Administrator", "PhotoVerification", "Client", "SmsCode"]
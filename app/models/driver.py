@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.session import Base
+from app.core.search import driver_search_text
 
 class Driver(Base):
     __tablename__ = "drivers"
@@ -40,6 +41,15 @@ class Driver(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Нормализованные Ф.И.О, позывной, телефон и госномер для поиска (app/core/search.py),
+    # обновляется при каждом сохранении водителя
+    search_text = Column(String, nullable=True)
+    
+    __table_args__ = (
+        # Поиск в пределах таксопарка; на PostgreSQL дополнительно триграммный индекс (миграция 0003)
+        Index("ix_drivers_taxipark_search", "taxipark_id", "search_text"),
+    )
+    
     # Связи
     orders = relationship("Order", back_populates="driver")
     taxipark = relationship("TaxiPark", back_populates="drivers")
@@ -74,3 +84,11 @@ class Driver(Base):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+@event.listens_for(Driver, "before_insert")
+@event.listens_for(Driver, "before_update")
+def _update_search_text(mapper, connection, driver):
+    driver.search_text = driver_search_text(
+        driver.first_name, driver.last_name, driver.call_sign, driver.phone_number, driver.car_number
+    )
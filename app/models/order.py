@@ -1,8 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, JSON, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, JSON, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.session import Base
 
+# Названия статусов заказа на русском
+ORDER_STATUS_LABELS = {
+    'received': 'Получен',
+    'accepted': 'Принят',
+    'navigating_to_a': 'Едет к точке А',
+    'arrived_at_a': 'Прибыл в точку А',
+    'navigating_to_b': 'Едет к точке Б',
+    'completed': 'Выполнен',
+    'cancelled': 'Отменен',
+    'rejected_by_driver': 'Отклонен водителем',
+    'in_progress': 'Выполняется'
+}
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -37,12 +51,14 @@ class Order(Base):
     # Тариф и оплата
     tariff = Column(String, nullable=True)  # Эконом, Комфорт, Бизнес
     payment_method = Column(String, nullable=True)  # cash, card, online
+    commission = Column(Float, nullable=True)  # Комиссия таксопарка, списанная с водителя при принятии заказа
     
     # Примечания
     notes = Column(Text, nullable=True)
     
     # Временные метки
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Время приложения, как у completed_at; before_flush проставляет его явно (stamp_created_at)
+    created_at = Column(DateTime(timezone=True), default=datetime.now, server_default=func.now())
     accepted_at = Column(DateTime(timezone=True), nullable=True)
     arrived_at_a = Column(DateTime(timezone=True), nullable=True)
     started_to_b = Column(DateTime(timezone=True), nullable=True)
@@ -52,64 +68,32 @@ class Order(Base):
     # Связи
     driver = relationship("Driver", back_populates="orders")
 
+    # Индексы горячих запросов (миграция alembic/versions/0001_hot_query_indexes.py)
+    __table_args__ = (
+        # Счетчики по статусам таксопарка
+        Index("ix_orders_taxipark_status", "taxipark_id", "status"),
+        # Лента заказов диспетчера: новые сверху
+        Index("ix_orders_taxipark_created", taxipark_id, created_at.desc()),
+        # Заказы и статистика водителя
+        Index("ix_orders_driver_status_created", "driver_id", "status", "created_at"),
+    )
+
     def __repr__(self):
         return f"<Order(id={self.id}, order_number={self.order_number}, status={self.status})>"
 
     def get_status_display(self):
         """Получить статус на русском языке"""
-        status_map = {
-            'received': 'Получен',
-            'accepted': 'Принят',
-            'navigating_to_a': 'Едет к точке А',
-            'arrived_at_a': 'Прибыл в точку А',
-            'navigating_to_b': 'Едет к точке Б',
-            'completed': 'Выполнен',
-            'cancelled': 'Отменен',
-            'rejected_by_driver': 'Отклонен водителем',
-            'in_progress': 'Выполняется'
-        }
-        return status_map.get(self.status, self.status)
+        return ORDER_STATUS_LABELS.get(self.status, self.status)
 
     def get_driver_display_name(self):
         """Получить отображаемое имя водителя (позывной или ФИО)"""
         if not self.driver:
             return "Не назначен"
         
-        # Если есть позывной, используем его
-        if self.driver.call_sign and self.driver.call_sign.strip():
-            return self.driver.call_sign.strip()
-        
-        # Иначе используем ФИО
-        return f"{self.driver.first_name} {self.driver.last_name}".strip()
+        from app.services.order_serializer import driver_display_name
+        return driver_display_name(self.driver.first_name, self.driver.last_name, self.driver.call_sign)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "order_number": self.order_number,
-            "client_name": self.client_name,
-            "client_phone": self.client_phone,
-            "pickup_address": self.pickup_address,
-            "pickup_latitude": self.pickup_latitude,
-            "pickup_longitude": self.pickup_longitude,
-            "destination_address": self.destination_address,
-            "destination_latitude": self.destination_latitude,
-            "destination_longitude": self.destination_longitude,
-            "price": self.price,
-            "distance": self.distance,
-            "duration": self.duration,
-            "status": self.status,
-            "status_display": self.get_status_display(),
-            "driver_id": self.driver_id,
-            "driver_name": f"{self.driver.first_name} {self.driver.last_name}" if self.driver else None,
-            "driver_display_name": self.get_driver_display_name(),
-            "driver_phone": self.driver.phone_number if self.driver else None,
-            "tariff": self.tariff,
-            "payment_method": self.payment_method,
-            "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "accepted_at": self.accepted_at.isoformat() if self.accepted_at else None,
-            "arrived_at_a": self.arrived_at_a.isoformat() if self.arrived_at_a else None,
-            "started_to_b": self.started_to_b.isoformat() if self.started_to_b else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
-            "cancelled_at": self.cancelled_at.isoformat() if self.cancelled_at else None
-        }
+        # Формат и кэширование - app/services/order_serializer.py
+        from app.services.order_serializer import serialize_order
+        return serialize_order(self)
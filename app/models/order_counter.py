@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, event, inspect, select, update
+from sqlalchemy.orm import Session
+from app.database.session import Base
+from app.models.order import Order
+
+class OrderStatusCounter(Base):
+    """Количество заказов таксопарка по статусу и дню создания заказа.
+
+    Поддерживается в той же транзакции, что и изменения заказов (before_flush ниже),
+    поэтому статистика диспетчерской читается без COUNT(*) по orders.
+    Пересчет из orders: app/services/order_counters.py
+    """
+    __tablename__ = "order_status_counters"
+
+    taxipark_id = Column(Integer, ForeignKey("taxiparks.id"), primary_key=True)
+    status = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<OrderStatusCounter(taxipark_id={self.taxipark_id}, status={self.status}, day={self.day}, count={self.count})>"
+
+
+# Статус нового заказа, если он не задан явно (Order.status default)
+DEFAULT_ORDER_STATUS = "received"
+_KEY_ATTRIBUTES = ("taxipark_id", "status", "created_at")
+
+
+def stamp_created_at(order: Order):
+    """Проставить created_at новому заказу до вставки.
+
+    Ключ счетчика и сама строка должны получить одно время приложения (datetime.now(),
+    как и completed_at); server_default now() на SQLite дает UTC.
+    """
+    if order.created_at is None:
+        order.created_at = datetime.now()
+
+
+def order_day(created_at) -> date:
+    # created_at пуст только у строк, вставленных в обход ORM
+    if created_at is None:
+        return date.today()
+    if isinstance(created_at, datetime):
+        return created_at.date()
+    return created_at
+
+
+def _counter_key(taxipark_id, status, created_at):
+    return (taxipark_id, status or DEFAULT_ORDER_STATUS, order_day(created_at))
+
+
+def _previous_key(connection, order: Order):
+    """Ключ счетчика заказа до изменений в этом flush"""
+    state = inspect(order)
+    values = {}
+    for name in _KEY_ATTRIBUTES:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        elif not history.added:
+            values[name] = getattr(order, name)
+        else:
+            # Старое значение не было загружено до присваивания - берем из БД (flush еще не выполнен)
+            row = connection.execute(
+                select(Order.taxipark_id, Order.status, Order.created_at).where(Order.id == order.id)
+            ).first()
+            if row is None:
+                return None
+            return _counter_key(*row)
+    return _counter_key(values["taxipark_id"], values["status"], values["created_at"])
+
+
+def _changed(order: Order) -> bool:
+    state = inspect(order)
+    return any(state.attrs[name].history.has_changes() for name in _KEY_ATTRIBUTES)
+
+
+def increment_row(connection, table, key: dict, increments: dict):
+    """Прибавить increments к строке table с первичным ключом key (создать строку, если ее нет)"""
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        if connection.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(**key, **increments)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key],
+            set_={name: table.c[name] + statement.excluded[name] for name in increments}
+        ))
+        return
+
+    result = connection.execute(
+        update(table)
+        .where(*[table.c[name] == value for name, value in key.items()])
+        .values(**{name: table.c[name] + value for name, value in increments.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**key, **increments))
+
+
+def _upsert(connection, key, delta: int):
+    taxipark_id, status, day = key
+    increment_row(
+        connection, OrderStatusCounter.__table__,
+        {"taxipark_id": taxipark_id, "status": status, "day": day},
+        {"count": delta}
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _update_order_counters(session, flush_context, instances):
+    """Перенести изменения заказов (создание, смена статуса, удаление) в счетчики.
+
+    Выполняется до flush в той же транзакции: при откате заказа откатываются и счетчики.
+    Массовые query(Order).update() сюда не попадают - их исправит пересчет.
+    """
+    orders_new = [obj for obj in session.new if isinstance(obj, Order)]
+    orders_dirty = [obj for obj in session.dirty if isinstance(obj, Order) and _changed(obj)]
+    orders_deleted = [obj for obj in session.deleted if isinstance(obj, Order)]
+    if not (orders_new or orders_dirty or orders_deleted):
+        return
+
+    connection = session.connection()
+    deltas = defaultdict(int)
+
+    for order in orders_new:
+        stamp_created_at(order)
+        deltas[_counter_key(order.taxipark_id, order.status, order.created_at)] += 1
+
+    for order in orders_dirty:
+        previous = _previous_key(connection, order)
+        current = _counter_key(order.taxipark_id, order.status, order.created_at)
+        if previous != current:
+            if previous is not None:
+                deltas[previous] -= 1
+            deltas[current] += 1
+
+    for order in orders_deleted:
+        previous = _previous_key(connection, order)
+        if previous is not None:
+            deltas[previous] -= 1
+
+    # Одинаковый порядок блокировок строк счетчиков во всех транзакциях
+    changes = sorted((key, delta) for key, delta in deltas.items() if delta and key[0] is not None)
+    for key, delta in changes:
+        _upsert(connection, key, delta)
@@ -0,0 +1,189 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, event, inspect, select
+from sqlalchemy.orm import Session
+from app.database.session import Base
+from app.models.order import Order
+from app.models.order_counter import DEFAULT_ORDER_STATUS, increment_row, stamp_created_at
+
+class OrderRollup(Base):
+    """Агрегаты заказов по часам и дням для аналитики.
+
+    Строка - заказы одного таксопарка, водителя, тарифа и статуса, созданные в
+    одном часе (granularity="hour") или дне ("day"). Поддерживается в той же
+    транзакции, что и изменения заказов (before_flush ниже); диапазонные запросы и
+    пересчет из orders: app/services/order_rollups.py
+    """
+    __tablename__ = "order_rollups"
+
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # Начало часа или дня
+    taxipark_id = Column(Integer, primary_key=True)
+    driver_id = Column(Integer, primary_key=True)  # NO_DRIVER - заказ без водителя
+    tariff = Column(String, primary_key=True)  # NO_TARIFF - тариф не указан
+    status = Column(String, primary_key=True)
+
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    commission = Column(Float, nullable=False, default=0.0)
+    # Сумма длительностей (created_at -> completed_at) и число заказов, по которым она посчитана
+    completion_seconds = Column(Float, nullable=False, default=0.0)
+    completion_samples = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Аналитика таксопарка за период
+        Index("ix_order_rollups_taxipark_bucket", "granularity", "taxipark_id", "bucket"),
+        # Статистика водителя за период
+        Index("ix_order_rollups_driver_bucket", "granularity", "driver_id", "bucket"),
+    )
+
+    def __repr__(self):
+        return f"<OrderRollup({self.granularity} {self.bucket}, taxipark_id={self.taxipark_id}, driver_id={self.driver_id}, tariff={self.tariff}, status={self.status}, orders={self.orders})>"
+
+
+GRANULARITIES = ("hour", "day")
+# Значения ключа вместо NULL (колонки первичного ключа не допускают NULL)
+NO_DRIVER = 0
+NO_TARIFF = ""
+# Поля заказа, от которых зависит его вклад в агрегаты
+ROLLUP_ATTRIBUTES = ("taxipark_id", "driver_id", "tariff", "status", "price", "commission", "created_at", "completed_at")
+KEY_COLUMNS = ("granularity", "bucket", "taxipark_id", "driver_id", "tariff", "status")
+MEASURES = ("orders", "revenue", "commission", "completion_seconds", "completion_samples")
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def order_contributions(values: dict):
+    """Вклад заказа (значения ROLLUP_ATTRIBUTES) в агрегаты: [(ключ, (значения MEASURES))]"""
+    if values["taxipark_id"] is None:
+        return []
+    created_at = values["created_at"]
+    if created_at is None:
+        # created_at пуст только у строк, вставленных в обход ORM (новым заказам его
+        # проставляет stamp_created_at тем же временем приложения, что и completed_at)
+        created_at = datetime.now()
+    if isinstance(created_at, datetime) and created_at.tzinfo is not None:
+        created_at = created_at.replace(tzinfo=None)
+
+    completed_at = values["completed_at"]
+    completion_seconds, completion_samples = 0.0, 0
+    if completed_at is not None and values["created_at"] is not None:
+        if completed_at.tzinfo is not None:
+            completed_at = completed_at.replace(tzinfo=None)
+        completion_seconds, completion_samples = max((completed_at - created_at).total_seconds(), 0.0), 1
+
+    measures = (1, values["price"] or 0.0, values["commission"] or 0.0, completion_seconds, completion_samples)
+    return [
+        (
+            (
+                granularity,
+                bucket_start(created_at, granularity),
+                values["taxipark_id"],
+                values["driver_id"] or NO_DRIVER,
+                values["tariff"] or NO_TARIFF,
+                values["status"] or DEFAULT_ORDER_STATUS,
+            ),
+            measures,
+        )
+        for granularity in GRANULARITIES
+    ]
+
+
+def add_contributions(totals, contributions, sign: int = 1):
+    for key, measures in contributions:
+        current = totals[key]
+        for index, value in enumerate(measures):
+            current[index] += sign * value
+
+
+def new_totals():
+    return defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+
+
+def _current_values(order: Order) -> dict:
+    return {name: getattr(order, name) for name in ROLLUP_ATTRIBUTES}
+
+
+def _previous_values(connection, order: Order):
+    """Значения ROLLUP_ATTRIBUTES до изменений в этом flush"""
+    state = inspect(order)
+    values = {}
+    for name in ROLLUP_ATTRIBUTES:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        elif not history.added:
+            values[name] = getattr(order, name)
+        else:
+            # Старое значение не было загружено до присваивания - берем из БД (flush еще не выполнен)
+            row = connection.execute(
+                select(*[getattr(Order, column) for column in ROLLUP_ATTRIBUTES]).where(Order.id == order.id)
+            ).first()
+            return dict(row._mapping) if row is not None else None
+    return values
+
+
+def _changed(order: Order) -> bool:
+    state = inspect(order)
+    return any(state.attrs[name].history.has_changes() for name in ROLLUP_ATTRIBUTES)
+
+
+@event.listens_for(Session, "before_flush")
+def _update_order_rollups(session, flush_context, instances):
+    """Перенести изменения заказов в часовые и дневные агрегаты.
+
+    Как и счетчики order_status_counters: в той же транзакции, массовые
+    query(Order).update() исправляет пересчет (OrderRollupService.rebuild).
+    """
+    orders_new = [obj for obj in session.new if isinstance(obj, Order)]
+    orders_dirty = [obj for obj in session.dirty if isinstance(obj, Order) and _changed(obj)]
+    orders_deleted = [obj for obj in session.deleted if isinstance(obj, Order)]
+    if not (orders_new or orders_dirty or orders_deleted):
+        return
+
+    connection = session.connection()
+    totals = new_totals()
+
+    for order in orders_new:
+        stamp_created_at(order)
+        add_contributions(totals, order_contributions(_current_values(order)))
+
+    for order in orders_dirty:
+        previous = _previous_values(connection, order)
+        if previous is not None:
+            add_contributions(totals, order_contributions(previous), sign=-1)
+        add_contributions(totals, order_contributions(_current_values(order)))
+
+    for order in orders_deleted:
+        previous = _previous_values(connection, order)
+        if previous is not None:
+            add_contributions(totals, order_contributions(previous), sign=-1)
+
+    table = OrderRollup.__table__
+    # Одинаковый порядок блокировок строк во всех транзакциях
+    for key, measures in sorted(totals.items()):
+        if not any(measures):
+            continue
+        increment_row(connection, table, dict(zip(KEY_COLUMNS, key)), dict(zip(MEASURES, measures)))
+
+
+def rollup_totals(rows):
+    """Агрегаты из строк заказов (отображения со значениями ROLLUP_ATTRIBUTES) - для пересчета"""
+    totals = new_totals()
+    for row in rows:
+        add_contributions(totals, order_contributions(row))
+    return totals
+
+
+def totals_to_mappings(totals):
+    return [
+        {**dict(zip(KEY_COLUMNS, key)), **dict(zip(MEASURES, measures))}
+        for key, measures in totals.items()
+        if measures[0]
+    ]
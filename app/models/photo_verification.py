@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.session import Base
@@ -30,6 +30,13 @@ class PhotoVerification(Base):
     # Связи
     driver = relationship("Driver", back_populates="photo_verifications")
     
+    __table_args__ = (
+        # Заявки таксопарка по статусу (счетчик ожидающих фотоконтроля)
+        Index("ix_photo_verifications_taxipark_status", "taxipark_id", "status"),
+        # Последняя заявка водителя
+        Index("ix_photo_verifications_driver_created", "driver_id", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<PhotoVerification(id={self.id}, driver_id={self.driver_id}, status={self.status})>"
     
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy.sql import func
+from app.database.session import Base
+
+class SmsCode(Base):
+    """SMS коды мобильного приложения (раньше таблица создавалась через sqlite3 в api.py)"""
+    __tablename__ = "sms_codes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    phone_number = Column(String(20), nullable=False, index=True)
+    code = Column(String(10), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used = Column(Boolean, default=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SmsCode(id={self.id}, phone={self.phone_number}, used={self.used})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.session import Base
@@ -18,3 +18,8 @@ class DriverTransaction(Base):
     
     # Связь с водителем
     driver = relationship("Driver")
+
+    # История транзакций водителя: новые сверху
+    __table_args__ = (
+        Index("ix_transactions_driver_created", "driver_id", "created_at"),
+    )
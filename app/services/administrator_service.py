@@ -3,6 +3,7 @@ from app.models.administrator import Administrator
 from app.models.taxipark import TaxiPark
 from app.schemas.administrator import AdministratorCreate, AdministratorUpdate
 from app.core.security import get_password_hash
+from app.core.principal_cache import dispatcher_principal_cache
 from typing import List, Optional
 
 
@@ -89,6 +90,7 @@ class AdministratorService:
         
         db.commit()
         db.refresh(db_administrator)
+        dispatcher_principal_cache.invalidate_subject(administrator_id)
         
         # Обновляем количество администраторов в старом и новом таксопарке
         if old_taxipark_id != db_administrator.taxipark_id:
@@ -108,6 +110,7 @@ class AdministratorService:
         
         db.delete(db_administrator)
         db.commit()
+        dispatcher_principal_cache.invalidate_subject(administrator_id)
         
         # Обновляем количество администраторов в таксопарке
         AdministratorService._update_taxipark_admin_count(db, taxipark_id)
@@ -124,6 +127,8 @@ class AdministratorService:
         db_administrator.is_active = not db_administrator.is_active
         db.commit()
         db.refresh(db_administrator)
+        # Заблокированный диспетчер теряет доступ сразу, а не по истечении TTL кеша
+        dispatcher_principal_cache.invalidate_subject(administrator_id)
         
         return db_administrator
     
@@ -1,6 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.models.order import Order
+from sqlalchemy import func, case, select
 from app.models.driver import Driver
 from app.models.superadmin import SuperAdmin
 from datetime import datetime, timedelta
@@ -10,51 +9,41 @@ class AnalyticsService:
     
     @staticmethod
     def get_dashboard_stats(db: Session, days: int = 7) -> Dict[str, Any]:
-        """Получить статистику для дашборда за указанное количество дней"""
+        """Получить статистику для дашборда (заказы - из дневных агрегатов order_rollups)"""
+        from app.models.transaction import DriverTransaction
+        from app.services.order_rollups import OrderRollupService
         
         # Для dashboard показываем общую статистику за все время
         # Заказы за все время (все статусы кроме отмененных)
-        orders_query = db.query(Order).filter(Order.status != "cancelled")
+        orders = OrderRollupService.totals(db, exclude_statuses=("cancelled",))
         
-        completed_orders = orders_query.count()
-        total_earnings = orders_query.with_entities(func.sum(Order.price)).scalar() or 0.0
-        
-        # Водители
-        total_drivers = db.query(Driver).filter(Driver.is_active == True).count()
-        
-        # Пополнения водителей (симуляция - считаем водителей с балансом > 0)
-        driver_topups = db.query(Driver).filter(Driver.balance > 0).count()
-        
-        # Суперадмины
-        total_superadmins = db.query(SuperAdmin).filter(SuperAdmin.is_active == True).count()
+        topups = select(func.count(DriverTransaction.id)).where(DriverTransaction.type == "topup").scalar_subquery()
+        superadmins = select(func.count(SuperAdmin.id)).where(SuperAdmin.is_active == True).scalar_subquery()
+        row = db.execute(select(topups.label("topups"), superadmins.label("superadmins"))).one()
         
         return {
-            "orders_completed": int(completed_orders),  # Гарантируем int
-            "total_earnings": float(total_earnings),   # Гарантируем float
-            "driver_topups": int(driver_topups),       # Гарантируем int
-            "total_superadmins": int(total_superadmins), # Гарантируем int
+            "orders_completed": int(orders.orders),
+            "total_earnings": float(orders.revenue),
+            "driver_topups": int(row.topups),
+            "total_superadmins": int(row.superadmins),
             "period_days": int(days)
         }
     
     @staticmethod
     def get_orders_stats(db: Session, days: int = 7) -> Dict[str, Any]:
-        """Получить статистику по заказам"""
-        start_date = datetime.now() - timedelta(days=days)
+        """Получить статистику по выполненным заказам за период (из агрегатов order_rollups)"""
+        from app.services.order_rollups import OrderRollupService
         
-        orders = db.query(Order).filter(
-            and_(
-                Order.created_at >= start_date,
-                Order.status == "completed"
-            )
-        ).all()
+        start_date = datetime.now() - timedelta(days=days)
         
-        total_orders = len(orders)
-        total_earnings = sum(order.price for order in orders) if orders else 0
+        totals = OrderRollupService.totals(db, start=start_date, statuses=("completed",))
+        total_orders = int(totals.orders)
+        total_earnings = float(totals.revenue)
         avg_order_price = total_earnings / total_orders if total_orders > 0 else 0
         
         return {
-            "total_orders": int(total_orders),
-            "total_earnings": float(total_earnings),
+            "total_orders": total_orders,
+            "total_earnings": total_earnings,
             "avg_order_price": float(avg_order_price),
             "period_days": int(days)
         }
@@ -62,9 +51,11 @@ class AnalyticsService:
     @staticmethod
     def get_drivers_stats(db: Session) -> Dict[str, Any]:
         """Получить статистику по водителям"""
-        total_drivers = db.query(Driver).count()
-        active_drivers = db.query(Driver).filter(Driver.is_active == True).count()
-        total_balance = db.query(func.sum(Driver.balance)).scalar() or 0.0
+        total_drivers, active_drivers, total_balance = db.query(
+            func.count(Driver.id),
+            func.count(case((Driver.is_active == True, 1))),
+            func.coalesce(func.sum(Driver.balance), 0.0)
+        ).one()
         
         return {
             "total_drivers": int(total_drivers),
@@ -5,7 +5,6 @@ from app.models.taxipark import TaxiPark
 from app.models.driver import Driver
 from app.models.order import Order
 from app.models.administrator import Administrator
-import math
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,30 +14,9 @@ class DispatcherService:
     @staticmethod
     def get_taxipark_balance(db: Session, taxipark_id: int) -> float:
         """Получить общий баланс всех водителей таксопарка"""
-        from sqlalchemy import func
-        
-        # Считаем сумму балансов всех водителей в таксопарке
         total_balance = db.query(func.sum(Driver.balance)).filter(
             Driver.taxipark_id == taxipark_id
         ).scalar()
-        
-        # Отладочная информация
-        drivers_with_balance = db.query(Driver).filter(
-            Driver.taxipark_id == taxipark_id
-        ).all()
-        
-        print(f"🔍 DEBUG: Calculating total balance for taxipark {taxipark_id}")
-        individual_balances = []
-        for driver in drivers_with_balance:
-            balance = driver.balance if driver.balance else 0
-            individual_balances.append(balance)
-            print(f"🔍 DEBUG: Driver {driver.first_name} {driver.last_name}: {balance}")
-        
-        calculated_total = sum(individual_balances)
-        print(f"🔍 DEBUG: Individual balances: {individual_balances}")
-        print(f"🔍 DEBUG: SQL sum result: {total_balance}")
-        print(f"🔍 DEBUG: Calculated total: {calculated_total}")
-        
         return float(total_balance) if total_balance is not None else 0.0
     
     @staticmethod
@@ -54,17 +32,15 @@ class DispatcherService:
     
     @staticmethod
     def get_orders_count_by_status(db: Session, taxipark_id: int) -> dict:
-        """Получить количество заказов по статусам"""
-        total = db.query(Order).filter(Order.taxipark_id == taxipark_id).count()
-        completed = db.query(Order).filter(Order.taxipark_id == taxipark_id, Order.status == "completed").count()
-        cancelled = db.query(Order).filter(Order.taxipark_id == taxipark_id, Order.status == "cancelled").count()
-        in_progress = db.query(Order).filter(Order.taxipark_id == taxipark_id, Order.status == "in_progress").count()
+        """Получить количество заказов по статусам (из счетчиков order_status_counters)"""
+        from app.services.order_counters import OrderCounterService
         
+        counts = OrderCounterService.get_status_counts(db, taxipark_id)
         return {
-            "total": total,
-            "completed": completed,
-            "cancelled": cancelled,
-            "in_progress": in_progress
+            "total": sum(counts.values()),
+            "completed": counts.get("completed", 0),
+            "cancelled": counts.get("cancelled", 0),
+            "in_progress": counts.get("in_progress", 0)
         }
     
     @staticmethod
@@ -72,30 +48,63 @@ class DispatcherService:
         """Получить общее количество пополнений баланса"""
         from app.models.transaction import DriverTransaction
         
-        # Сначала посмотрим, есть ли вообще транзакции в базе
-        all_transactions_count = db.query(DriverTransaction).count()
-        print(f"🔍 DEBUG: Total transactions in database: {all_transactions_count}")
-        
-        # Посмотрим, какие типы транзакций есть
-        all_types = db.query(DriverTransaction.type).distinct().all()
-        print(f"🔍 DEBUG: All transaction types: {[t[0] for t in all_types]}")
-        
-        # Считаем все транзакции типа 'topup' для водителей данного таксопарка
-        total_topups = db.query(DriverTransaction).join(Driver).filter(
+        return db.query(func.count(DriverTransaction.id)).join(Driver).filter(
             Driver.taxipark_id == taxipark_id,
             DriverTransaction.type == 'topup'
-        ).count()
+        ).scalar() or 0
+    
+    @staticmethod
+    def get_dashboard_summary(db: Session, taxipark_id: int) -> dict:
+        """Баланс, число водителей, число пополнений и заказы по статусам одним запросом.
+        
+        Агрегаты собираются через UNION ALL строк (вид, ключ, значение), статусы
+        берутся из счетчиков order_status_counters
+        """
+        from app.models.transaction import DriverTransaction
+        from app.models.order_counter import OrderStatusCounter
+        from sqlalchemy import literal, null, union_all, select, cast, Float, String
         
-        print(f"🔍 DEBUG: Total topups for taxipark {taxipark_id}: {total_topups}")
+        def row(kind, key, value):
+            return (literal(kind).label("kind"), cast(key, String).label("key"), cast(value, Float).label("value"))
         
-        # Если нет пополнений, но есть другие транзакции, покажем их
-        if total_topups == 0 and all_transactions_count > 0:
-            all_taxipark_transactions = db.query(DriverTransaction).join(Driver).filter(
+        query = union_all(
+            select(*row("balance", null(), func.coalesce(func.sum(Driver.balance), 0))).where(
                 Driver.taxipark_id == taxipark_id
-            ).count()
-            print(f"🔍 DEBUG: Total transactions for taxipark {taxipark_id}: {all_taxipark_transactions}")
-        
-        return total_topups
+            ),
+            select(*row("drivers", null(), func.count(Driver.id))).where(
+                Driver.taxipark_id == taxipark_id
+            ),
+            select(*row("topups", null(), func.count(DriverTransaction.id))).join(
+                Driver, Driver.id == DriverTransaction.driver_id
+            ).where(
+                Driver.taxipark_id == taxipark_id,
+                DriverTransaction.type == 'topup'
+            ),
+            select(*row("status", OrderStatusCounter.status, func.sum(OrderStatusCounter.count))).where(
+                OrderStatusCounter.taxipark_id == taxipark_id
+            ).group_by(OrderStatusCounter.status),
+        )
+        
+        summary = {"balance": 0.0, "drivers_count": 0, "topups_count": 0, "orders_by_status": {}}
+        for kind, key, value in db.execute(query):
+            if kind == "balance":
+                summary["balance"] = float(value or 0)
+            elif kind == "drivers":
+                summary["drivers_count"] = int(value or 0)
+            elif kind == "topups":
+                summary["topups_count"] = int(value or 0)
+            elif value:
+                summary["orders_by_status"][key] = int(value)
+        
+        summary["orders_by_status"] = dict(sorted(summary["orders_by_status"].items()))
+        counts = summary["orders_by_status"]
+        summary["orders_stats"] = {
+            "total": sum(counts.values()),
+            "completed": counts.get("completed", 0),
+            "cancelled": counts.get("cancelled", 0),
+            "in_progress": counts.get("in_progress", 0)
+        }
+        return summary
     
     @staticmethod
     def get_topup_history(db: Session, taxipark_id: int, limit: int = 50) -> List:
@@ -111,22 +120,18 @@ class DispatcherService:
             DriverTransaction.type == 'topup'
         ).order_by(DriverTransaction.created_at.desc()).limit(limit).all()
         
-        print(f"🔍 DEBUG: Retrieved {len(topups)} topup transactions for taxipark {taxipark_id}")
-        
         return topups
     
     @staticmethod
     def get_dispatcher_stats(db: Session, taxipark_id: int) -> dict:
         """Получить статистику для диспетчерской"""
-        balance = DispatcherService.get_taxipark_balance(db, taxipark_id)
-        drivers_count = DispatcherService.get_drivers_count(db, taxipark_id)
-        orders_stats = DispatcherService.get_orders_count_by_status(db, taxipark_id)
+        summary = DispatcherService.get_dashboard_summary(db, taxipark_id)
         orders = DispatcherService.get_orders(db, taxipark_id)
         
         return {
-            "balance": balance,
-            "drivers_count": drivers_count,
-            "orders_stats": orders_stats,
+            "balance": summary["balance"],
+            "drivers_count": summary["drivers_count"],
+            "orders_stats": summary["orders_stats"],
             "orders": orders
         }
     
@@ -139,94 +144,21 @@ class DispatcherService:
         radius_km: float = 30.0
     ) -> Optional[Driver]:
         """Найти ближайшего свободного онлайн водителя в радиусе от точки"""
+        from app.services.driver_geo_index import driver_geo_index
         
-        logger.info(f"🔍 [DispatcherService] === START DRIVER SEARCH ===")
-        logger.info(f"🔍 [DispatcherService] Taxipark ID: {taxipark_id}")
-        logger.info(f"🔍 [DispatcherService] Pickup location: ({latitude}, {longitude})")
-        logger.info(f"🔍 [DispatcherService] Search radius: {radius_km} km")
-        
-        # Сначала получим ВСЕХ водителей таксопарка
-        all_drivers = db.query(Driver).filter(Driver.taxipark_id == taxipark_id).all()
-        logger.info(f"🔍 [DispatcherService] Total drivers in taxipark: {len(all_drivers)}")
+        driver_geo_index.ensure_loaded(db, taxipark_id)
+        candidates = driver_geo_index.within_radius(taxipark_id, float(latitude), float(longitude), radius_km)
         
-        for driver in all_drivers:
-            logger.info(f"🔍 [DispatcherService] Driver: {driver.first_name} {driver.last_name}")
-            logger.info(f"   - ID: {driver.id}")
-            logger.info(f"   - Phone: {driver.phone_number}")
-            logger.info(f"   - is_active: {driver.is_active}")
-            logger.info(f"   - online_status: {driver.online_status}")
-            logger.info(f"   - Location: ({driver.current_latitude}, {driver.current_longitude})")
-        
-        busy_driver_ids = db.query(Order.driver_id).filter(
-            Order.taxipark_id == taxipark_id,
-            Order.driver_id.isnot(None),
-            Order.status.in_(['accepted', 'navigating_to_a', 'arrived_at_a', 'navigating_to_b', 'in_progress'])
-        ).subquery()
-        
-        busy_ids_list = [row[0] for row in db.query(Order.driver_id).filter(
-            Order.taxipark_id == taxipark_id,
-            Order.driver_id.isnot(None),
-            Order.status.in_(['accepted', 'navigating_to_a', 'arrived_at_a', 'navigating_to_b', 'in_progress'])
-        ).all()]
-        logger.info(f"🔍 [DispatcherService] Busy driver IDs: {busy_ids_list}")
-        
-        available_drivers = db.query(Driver).filter(
-            Driver.taxipark_id == taxipark_id,
-            Driver.is_active == True,
-            Driver.online_status == 'online',
-            ~Driver.id.in_(busy_driver_ids)
-        ).all()
-        
-        logger.info(f"🔍 [DispatcherService] Available drivers after filtering: {len(available_drivers)}")
-        
-        if not available_drivers:
-            logger.info(f"❌ [DispatcherService] No available drivers found for taxipark {taxipark_id}")
-            return None
-        
-        def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            R = 6371.0
-            
-            lat1_rad = math.radians(lat1)
-            lon1_rad = math.radians(lon1)
-            lat2_rad = math.radians(lat2)
-            lon2_rad = math.radians(lon2)
+        for driver_id, distance in candidates:
+            driver = db.query(Driver).filter(Driver.id == driver_id).first()
             
-            dlat = lat2_rad - lat1_rad
-            dlon = lon2_rad - lon1_rad
-            
-            a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-            
-            distance = R * c
-            return distance
-        
-        nearest_driver = None
-        min_distance = float('inf')
-        
-        logger.info(f"🔍 [DispatcherService] Searching for drivers near ({latitude}, {longitude})")
-        logger.info(f"🔍 [DispatcherService] Found {len(available_drivers)} available drivers")
-        
-        for driver in available_drivers:
-            if driver.current_latitude is None or driver.current_longitude is None:
-                logger.info(f"⚠️ [DispatcherService] Driver {driver.first_name} {driver.last_name} has no location")
+            # Индекс мог отстать от БД (блокировка, удаление) - убираем водителя и берем следующего
+            if not driver or not driver.is_active or driver.online_status != 'online':
+                driver_geo_index.set_offline(driver_id)
                 continue
             
-            distance = haversine_distance(
-                latitude, 
-                longitude, 
-                driver.current_latitude, 
-                driver.current_longitude
-            )
-            
-            logger.info(f"🔍 [DispatcherService] Driver {driver.first_name} {driver.last_name}: {distance:.2f} km away")
-            
-            if distance <= radius_km and distance < min_distance:
-                min_distance = distance
-                nearest_driver = driver
-        
-        if nearest_driver:
-            logger.info(f"✅ [DispatcherService] Found nearest driver: {nearest_driver.first_name} {nearest_driver.last_name} (distance: {min_distance:.2f} km)")
-        else:
-            logger.info(f"❌ [DispatcherService] No drivers found within {radius_km} km radius")
+            logger.info(f"✅ [DispatcherService] Found nearest driver {driver.id} (distance: {distance:.2f} km)")
+            return driver
         
-        return nearest_driver
+        logger.info(f"❌ [DispatcherService] No drivers found within {radius_km} km radius for taxipark {taxipark_id}")
+        return None
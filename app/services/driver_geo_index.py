@@ -0,0 +1,258 @@
+from typing import Dict, List, Optional, Set, Tuple
+import math
+import threading
+import time
+
+from app.core import geo
+from app.core.config import settings
+
+# Статусы заказа, при которых водитель считается занятым
+BUSY_ORDER_STATUSES = ('accepted', 'navigating_to_a', 'arrived_at_a', 'navigating_to_b', 'in_progress')
+
+# Размер ячейки сетки в градусах (~5.5 км по широте)
+CELL_SIZE_DEG = 0.05
+
+
+def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    return (math.floor(latitude / CELL_SIZE_DEG), math.floor(longitude / CELL_SIZE_DEG))
+
+
+class _TaxiparkGrid:
+    """Сетка свободных онлайн водителей одного таксопарка"""
+
+    def __init__(self):
+        # driver_id -> (latitude, longitude)
+        self.positions: Dict[int, Tuple[float, float]] = {}
+        # ячейка -> множество driver_id
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        # Водители с активным заказом (в сетке не участвуют). Не зависит от
+        # присутствия на линии: снимается только переходом статуса заказа
+        self.busy: Set[int] = set()
+        # Последние известные координаты занятых онлайн водителей
+        self.parked: Dict[int, Tuple[float, float]] = {}
+
+    def place(self, driver_id: int, latitude: float, longitude: float):
+        self.take(driver_id)
+        self.positions[driver_id] = (latitude, longitude)
+        self.cells.setdefault(_cell(latitude, longitude), set()).add(driver_id)
+
+    def take(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        position = self.positions.pop(driver_id, None)
+        if position is not None:
+            cell = _cell(*position)
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(driver_id)
+                if not members:
+                    del self.cells[cell]
+        return position
+
+
+class DriverGeoIndex:
+    """In-memory пространственный индекс свободных онлайн водителей.
+
+    Водители разложены по ячейкам сетки внутри таксопарка. Индекс
+    заполняется из БД один раз на таксопарк при первом поиске, а дальше
+    поддерживается обновлениями статуса на линии и переходами статусов заказов.
+
+    Обновления приходят только от запросов своего процесса. С max_age
+    сетка перечитывается из БД, если загружена раньше max_age секунд назад
+    (0 - при каждом поиске): так работает режим нескольких воркеров.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._grids: Dict[int, _TaxiparkGrid] = {}
+        # taxipark_id -> monotonic время загрузки из БД
+        self._loaded_at: Dict[int, float] = {}
+        # driver_id -> taxipark_id
+        self._owners: Dict[int, int] = {}
+
+    def is_loaded(self, taxipark_id: int) -> bool:
+        if taxipark_id not in self._grids:
+            return False
+        return self.max_age is None or time.monotonic() - self._loaded_at[taxipark_id] < self.max_age
+
+    def ensure_loaded(self, db, taxipark_id: int):
+        """Заполнить индекс таксопарка из БД, если это еще не сделано"""
+        if self.is_loaded(taxipark_id):
+            return
+
+        from app.models.driver import Driver
+        from app.models.order import Order
+
+        busy_ids = {
+            row[0] for row in db.query(Order.driver_id).filter(
+                Order.taxipark_id == taxipark_id,
+                Order.driver_id.isnot(None),
+                Order.status.in_(BUSY_ORDER_STATUSES)
+            ).all()
+        }
+        rows = db.query(Driver.id, Driver.current_latitude, Driver.current_longitude).filter(
+            Driver.taxipark_id == taxipark_id,
+            Driver.is_active == True,
+            Driver.online_status == 'online'
+        ).all()
+
+        from app.services.location_store import location_store
+
+        with self._lock:
+            if self.is_loaded(taxipark_id):
+                return
+            self._drop_owners(taxipark_id)
+            grid = _TaxiparkGrid()
+            # Занятыми считаются и водители с активным заказом, ушедшие с линии
+            grid.busy.update(busy_ids)
+            for driver_id, latitude, longitude in rows:
+                # Координаты из памяти свежее еще не записанных в БД
+                latitude, longitude = location_store.get(driver_id) or (latitude, longitude)
+                self._owners[driver_id] = taxipark_id
+                if driver_id in busy_ids:
+                    if latitude is not None and longitude is not None:
+                        grid.parked[driver_id] = (latitude, longitude)
+                elif latitude is not None and longitude is not None:
+                    grid.place(driver_id, latitude, longitude)
+            self._grids[taxipark_id] = grid
+            self._loaded_at[taxipark_id] = time.monotonic()
+
+    def set_online(self, driver_id: int, taxipark_id: int, latitude: float = None, longitude: float = None):
+        """Водитель вышел на линию или прислал новые координаты"""
+        with self._lock:
+            grid = self._grids.get(taxipark_id)
+            if grid is None:
+                # Таксопарк еще не загружен - состояние подтянется из БД при первом поиске
+                return
+            self._move_owner(driver_id, taxipark_id)
+
+            if latitude is None or longitude is None:
+                known = grid.positions.get(driver_id) or grid.parked.get(driver_id)
+                if known is None:
+                    return
+                latitude, longitude = known
+
+            if driver_id in grid.busy:
+                grid.parked[driver_id] = (latitude, longitude)
+            else:
+                grid.place(driver_id, latitude, longitude)
+
+    def move(self, driver_id: int, latitude: float, longitude: float):
+        """Новые координаты водителя, уже известного индексу (онлайн)"""
+        with self._lock:
+            grid = self._grids.get(self._owners.get(driver_id))
+            if grid is None:
+                return
+            if driver_id in grid.busy:
+                grid.parked[driver_id] = (latitude, longitude)
+            else:
+                grid.place(driver_id, latitude, longitude)
+
+    def set_offline(self, driver_id: int):
+        """Водитель ушел с линии, заблокирован или удален.
+
+        Отметка о занятости остается: водитель с активным заказом, вернувшийся
+        на линию, не должен попасть в поиск до завершения заказа.
+        """
+        with self._lock:
+            taxipark_id = self._owners.pop(driver_id, None)
+            grid = self._grids.get(taxipark_id)
+            if grid is None:
+                return
+            grid.take(driver_id)
+            grid.parked.pop(driver_id, None)
+
+    def on_order_status(self, taxipark_id: int, driver_id: Optional[int], status: str):
+        """Учесть переход статуса заказа: занятые водители исключаются из поиска"""
+        if not driver_id:
+            return
+        driver_id = int(driver_id)
+
+        with self._lock:
+            grid = self._grids.get(taxipark_id)
+            if grid is None:
+                return
+            online = self._owners.get(driver_id) == taxipark_id
+
+            if status in BUSY_ORDER_STATUSES:
+                if driver_id not in grid.busy:
+                    grid.busy.add(driver_id)
+                    position = grid.take(driver_id)
+                    if position is not None and online:
+                        grid.parked[driver_id] = position
+            elif driver_id in grid.busy:
+                grid.busy.discard(driver_id)
+                position = grid.parked.pop(driver_id, None)
+                if position is not None and online:
+                    grid.place(driver_id, *position)
+
+    def within_radius(self, taxipark_id: int, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Свободные водители в радиусе, отсортированные по расстоянию: [(driver_id, km)]"""
+        with self._lock:
+            grid = self._grids.get(taxipark_id)
+            if grid is None or not grid.positions:
+                return []
+
+            min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, radius_km)
+            min_row, min_col = _cell(min_lat, min_lon)
+            max_row, max_col = _cell(max_lat, max_lon)
+
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(grid.cells):
+                # Радиус накрывает больше ячеек, чем занято - обходим занятые
+                candidates = [
+                    driver_id
+                    for (row, col), members in grid.cells.items()
+                    if min_row <= row <= max_row and min_col <= col <= max_col
+                    for driver_id in members
+                ]
+            else:
+                candidates = [
+                    driver_id
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    for driver_id in grid.cells.get((row, col), ())
+                ]
+
+            positions = [grid.positions[driver_id] for driver_id in candidates]
+
+        if not candidates:
+            return []
+
+        found = geo.within_radius(
+            latitude,
+            longitude,
+            [position[0] for position in positions],
+            [position[1] for position in positions],
+            radius_km
+        )
+        return [(candidates[index], distance) for index, distance in found]
+
+    def get_available_count(self, taxipark_id: int) -> int:
+        grid = self._grids.get(taxipark_id)
+        return len(grid.positions) if grid else 0
+
+    def _move_owner(self, driver_id: int, taxipark_id: int):
+        previous = self._owners.get(driver_id)
+        if previous is not None and previous != taxipark_id:
+            self.set_offline(driver_id)
+        self._owners[driver_id] = taxipark_id
+
+    def reset(self, taxipark_id: int = None):
+        """Сбросить индекс (целиком или одного таксопарка) для повторной загрузки из БД"""
+        with self._lock:
+            if taxipark_id is None:
+                self._grids.clear()
+                self._loaded_at.clear()
+                self._owners.clear()
+                return
+            self._grids.pop(taxipark_id, None)
+            self._loaded_at.pop(taxipark_id, None)
+            self._drop_owners(taxipark_id)
+
+    def _drop_owners(self, taxipark_id: int):
+        for driver_id in [d for d, t in self._owners.items() if t == taxipark_id]:
+            del self._owners[driver_id]
+
+
+# Глобальный экземпляр индекса водителей. С несколькими воркерами (WS_BROKER_URL)
+# переходы статусов с других воркеров сюда не попадают - сетка читается из БД при каждом поиске
+driver_geo_index = DriverGeoIndex(max_age=0.0 if settings.multi_worker else None)
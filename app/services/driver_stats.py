@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+
+from app.models.order_rollup import OrderRollup, bucket_start
+
+# Скользящие окна статистики водителя, дни
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+
+
+def driver_stats_statement(driver_id: int, now: Optional[datetime] = None):
+    """Запрос статистики водителя по order_rollups: суммы по (окно, статус).
+
+    Окна week и month - из часовых строк последних MONTH_DAYS дней (точность час),
+    all - из дневных строк за все время. Один проход по индексу
+    ix_order_rollups_driver_bucket; выполняется и в Session, и в AsyncSession.
+    """
+    now = now or datetime.now()
+    week_start = bucket_start(now - timedelta(days=WEEK_DAYS), "hour")
+    month_start = bucket_start(now - timedelta(days=MONTH_DAYS), "hour")
+
+    window = case(
+        (OrderRollup.granularity == "day", "all"),
+        (OrderRollup.bucket >= week_start, "week"),
+        else_="month"
+    ).label("window")
+    return (
+        select(
+            window,
+            OrderRollup.status,
+            func.sum(OrderRollup.orders).label("orders"),
+            func.sum(OrderRollup.revenue).label("revenue"),
+            func.sum(OrderRollup.commission).label("commission")
+        )
+        .where(
+            OrderRollup.driver_id == driver_id,
+            or_(
+                OrderRollup.granularity == "day",
+                and_(OrderRollup.granularity == "hour", OrderRollup.bucket >= month_start)
+            )
+        )
+        .group_by(window, OrderRollup.status)
+    )
+
+
+def _empty_window() -> Dict[str, float]:
+    return {"orders": 0, "completed": 0, "cancelled": 0, "revenue": 0.0, "earnings": 0.0}
+
+
+def summarize_driver_stats(rows) -> Dict[str, Dict[str, float]]:
+    """Строки driver_stats_statement -> {"week"|"month"|"all": счетчики и заработок}.
+
+    Заработок - стоимость выполненных заказов за вычетом комиссии таксопарка по ним.
+    """
+    windows = {name: _empty_window() for name in ("week", "month", "all")}
+    for row in rows:
+        # Окно week входит в month
+        targets = ["week", "month"] if row.window == "week" else [row.window]
+        for name in targets:
+            stats = windows[name]
+            stats["orders"] += int(row.orders or 0)
+            if row.status == "completed":
+                stats["completed"] += int(row.orders or 0)
+                stats["revenue"] += float(row.revenue or 0.0)
+                stats["earnings"] += float(row.revenue or 0.0) - float(row.commission or 0.0)
+            elif row.status == "cancelled":
+                stats["cancelled"] += int(row.orders or 0)
+    return windows
+
+
+class DriverStatsService:
+    """Статистика и заработок водителя за неделю, месяц и все время из order_rollups"""
+
+    @staticmethod
+    def get_stats(db, driver_id: int, now: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        return summarize_driver_stats(db.execute(driver_stats_statement(driver_id, now)).all())
+
+    @staticmethod
+    async def get_stats_async(db, driver_id: int, now: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        return summarize_driver_stats((await db.execute(driver_stats_statement(driver_id, now))).all())
@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Период сброса координат в БД, секунды
+FLUSH_INTERVAL_SECONDS = 3.0
+
+_UPDATE_SQL = text(
+    "UPDATE drivers SET current_latitude = :latitude, current_longitude = :longitude, "
+    "last_online_at = :seen_at WHERE id = :driver_id"
+)
+
+
+class DriverLocationStore:
+    """Последние координаты водителей в памяти с отложенной записью в БД.
+
+    Каждый GPS-пинг меняет только словарь в памяти. Фоновая задача раз в
+    FLUSH_INTERVAL_SECONDS записывает все изменившиеся позиции одним
+    пакетным UPDATE в одной транзакции. Если запись не удалась, пакет
+    возвращается в очередь (не затирая более свежие координаты) и уходит
+    в БД при следующем сбросе; при остановке приложения выполняется
+    финальный сброс.
+
+    С local_reads=False координаты из памяти не подставляются при чтении:
+    у другого воркера они могут быть свежее, и источником остается БД.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, local_reads: bool = True):
+        self.flush_interval = flush_interval
+        self.local_reads = local_reads
+        self._lock = threading.Lock()
+        # driver_id -> (latitude, longitude, seen_at)
+        self._latest: Dict[int, Tuple[float, float, datetime]] = {}
+        # driver_id -> monotonic время первого незаписанного изменения
+        self._dirty: Dict[int, float] = {}
+        self._task = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_flush_ms = 0.0
+        self.last_lag_seconds = 0.0
+
+    def record(self, driver_id: int, latitude: float, longitude: float, seen_at: datetime = None):
+        """Запомнить координаты водителя; в БД они попадут при следующем сбросе"""
+        with self._lock:
+            self._latest[driver_id] = (latitude, longitude, seen_at or datetime.now())
+            self._dirty.setdefault(driver_id, time.monotonic())
+
+    def get(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        if not self.local_reads:
+            return None
+        entry = self._latest.get(driver_id)
+        return (entry[0], entry[1]) if entry else None
+
+    def overlay(self, driver_data: dict) -> dict:
+        """Подставить в словарь водителя (Driver.to_dict) координаты из памяти, если они свежее БД"""
+        if not self.local_reads:
+            return driver_data
+        entry = self._latest.get(driver_data.get("id"))
+        if entry is not None:
+            driver_data["current_latitude"] = entry[0]
+            driver_data["current_longitude"] = entry[1]
+            driver_data["last_online_at"] = entry[2].isoformat()
+        return driver_data
+
+    def forget(self, driver_id: int):
+        """Убрать водителя из памяти (незаписанные координаты сбрасываются сразу)"""
+        with self._lock:
+            entry = self._latest.pop(driver_id, None)
+            pending = self._dirty.pop(driver_id, None)
+        if entry is not None and pending is not None:
+            self._write({driver_id: entry})
+
+    def flush(self) -> int:
+        """Записать накопленные координаты в БД. Возвращает число строк"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            batch = {driver_id: self._latest[driver_id] for driver_id in dirty if driver_id in self._latest}
+
+        started = time.perf_counter()
+        if not self._write(batch):
+            # Возвращаем пакет в очередь; координаты, пришедшие во время записи, свежее
+            with self._lock:
+                for driver_id, first_dirty in dirty.items():
+                    self._dirty[driver_id] = min(first_dirty, self._dirty.get(driver_id, first_dirty))
+            return 0
+
+        self.flushes += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_at = datetime.now()
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_lag_seconds = round(time.monotonic() - min(dirty.values()), 3)
+        return len(batch)
+
+    def _write(self, batch: Dict[int, Tuple[float, float, datetime]]) -> bool:
+        if not batch:
+            return True
+
+        from app.database.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            db.execute(_UPDATE_SQL, [
+                {"driver_id": driver_id, "latitude": latitude, "longitude": longitude, "seen_at": seen_at}
+                for driver_id, (latitude, longitude, seen_at) in batch.items()
+            ])
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            self.failures += 1
+            logger.warning("Driver location flush failed (%s rows): %s", len(batch), e)
+            return False
+        finally:
+            db.close()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                logger.warning("Driver location flusher error: %s", e)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            pending = len(self._dirty)
+            oldest = min(self._dirty.values()) if self._dirty else None
+        return {
+            "tracked_drivers": len(self._latest),
+            "pending": pending,
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "last_flush_lag_seconds": self.last_lag_seconds,
+            "last_flush_ms": self.last_flush_ms,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures
+        }
+
+
+# Глобальное хранилище координат водителей; с несколькими воркерами (WS_BROKER_URL) читаем из БД
+location_store = DriverLocationStore(local_reads=not settings.multi_worker)
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.core import geo
+from app.services.driver_geo_index import driver_geo_index
+from app.services.location_store import location_store
+from app.websocket.manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+# Период рассылки снимков координат диспетчерам, секунды
+LOCATION_TICK_SECONDS = 1.5
+# Смещения меньше порога не рассылаются
+MIN_MOVEMENT_METERS = 15.0
+# Стоящий на месте водитель все равно попадает в снимок раз в этот период
+KEEPALIVE_SECONDS = 30.0
+
+
+def parse_location(message: dict) -> Optional[Tuple[float, float]]:
+    """Координаты из сообщения водителя: {"location": {...}} или поля верхнего уровня"""
+    location = message.get("location")
+    if not isinstance(location, dict):
+        location = message
+
+    latitude = location.get("latitude", location.get("lat"))
+    longitude = location.get("longitude", location.get("lng", location.get("lon")))
+    if latitude is None or longitude is None:
+        return None
+
+    try:
+        return float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+
+
+class LocationStream:
+    """Поток координат водителей.
+
+    Принимает частые обновления GPS, хранит в памяти последнюю позицию
+    каждого водителя и раз в тик рассылает диспетчерам таксопарка один
+    пакет driver_locations с водителями, сдвинувшимися больше порога.
+    Несколько обновлений одного водителя за тик схлопываются в одно.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = LOCATION_TICK_SECONDS,
+        min_movement_meters: float = MIN_MOVEMENT_METERS,
+        keepalive_seconds: float = KEEPALIVE_SECONDS
+    ):
+        self.tick_seconds = tick_seconds
+        self.min_movement_meters = min_movement_meters
+        self.keepalive_seconds = keepalive_seconds
+        # driver_id -> (taxipark_id, latitude, longitude, timestamp)
+        self.latest: Dict[int, Tuple[int, float, float, str]] = {}
+        # driver_id -> (latitude, longitude, monotonic) последней разосланной позиции
+        self._published: Dict[int, Tuple[float, float, float]] = {}
+        # taxipark_id -> driver_id -> (latitude, longitude, timestamp) к следующему тику
+        self._pending: Dict[int, Dict[int, Tuple[float, float, str]]] = {}
+        self._task = None
+        self.received = 0
+        self.suppressed = 0
+        self.snapshots = 0
+
+    def update(self, driver_id: int, taxipark_id: int, latitude: float, longitude: float, timestamp: str = None) -> bool:
+        """Принять координаты водителя. Возвращает False, если смещение ниже порога"""
+        timestamp = timestamp or datetime.now().isoformat()
+        self.received += 1
+        self.latest[driver_id] = (taxipark_id, latitude, longitude, timestamp)
+        driver_geo_index.move(driver_id, latitude, longitude)
+        location_store.record(driver_id, latitude, longitude)
+
+        now = time.monotonic()
+        published = self._published.get(driver_id)
+        if published is not None and now - published[2] < self.keepalive_seconds:
+            moved_meters = geo.haversine_km(published[0], published[1], latitude, longitude) * 1000
+            if moved_meters < self.min_movement_meters:
+                self.suppressed += 1
+                return False
+
+        self._published[driver_id] = (latitude, longitude, now)
+        if taxipark_id is not None:
+            self._pending.setdefault(taxipark_id, {})[driver_id] = (latitude, longitude, timestamp)
+        return True
+
+    def forget(self, driver_id: int):
+        """Водитель ушел с линии"""
+        entry = self.latest.pop(driver_id, None)
+        self._published.pop(driver_id, None)
+        if entry is not None:
+            self._pending.get(entry[0], {}).pop(driver_id, None)
+
+    def get_position(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        entry = self.latest.get(driver_id)
+        return (entry[1], entry[2]) if entry else None
+
+    async def flush(self):
+        """Разослать накопленные координаты по таксопаркам"""
+        pending, self._pending = self._pending, {}
+        for taxipark_id, drivers in pending.items():
+            if not drivers:
+                continue
+            await websocket_manager.send_to_taxipark({
+                "type": "driver_locations",
+                "drivers": [
+                    {
+                        "driver_id": driver_id,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "timestamp": timestamp
+                    }
+                    for driver_id, (latitude, longitude, timestamp) in drivers.items()
+                ],
+                "timestamp": datetime.now().isoformat()
+            }, taxipark_id, user_type="dispatcher")
+            self.snapshots += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Location stream flush failed: %s", e)
+
+    def get_stats(self) -> dict:
+        return {
+            "tracked_drivers": len(self.latest),
+            "received": self.received,
+            "suppressed": self.suppressed,
+            "snapshots": self.snapshots
+        }
+
+
+# Глобальный поток координат водителей
+location_stream = LocationStream()
@@ -0,0 +1,128 @@
+from datetime import date
+from typing import Dict, Optional
+import asyncio
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.order import Order
+from app.models.order_counter import OrderStatusCounter, DEFAULT_ORDER_STATUS
+
+logger = logging.getLogger(__name__)
+
+# Период полного пересчета счетчиков из orders, секунды
+RECONCILE_INTERVAL_SECONDS = 3600.0
+
+
+class OrderCounterService:
+    """Чтение и пересчет счетчиков заказов по (таксопарк, статус, день)"""
+
+    @staticmethod
+    def get_status_counts(db: Session, taxipark_id: int, day_from: Optional[date] = None, day_to: Optional[date] = None) -> Dict[str, int]:
+        """Количество заказов таксопарка по статусам (по дню создания, если задан период)"""
+        query = db.query(OrderStatusCounter.status, func.sum(OrderStatusCounter.count)).filter(
+            OrderStatusCounter.taxipark_id == taxipark_id
+        )
+        if day_from:
+            query = query.filter(OrderStatusCounter.day >= day_from)
+        if day_to:
+            query = query.filter(OrderStatusCounter.day <= day_to)
+
+        rows = query.group_by(OrderStatusCounter.status).order_by(OrderStatusCounter.status).all()
+        return {status: int(count) for status, count in rows if count}
+
+    @staticmethod
+    def reconcile(db: Session, taxipark_id: Optional[int] = None) -> int:
+        """Пересобрать счетчики из orders (все таксопарки или один). Возвращает число строк"""
+        from app.database.bootstrap import lock_table_for_rebuild
+
+        status = func.coalesce(Order.status, DEFAULT_ORDER_STATUS)
+        day = func.coalesce(func.date(Order.created_at), func.current_date())
+        query = db.query(Order.taxipark_id, status, day, func.count(Order.id)).filter(
+            Order.taxipark_id.isnot(None)
+        )
+        counters = db.query(OrderStatusCounter)
+        if taxipark_id is not None:
+            query = query.filter(Order.taxipark_id == taxipark_id)
+            counters = counters.filter(OrderStatusCounter.taxipark_id == taxipark_id)
+
+        # Изменения заказов из других транзакций ждут конца пересчета
+        lock_table_for_rebuild(db, OrderStatusCounter.__table__)
+        rows = query.group_by(Order.taxipark_id, status, day).all()
+        counters.delete(synchronize_session=False)
+        db.bulk_insert_mappings(OrderStatusCounter, [
+            {
+                "taxipark_id": row_taxipark_id,
+                "status": row_status,
+                # SQLite возвращает date() строкой
+                "day": date.fromisoformat(row_day) if isinstance(row_day, str) else row_day,
+                "count": count
+            }
+            for row_taxipark_id, row_status, row_day, count in rows
+        ])
+        db.commit()
+        return len(rows)
+
+
+class OrderCounterReconciler:
+    """Фоновый пересчет счетчиков: при старте и затем раз в RECONCILE_INTERVAL_SECONDS.
+
+    Исправляет расхождения после массовых UPDATE заказов в обход ORM и
+    после ручных правок БД. Агрегаты аналитики (order_rollups) пересчитываются
+    за последние ROLLUP_RECONCILE_DAYS дней, при пустой таблице - полностью.
+    """
+
+    def __init__(self, interval: float = RECONCILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task = None
+        self.runs = 0
+        self.last_rows = 0
+
+    def reconcile_all(self) -> int:
+        from app.database.session import SessionLocal
+
+        from datetime import datetime, timedelta
+        from app.models.order_rollup import OrderRollup
+        from app.services.order_rollups import OrderRollupService, ROLLUP_RECONCILE_DAYS
+
+        db = SessionLocal()
+        try:
+            rows = OrderCounterService.reconcile(db)
+            since = None
+            if db.query(OrderRollup.bucket).first() is not None:
+                since = datetime.now() - timedelta(days=ROLLUP_RECONCILE_DAYS)
+            return rows + OrderRollupService.rebuild(db, since=since)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_once(self) -> int:
+        loop = asyncio.get_running_loop()
+        self.last_rows = await loop.run_in_executor(None, self.reconcile_all)
+        self.runs += 1
+        return self.last_rows
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                rows = await self.run_once()
+                logger.info("Order counters and rollups reconciled: %s rows", rows)
+            except Exception as e:
+                logger.warning("Order counter reconciliation failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+# Глобальный экземпляр
+order_counter_reconciler = OrderCounterReconciler()
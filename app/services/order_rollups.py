@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+import logging
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.order import Order
+from app.models.order_rollup import (
+    OrderRollup, ROLLUP_ATTRIBUTES, NO_DRIVER, NO_TARIFF, bucket_start, rollup_totals, totals_to_mappings
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних дней пересчитывает фоновый пересчет (OrderCounterReconciler)
+ROLLUP_RECONCILE_DAYS = 2
+# Измерения, по которым можно группировать агрегаты
+ROLLUP_DIMENSIONS = ("taxipark_id", "driver_id", "tariff", "status", "bucket")
+
+
+def _range_condition(start: Optional[datetime], end: Optional[datetime]):
+    """Условие на строки агрегатов, покрывающие [start, end) без пересечений.
+
+    Целые дни берутся из дневных строк, неполные дни по краям - из часовых.
+    Точность - час: start округляется вниз, end вверх до начала часа.
+    """
+    if start is None and end is None:
+        return OrderRollup.granularity == "day"
+
+    start_hour = bucket_start(start, "hour") if start else None
+    end_hour = None
+    if end:
+        end_hour = bucket_start(end, "hour")
+        if end_hour < end:
+            end_hour += timedelta(hours=1)
+
+    first_day = None
+    if start_hour is not None:
+        first_day = bucket_start(start_hour, "day")
+        if first_day < start_hour:
+            first_day += timedelta(days=1)
+    last_day = bucket_start(end_hour, "day") if end_hour is not None else None
+
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        # Период внутри одного дня (или на стыке двух) - только часовые строки
+        return and_(OrderRollup.granularity == "hour", OrderRollup.bucket >= start_hour, OrderRollup.bucket < end_hour)
+
+    days = [OrderRollup.granularity == "day"]
+    hours = []
+    if first_day is not None:
+        days.append(OrderRollup.bucket >= first_day)
+        hours.append(and_(OrderRollup.bucket >= start_hour, OrderRollup.bucket < first_day))
+    if last_day is not None:
+        days.append(OrderRollup.bucket < last_day)
+        hours.append(and_(OrderRollup.bucket >= last_day, OrderRollup.bucket < end_hour))
+    return or_(and_(*days), and_(OrderRollup.granularity == "hour", or_(*hours)))
+
+
+class OrderRollupService:
+    """Чтение и пересчет часовых и дневных агрегатов заказов (order_rollups)"""
+
+    @staticmethod
+    def query(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              group_by: Iterable[str] = (), taxipark_id: Optional[int] = None, driver_id: Optional[int] = None,
+              statuses: Optional[Iterable[str]] = None, exclude_statuses: Optional[Iterable[str]] = None,
+              granularity: Optional[str] = None) -> List:
+        """Суммы агрегатов за [start, end) с группировкой по group_by (ROLLUP_DIMENSIONS).
+
+        Строки результата: измерения group_by, затем orders, revenue, commission,
+        completion_seconds, completion_samples. Без start и end - за все время.
+        Группировка по bucket (временной ряд) требует явной granularity.
+        """
+        group_by = tuple(group_by)
+        dimensions = [getattr(OrderRollup, name) for name in group_by if name in ROLLUP_DIMENSIONS]
+        query = db.query(
+            *dimensions,
+            func.coalesce(func.sum(OrderRollup.orders), 0).label("orders"),
+            func.coalesce(func.sum(OrderRollup.revenue), 0.0).label("revenue"),
+            func.coalesce(func.sum(OrderRollup.commission), 0.0).label("commission"),
+            func.coalesce(func.sum(OrderRollup.completion_seconds), 0.0).label("completion_seconds"),
+            func.coalesce(func.sum(OrderRollup.completion_samples), 0).label("completion_samples")
+        )
+
+        if granularity is not None:
+            query = query.filter(OrderRollup.granularity == granularity)
+            if start:
+                query = query.filter(OrderRollup.bucket >= bucket_start(start, granularity))
+            if end:
+                query = query.filter(OrderRollup.bucket < end)
+        elif "bucket" in group_by:
+            raise ValueError("Группировка по bucket требует granularity")
+        else:
+            query = query.filter(_range_condition(start, end))
+
+        if taxipark_id is not None:
+            query = query.filter(OrderRollup.taxipark_id == taxipark_id)
+        if driver_id is not None:
+            query = query.filter(OrderRollup.driver_id == driver_id)
+        if statuses is not None:
+            query = query.filter(OrderRollup.status.in_(list(statuses)))
+        if exclude_statuses is not None:
+            query = query.filter(OrderRollup.status.notin_(list(exclude_statuses)))
+
+        if dimensions:
+            query = query.group_by(*dimensions).order_by(*dimensions)
+        return query.all()
+
+    @staticmethod
+    def totals(db: Session, **filters):
+        """Одна строка сумм за период (см. query)"""
+        return OrderRollupService.query(db, **filters)[0]
+
+    @staticmethod
+    def counts_by(db: Session, dimension: str, **filters) -> dict:
+        """{значение измерения: количество заказов}; пустые значения (без водителя/тарифа) пропускаются"""
+        rows = OrderRollupService.query(db, group_by=(dimension,), **filters)
+        return {row[0]: int(row.orders) for row in rows if row[0] not in (NO_DRIVER, NO_TARIFF) and row.orders}
+
+    @staticmethod
+    def rebuild(db: Session, since: Optional[datetime] = None) -> int:
+        """Пересобрать агрегаты из orders начиная с дня since (без since - полностью). Возвращает число строк"""
+        from app.database.bootstrap import lock_table_for_rebuild, stream_query
+
+        rollups = db.query(OrderRollup)
+        orders = db.query(*[getattr(Order, name).label(name) for name in ROLLUP_ATTRIBUTES])
+        if since is not None:
+            since = bucket_start(since, "day")
+            rollups = rollups.filter(OrderRollup.bucket >= since)
+            orders = orders.filter(Order.created_at >= since)
+
+        # Инкременты из других транзакций ждут конца пересчета и не теряются при замене строк
+        lock_table_for_rebuild(db, OrderRollup.__table__)
+        totals = rollup_totals(row._mapping for row in stream_query(orders))
+        rollups.delete(synchronize_session=False)
+        mappings = totals_to_mappings(totals)
+        db.bulk_insert_mappings(OrderRollup, mappings)
+        db.commit()
+        return len(mappings)
+
+    @staticmethod
+    def average_completion_minutes(row) -> float:
+        """Среднее время выполнения по строке сумм (completion_seconds / completion_samples), минуты"""
+        if not row.completion_samples:
+            return 0.0
+        return row.completion_seconds / row.completion_samples / 60
@@ -0,0 +1,122 @@
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.driver import Driver
+from app.models.order import Order, ORDER_STATUS_LABELS
+
+# Колонки заказа, которые попадают в ответ API. Порядок ключей как в прежнем Order.to_dict:
+# status_display идет сразу после status, поля водителя - после driver_id, метки времени - в конце
+ORDER_FIELDS = (
+    "id", "order_number", "client_name", "client_phone",
+    "pickup_address", "pickup_latitude", "pickup_longitude",
+    "destination_address", "destination_latitude", "destination_longitude",
+    "price", "distance", "duration", "status", "driver_id",
+    "tariff", "payment_method", "notes",
+)
+TIMESTAMP_FIELDS = ("created_at", "accepted_at", "arrived_at_a", "started_to_b", "completed_at", "cancelled_at")
+
+# Проекция для списков: заказ и нужные поля водителя одним запросом, без загрузки Driver целиком
+ORDER_COLUMNS = tuple(getattr(Order, name) for name in ORDER_FIELDS + TIMESTAMP_FIELDS) + (Order.taxipark_id,)
+DRIVER_COLUMNS = (
+    Driver.first_name.label("driver_first_name"),
+    Driver.last_name.label("driver_last_name"),
+    Driver.call_sign.label("driver_call_sign"),
+    Driver.phone_number.label("driver_phone_number"),
+)
+
+# Атрибут экземпляра Order с готовым словарем; сбрасывается при любом изменении заказа
+_CACHE_ATTRIBUTE = "_serialized"
+
+
+def order_rows_query(db):
+    """Запрос строк заказов для serialize_order_row; фильтры и сортировка - как для query(Order)"""
+    return db.query(*ORDER_COLUMNS, *DRIVER_COLUMNS).outerjoin(Driver, Order.driver_id == Driver.id)
+
+
+def driver_display_name(first_name, last_name, call_sign) -> str:
+    """Позывной водителя или его Ф.И.О"""
+    if call_sign and call_sign.strip():
+        return call_sign.strip()
+    return f"{first_name} {last_name}".strip()
+
+
+def _build(values: dict, driver: Optional[tuple]) -> dict:
+    data = {}
+    for name in ORDER_FIELDS:
+        data[name] = values[name]
+        if name == "status":
+            data["status_display"] = ORDER_STATUS_LABELS.get(data["status"], data["status"])
+        elif name == "driver_id":
+            if driver:
+                first_name, last_name, call_sign, phone_number = driver
+                data["driver_name"] = f"{first_name} {last_name}"
+                data["driver_display_name"] = driver_display_name(first_name, last_name, call_sign)
+                data["driver_phone"] = phone_number
+            else:
+                data["driver_name"] = None
+                data["driver_display_name"] = "Не назначен"
+                data["driver_phone"] = None
+    for name in TIMESTAMP_FIELDS:
+        value = values[name]
+        data[name] = value.isoformat() if value else None
+    return data
+
+
+def serialize_order_row(row) -> dict:
+    """Словарь заказа из строки order_rows_query (формат Order.to_dict)"""
+    values = row._mapping
+    driver = None
+    if values["driver_id"] is not None and values["driver_first_name"] is not None:
+        driver = (values["driver_first_name"], values["driver_last_name"],
+                  values["driver_call_sign"], values["driver_phone_number"])
+    return _build(values, driver)
+
+
+def _driver_fields(order: Order) -> Optional[tuple]:
+    if order.driver_id is None:
+        return None
+    state = inspect(order)
+    # Водитель уже загружен (selectinload/joinedload) или есть в сессии - без запроса
+    driver = state.dict.get("driver")
+    if driver is None:
+        session = object_session(order)
+        if session is not None:
+            driver = session.identity_map.get(identity_key(Driver, order.driver_id))
+    if driver is None:
+        # Один раз на версию заказа; дальше словарь берется из кэша
+        driver = order.driver
+    if driver is None:
+        return None
+    return driver.first_name, driver.last_name, driver.call_sign, driver.phone_number
+
+
+def serialize_order(order: Order) -> dict:
+    """Словарь заказа для API и WebSocket.
+
+    Результат запоминается на экземпляре до следующего изменения заказа
+    (присваивание, expire/refresh, flush), поэтому повторные вызовы в одном
+    обработчике не обращаются к order.driver и не пересобирают словарь.
+    Заказ с несохраненными изменениями не кэшируется. Возвращается копия.
+    """
+    state = inspect(order)
+    cached = order.__dict__.get(_CACHE_ATTRIBUTE)
+    if cached is not None:
+        return dict(cached)
+
+    data = _build({name: getattr(order, name) for name in ORDER_FIELDS + TIMESTAMP_FIELDS}, _driver_fields(order))
+    if state.persistent and not state.modified:
+        order.__dict__[_CACHE_ATTRIBUTE] = data
+    return dict(data)
+
+
+def _invalidate(order, *args):
+    order.__dict__.pop(_CACHE_ATTRIBUTE, None)
+
+
+for _name in ORDER_FIELDS + TIMESTAMP_FIELDS + ("driver",):
+    event.listen(getattr(Order, _name), "set", _invalidate)
+for _name in ("expire", "refresh", "refresh_flush"):
+    event.listen(Order, _name, _invalidate)
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import update
+
+from app.services.driver_geo_index import driver_geo_index
+from app.services.location_store import location_store
+from app.services.location_stream import location_stream
+from app.websocket.manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+# Водитель без активности дольше этого времени считается ушедшим с линии
+PRESENCE_TIMEOUT = timedelta(minutes=2)
+# Период проверки, секунды
+REAP_INTERVAL_SECONDS = 30.0
+
+# (driver_id, taxipark_id, first_name, last_name)
+ExpiredDriver = Tuple[int, int, str, str]
+
+
+class HeartbeatReaper:
+    """Фоновое отключение водителей, переставших присылать активность.
+
+    Раз в REAP_INTERVAL_SECONDS переводит в offline одним UPDATE всех онлайн
+    водителей с last_online_at старше PRESENCE_TIMEOUT и рассылает
+    диспетчерам driver_status_changed. Эндпоинты списков водителей
+    только читают.
+    """
+
+    def __init__(self, interval: float = REAP_INTERVAL_SECONDS, timeout: timedelta = PRESENCE_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._task = None
+        self.runs = 0
+        self.expired_total = 0
+
+    def expire_stale(self) -> List[ExpiredDriver]:
+        """Перевести в offline водителей без активности. Возвращает отключенных"""
+        from app.database.session import SessionLocal
+        from app.models.driver import Driver
+
+        # Сначала записываем свежие пинги из памяти, чтобы не отключить активных
+        location_store.flush()
+
+        cutoff_time = datetime.now() - self.timeout
+        stale = (
+            Driver.online_status == 'online',
+            Driver.last_online_at < cutoff_time
+        )
+
+        columns = (Driver.id, Driver.taxipark_id, Driver.first_name, Driver.last_name)
+        db = SessionLocal()
+        try:
+            if db.get_bind().dialect.update_returning:
+                # Отключенными считаем только строки, которые изменил сам UPDATE:
+                # водитель, приславший пинг после cutoff, условию уже не подходит
+                expired = db.execute(
+                    update(Driver).where(*stale).values(online_status='offline').returning(*columns)
+                ).all()
+            else:
+                candidates = [row[0] for row in db.query(Driver.id).filter(*stale).all()]
+                if not candidates:
+                    return []
+                db.query(Driver).filter(Driver.id.in_(candidates), *stale).update(
+                    {Driver.online_status: 'offline'}, synchronize_session=False
+                )
+                # Без RETURNING перечитываем, кого UPDATE действительно перевел в offline
+                expired = db.query(*columns).filter(
+                    Driver.id.in_(candidates), Driver.online_status == 'offline'
+                ).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for driver_id, _, _, _ in expired:
+            driver_geo_index.set_offline(driver_id)
+            location_stream.forget(driver_id)
+            location_store.forget(driver_id)
+
+        return [tuple(row) for row in expired]
+
+    async def reap(self) -> int:
+        loop = asyncio.get_running_loop()
+        expired = await loop.run_in_executor(None, self.expire_stale)
+        self.runs += 1
+        self.expired_total += len(expired)
+
+        now = datetime.now().isoformat()
+        for driver_id, taxipark_id, first_name, last_name in expired:
+            await websocket_manager.send_to_taxipark({
+                "type": "driver_status_changed",
+                "driver_id": driver_id,
+                "driver_name": f"{first_name} {last_name}",
+                "old_status": "online",
+                "status": "offline",
+                "new_status": "offline",
+                "reason": "inactive",
+                "timestamp": now
+            }, taxipark_id)
+
+        if expired:
+            logger.info("Heartbeat reaper set %s drivers offline", len(expired))
+        return len(expired)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning("Heartbeat reaper failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+# Глобальный экземпляр
+heartbeat_reaper = HeartbeatReaper()
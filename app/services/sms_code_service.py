@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from app.models.sms_code import SmsCode
+
+
+class SmsCodeService:
+    """SMS коды через SQLAlchemy: работает с любой БД из DATABASE_URL"""
+
+    @staticmethod
+    def consume_code(db: Session, phone_number: str, code: str) -> bool:
+        """Проверить код и отметить его использованным. Строка блокируется (FOR UPDATE),
+        чтобы один код нельзя было использовать двумя параллельными запросами"""
+        sms_code = db.query(SmsCode).filter(
+            SmsCode.phone_number == phone_number,
+            SmsCode.code == code,
+            SmsCode.used == False,
+            SmsCode.expires_at > datetime.now()
+        ).order_by(SmsCode.created_at.desc()).with_for_update().first()
+
+        if not sms_code:
+            return False
+
+        sms_code.used = True
+        db.commit()
+        return True
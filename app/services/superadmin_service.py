@@ -4,7 +4,10 @@ from fastapi import HTTPException, status
 from app.models.superadmin import SuperAdmin
 from app.schemas.superadmin import SuperAdminCreate, SuperAdminUpdate
 from app.core.security import get_password_hash
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+# Допустимые поля сортировки списка водителей суперадмина (параметр sort)
+DRIVER_SORT_FIELDS = ("id", "last_name", "balance", "created_at", "taxipark_name")
 
 class SuperAdminService:
     
@@ -69,3 +72,59 @@ class SuperAdminService:
     @staticmethod
     def get_superadmin_count(db: Session) -> int:
         return db.query(SuperAdmin).count()
+    
+    @staticmethod
+    def get_drivers_page(db: Session, page: int = 1, per_page: Optional[int] = None, search: Optional[str] = None,
+                         taxipark_id: Optional[int] = None, is_active: Optional[bool] = None,
+                         sort: str = "id", order: str = "asc") -> Tuple[List[dict], int]:
+        """Страница водителей с названием таксопарка и общее количество - одним запросом.
+        Без per_page - все водители"""
+        from sqlalchemy import func, or_
+        from app.models.driver import Driver
+        from app.models.taxipark import TaxiPark
+        from app.core.search import LIKE_ESCAPE, search_patterns
+        
+        query = db.query(
+            Driver.id, Driver.first_name, Driver.last_name, Driver.phone_number,
+            Driver.car_model, Driver.car_number, Driver.balance, Driver.tariff,
+            Driver.is_active, Driver.created_at, Driver.updated_at,
+            TaxiPark.name.label("taxipark_name"),
+            func.count().over().label("total")
+        ).outerjoin(TaxiPark, TaxiPark.id == Driver.taxipark_id)
+        
+        if search:
+            patterns = search_patterns(search)
+            if patterns:
+                query = query.filter(or_(*[Driver.search_text.like(pattern, escape=LIKE_ESCAPE) for pattern in patterns]))
+        if taxipark_id is not None:
+            query = query.filter(Driver.taxipark_id == taxipark_id)
+        if is_active is not None:
+            query = query.filter(Driver.is_active == is_active)
+        
+        column = TaxiPark.name if sort == "taxipark_name" else getattr(Driver, sort if sort in DRIVER_SORT_FIELDS else "id")
+        query = query.order_by(column.desc() if order == "desc" else column.asc(), Driver.id)
+        
+        page_query = query
+        if per_page is not None:
+            page_query = query.offset((page - 1) * per_page).limit(per_page)
+        rows = page_query.all()
+        drivers = [
+            {
+                "id": row.id,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "phone_number": row.phone_number,
+                "car_model": row.car_model,
+                "car_number": row.car_number,
+                "balance": float(row.balance) if row.balance else 0.0,
+                "tariff": row.tariff,
+                "taxipark_name": row.taxipark_name or "Не указан",
+                "is_active": row.is_active,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None
+            }
+            for row in rows
+        ]
+        # За последней страницей строк нет - общее количество отдельным запросом
+        total = rows[0].total if rows else (query.count() if page > 1 else 0)
+        return drivers, total
@@ -1,8 +1,20 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models.taxipark import TaxiPark
 from app.schemas.taxipark import TaxiParkCreate, TaxiParkUpdate
+from app.core.principal_cache import dispatcher_principal_cache
 from typing import List, Optional
 
+# Допустимые поля сортировки списка таксопарков (параметр sort)
+TAXIPARK_SORT_FIELDS = {
+    "id": TaxiPark.id,
+    "name": TaxiPark.name,
+    "city": TaxiPark.city,
+    "created_at": TaxiPark.created_at,
+    "commission_percent": TaxiPark.commission_percent,
+}
+
 
 class TaxiParkService:
     
@@ -22,6 +34,48 @@ class TaxiParkService:
     def get_taxiparks(db: Session, skip: int = 0, limit: int = 100) -> List[TaxiPark]:
         return db.query(TaxiPark).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_taxiparks_with_counts(db: Session, skip: int = 0, limit: Optional[int] = None, city: Optional[str] = None,
+                                  is_active: Optional[bool] = None, sort: str = "id", order: str = "asc") -> List[TaxiPark]:
+        """Таксопарки с фактическим количеством водителей и диспетчеров одним запросом"""
+        from app.models.driver import Driver
+        from app.models.administrator import Administrator
+        
+        drivers = (
+            db.query(Driver.taxipark_id, func.count(Driver.id).label("count"))
+            .group_by(Driver.taxipark_id)
+            .subquery()
+        )
+        dispatchers = (
+            db.query(Administrator.taxipark_id, func.count(Administrator.id).label("count"))
+            .group_by(Administrator.taxipark_id)
+            .subquery()
+        )
+        query = (
+            db.query(
+                TaxiPark,
+                func.coalesce(drivers.c.count, 0),
+                func.coalesce(dispatchers.c.count, 0)
+            )
+            .outerjoin(drivers, drivers.c.taxipark_id == TaxiPark.id)
+            .outerjoin(dispatchers, dispatchers.c.taxipark_id == TaxiPark.id)
+        )
+        if city:
+            query = query.filter(TaxiPark.city == city)
+        if is_active is not None:
+            query = query.filter(TaxiPark.is_active == is_active)
+        
+        column = TAXIPARK_SORT_FIELDS.get(sort, TaxiPark.id)
+        query = query.order_by(column.desc() if order == "desc" else column.asc(), TaxiPark.id)
+        
+        taxiparks = []
+        for taxipark, drivers_count, dispatchers_count in query.offset(skip).limit(limit):
+            # Значения только для ответа: объект не становится измененным и не уйдет в commit
+            set_committed_value(taxipark, "drivers_count", drivers_count)
+            set_committed_value(taxipark, "dispatchers_count", dispatchers_count)
+            taxiparks.append(taxipark)
+        return taxiparks
+    
     @staticmethod
     def update_taxipark(db: Session, taxipark_id: int, taxipark_data: TaxiParkUpdate) -> Optional[TaxiPark]:
         db_taxipark = TaxiParkService.get_taxipark(db, taxipark_id)
@@ -34,6 +88,8 @@ class TaxiParkService:
         
         db.commit()
         db.refresh(db_taxipark)
+        # Кешированные диспетчеры держат копию таксопарка
+        dispatcher_principal_cache.clear()
         return db_taxipark
     
     @staticmethod
@@ -44,6 +100,7 @@ class TaxiParkService:
         
         db.delete(db_taxipark)
         db.commit()
+        dispatcher_principal_cache.clear()
         return True
     
     @staticmethod
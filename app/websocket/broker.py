@@ -0,0 +1,204 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Обработчик сообщения, пришедшего от другого воркера
+BrokerHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def new_worker_id() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class BaseBroker:
+    """Транспорт WebSocket сообщений между воркерами.
+
+    Каждый воркер держит свои сокеты. Рассылки по таксопарку публикуются
+    всем воркерам, и каждый доставляет их своим подключенным пользователям.
+    Личные сообщения адресуются одному воркеру - тому, у которого сейчас
+    открыт сокет пользователя (по реестру присутствия).
+    """
+
+    def __init__(self, worker_id: str = None):
+        self.worker_id = worker_id or new_worker_id()
+
+    async def start(self, handler: BrokerHandler):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish_taxipark(self, payload: Dict[str, Any]):
+        """Разослать сообщение таксопарка остальным воркерам"""
+        pass
+
+    async def publish_user(self, user_id: str, payload: Dict[str, Any]) -> bool:
+        """Отправить сообщение воркеру, который держит сокет пользователя"""
+        return False
+
+    async def register(self, user_id: str):
+        """Отметить, что сокет пользователя открыт на этом воркере"""
+        pass
+
+    async def unregister(self, user_id: str):
+        """Снять отметку присутствия, если она все еще принадлежит этому воркеру"""
+        pass
+
+
+class LoopbackHub:
+    """Общая шина для нескольких LoopbackBroker в одном процессе"""
+
+    def __init__(self):
+        # worker_id -> обработчик
+        self.workers: Dict[str, BrokerHandler] = {}
+        # user_id -> worker_id
+        self.presence: Dict[str, str] = {}
+
+
+class LoopbackBroker(BaseBroker):
+    """Брокер в памяти процесса.
+
+    По умолчанию у каждого менеджера свой хаб, и он ведет себя как
+    единственный воркер. Несколько менеджеров с общим хабом имитируют
+    несколько воркеров - так маршрутизацию можно проверить без Redis.
+    """
+
+    def __init__(self, hub: LoopbackHub = None, worker_id: str = None):
+        super().__init__(worker_id)
+        self.hub = hub or LoopbackHub()
+
+    async def start(self, handler: BrokerHandler):
+        self.hub.workers[self.worker_id] = handler
+
+    async def stop(self):
+        self.hub.workers.pop(self.worker_id, None)
+        for user_id in [u for u, w in self.hub.presence.items() if w == self.worker_id]:
+            del self.hub.presence[user_id]
+
+    async def publish_taxipark(self, payload: Dict[str, Any]):
+        for worker_id, handler in list(self.hub.workers.items()):
+            if worker_id != self.worker_id:
+                await handler(payload)
+
+    async def publish_user(self, user_id: str, payload: Dict[str, Any]) -> bool:
+        worker_id = self.hub.presence.get(user_id)
+        handler = self.hub.workers.get(worker_id) if worker_id != self.worker_id else None
+        if handler is None:
+            return False
+        await handler(payload)
+        return True
+
+    async def register(self, user_id: str):
+        self.hub.presence[user_id] = self.worker_id
+
+    async def unregister(self, user_id: str):
+        if self.hub.presence.get(user_id) == self.worker_id:
+            del self.hub.presence[user_id]
+
+
+# Удалить запись присутствия, только если она указывает на этот воркер
+_UNREGISTER_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class RedisBroker(BaseBroker):
+    """Брокер на Redis pub/sub.
+
+    Канал {prefix}:taxipark слушают все воркеры, канал {prefix}:worker:<id> -
+    только свой воркер. Хеш {prefix}:presence хранит user_id -> worker_id.
+    """
+
+    def __init__(self, url: str, prefix: str = "ws", worker_id: str = None):
+        super().__init__(worker_id)
+        self.url = url
+        self.prefix = prefix
+        self.taxipark_channel = f"{prefix}:taxipark"
+        self.worker_channel = f"{prefix}:worker:{self.worker_id}"
+        self.presence_key = f"{prefix}:presence"
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._unregister = None
+
+    async def start(self, handler: BrokerHandler):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        self._unregister = self._redis.register_script(_UNREGISTER_SCRIPT)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.taxipark_channel, self.worker_channel)
+        self._listener = asyncio.ensure_future(self._listen(handler))
+        logger.info("WebSocket broker connected: %s (worker %s)", self.url, self.worker_id)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.close()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _listen(self, handler: BrokerHandler):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") == self.worker_id:
+                        continue
+                    await handler(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WebSocket broker listener error: %s", e)
+                await asyncio.sleep(1)
+
+    async def publish_taxipark(self, payload: Dict[str, Any]):
+        try:
+            await self._redis.publish(self.taxipark_channel, json.dumps(payload, ensure_ascii=False))
+        except Exception as e:
+            logger.warning("WebSocket broker publish failed: %s", e)
+
+    async def publish_user(self, user_id: str, payload: Dict[str, Any]) -> bool:
+        try:
+            worker_id = await self._redis.hget(self.presence_key, user_id)
+            if not worker_id or worker_id == self.worker_id:
+                return False
+            receivers = await self._redis.publish(f"{self.prefix}:worker:{worker_id}", json.dumps(payload, ensure_ascii=False))
+            return receivers > 0
+        except Exception as e:
+            logger.warning("WebSocket broker publish failed: %s", e)
+            return False
+
+    async def register(self, user_id: str):
+        try:
+            await self._redis.hset(self.presence_key, user_id, self.worker_id)
+        except Exception as e:
+            logger.warning("WebSocket broker register failed: %s", e)
+
+    async def unregister(self, user_id: str):
+        try:
+            await self._unregister(keys=[self.presence_key], args=[user_id, self.worker_id])
+        except Exception as e:
+            logger.warning("WebSocket broker unregister failed: %s", e)
+
+
+def create_broker(url: str = None) -> BaseBroker:
+    """Брокер по URL: redis://... - Redis, пусто - loopback (один воркер)"""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return LoopbackBroker()
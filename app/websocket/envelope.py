@@ -0,0 +1,55 @@
+from typing import Any, Dict, Union
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Сериализовать сообщение в JSON-текст (orjson, если установлен)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(message, ensure_ascii=False)
+
+
+class MessageEnvelope:
+    """Сообщение WebSocket, сериализуемое один раз.
+
+    Рассылка по таксопарку отправляет всем получателям один и тот же готовый
+    текст вместо повторного json.dumps на каждого пользователя.
+    """
+
+    __slots__ = ("message", "_text")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self._text = None
+
+    @property
+    def type(self) -> str:
+        return self.message.get("type", "unknown")
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = encode_message(self.message)
+        return self._text
+
+    @classmethod
+    def from_text(cls, text: str, message_type: str) -> "MessageEnvelope":
+        """Конверт для уже сериализованного сообщения (например, пришедшего от другого воркера)"""
+        envelope = cls({"type": message_type})
+        envelope._text = text
+        return envelope
+
+    @classmethod
+    def wrap(cls, message: Union["MessageEnvelope", Dict[str, Any]]) -> "MessageEnvelope":
+        if isinstance(message, cls):
+            return message
+        return cls(message)
+
+    def __repr__(self):
+        return f"<MessageEnvelope(type={self.type})>"
@@ -1,30 +1,78 @@
 from fastapi import WebSocket
-from typing import Dict, List
-import json
+from typing import Dict, Set, Union
 import asyncio
+import logging
+import time
 from datetime import datetime
 
+from app.core.config import settings
+from app.websocket.registry import ConnectionRegistry
+from app.websocket.metrics import LatencyMetrics, MessageCounters
+from app.websocket.envelope import MessageEnvelope
+from app.websocket.outbox import ConnectionOutbox, OutboxItem
+from app.websocket.broker import BaseBroker, create_broker
+
+logger = logging.getLogger(__name__)
+
+# Максимальное время отправки одному сокету, секунды
+SEND_TIMEOUT_SECONDS = 5.0
+
 class WebSocketManager:
-    def __init__(self):
-        # Словарь для хранения активных соединений
-        # Ключ: driver_id или dispatcher_id, Значение: WebSocket
-        self.active_connections: Dict[str, WebSocket] = {}
-        # Группы соединений по таксопаркам
-        self.taxipark_connections: Dict[int, List[str]] = {}
+    def __init__(
+        self,
+        send_timeout: float = SEND_TIMEOUT_SECONDS,
+        outbox_size: int = settings.WS_OUTBOX_SIZE,
+        outbox_hard_limit: int = settings.WS_OUTBOX_HARD_LIMIT,
+        broker: BaseBroker = None
+    ):
+        # Реестр соединений с индексами по пользователю, таксопарку и роли
+        self.registry = ConnectionRegistry()
+        # Исходящие очереди соединений: user_id -> ConnectionOutbox
+        self.outboxes: Dict[str, ConnectionOutbox] = {}
+        # Медленный клиент, не принявший сообщение за это время, отключается
+        self.send_timeout = send_timeout
+        self.outbox_size = outbox_size
+        self.outbox_hard_limit = outbox_hard_limit
+        # Постановка рассылок в очереди (время обработчика) и доставка писателями
+        self.fanout_metrics = LatencyMetrics()
+        self.delivery_metrics = LatencyMetrics()
+        self.counters = MessageCounters()
+        # Транспорт между воркерами: сокет пользователя может быть открыт в другом процессе
+        self.broker = broker or create_broker(settings.WS_BROKER_URL)
+    
+    async def start(self):
+        """Подключить брокер (вызывается при старте приложения)"""
+        await self.broker.start(self._on_broker_message)
+    
+    async def stop(self):
+        await self.broker.stop()
+    
+    @property
+    def active_connections(self) -> Dict[str, WebSocket]:
+        """Активные соединения: ключ driver_id или dispatcher_id, значение WebSocket"""
+        return self.registry.connections
+    
+    @property
+    def taxipark_connections(self) -> Dict[int, Set[str]]:
+        """Группы соединений по таксопаркам"""
+        return self.registry.taxiparks
     
     async def connect(self, websocket: WebSocket, user_id: str, user_type: str, taxipark_id: int = None):
         """Подключить пользователя к WebSocket"""
         await websocket.accept()
-        self.active_connections[user_id] = websocket
         
-        # Добавляем в группу таксопарка если указан
-        if taxipark_id:
-            if taxipark_id not in self.taxipark_connections:
-                self.taxipark_connections[taxipark_id] = []
-            if user_id not in self.taxipark_connections[taxipark_id]:
-                self.taxipark_connections[taxipark_id].append(user_id)
+        # Повторное подключение того же пользователя вытесняет старый сокет
+        self.registry.add(user_id, websocket, user_type, taxipark_id)
+        
+        previous = self.outboxes.pop(user_id, None)
+        if previous is not None:
+            previous.close()
+        outbox = ConnectionOutbox(user_id, websocket, self._deliver, self.outbox_size, self.outbox_hard_limit)
+        self.outboxes[user_id] = outbox
+        outbox.start()
         
-        print(f"✅ WebSocket подключен: {user_type} {user_id} (таксопарк: {taxipark_id})")
+        await self.broker.register(user_id)
+        self.counters.incr("connection", user_type)
         
         # Отправляем подтверждение подключения
         await self.send_personal_message({
@@ -33,62 +81,139 @@ class WebSocketManager:
             "timestamp": datetime.now().isoformat()
         }, user_id)
     
-    def disconnect(self, user_id: str):
+    def disconnect(self, user_id: str, websocket: WebSocket = None):
         """Отключить пользователя от WebSocket"""
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-        
-        # Удаляем из групп таксопарков
-        for taxipark_id, users in self.taxipark_connections.items():
-            if user_id in users:
-                users.remove(user_id)
+        if self.registry.remove(user_id, websocket):
+            outbox = self.outboxes.pop(user_id, None)
+            if outbox is not None:
+                outbox.close()
+            asyncio.ensure_future(self.broker.unregister(user_id))
+            self.counters.incr("connection", "closed")
+    
+    async def _send_text(self, user_id: str, websocket: WebSocket, text: str) -> str:
+        """Отправить готовый текст в сокет с таймаутом. Возвращает исход: sent, timeout, failed"""
+        try:
+            await asyncio.wait_for(websocket.send_text(text), timeout=self.send_timeout)
+            return "sent"
+        except asyncio.TimeoutError:
+            # Медленный клиент не должен задерживать остальных - отключаем его,
+            # приложение переподключится и получит актуальное состояние
+            logger.warning("WebSocket send timeout, closing %s", user_id)
+            self.disconnect(user_id, websocket)
+            asyncio.ensure_future(self._close_quietly(websocket, code=1013))
+            return "timeout"
+        except Exception as e:
+            logger.warning("WebSocket send failed for %s: %s", user_id, e)
+            self.disconnect(user_id, websocket)
+            return "failed"
+    
+    async def _close_quietly(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            pass
+    
+    async def _deliver(self, outbox: ConnectionOutbox, item: OutboxItem):
+        """Отправка одного сообщения из очереди (вызывается задачей-писателем соединения)"""
+        text, message_type, _, enqueued_at = item
+        outcome = await self._send_text(outbox.user_id, outbox.websocket, text)
+        self.counters.incr(message_type, outcome)
+        self.delivery_metrics.record(time.perf_counter() - enqueued_at, **{outcome: 1})
+    
+    def _enqueue(self, user_id: str, envelope: MessageEnvelope) -> str:
+        """Поставить сообщение в очередь соединения. Возвращает исход: queued, dropped, overflow, not_connected"""
+        outbox = self.outboxes.get(user_id)
+        if outbox is None:
+            return "not_connected"
         
-        print(f"❌ WebSocket отключен: {user_id}")
+        outcome = outbox.put(envelope.text, envelope.type)
+        if outcome == "overflow":
+            # Очередь забита неотбрасываемыми сообщениями - клиент безнадежно отстал
+            logger.warning("WebSocket outbox overflow, closing %s", user_id)
+            websocket = outbox.websocket
+            self.disconnect(user_id, websocket)
+            asyncio.ensure_future(self._close_quietly(websocket, code=1013))
+        return outcome
     
-    async def send_personal_message(self, message: dict, user_id: str):
-        """Отправить сообщение конкретному пользователю"""
-        print(f"🔍 [WebSocket Manager] send_personal_message called with user_id: {user_id}")
-        print(f"🔍 [WebSocket Manager] active_connections keys: {list(self.active_connections.keys())}")
+    async def send_personal_message(self, message: Union[dict, MessageEnvelope], user_id: str):
+        """Поставить сообщение пользователю в очередь отправки (на этом или другом воркере)"""
+        envelope = MessageEnvelope.wrap(message)
         
-        if user_id in self.active_connections:
-            try:
-                message_json = json.dumps(message)
-                print(f"🔍 [WebSocket Manager] Sending message to {user_id}: {message_json}")
-                await self.active_connections[user_id].send_text(message_json)
-                return True
-            except Exception as e:
-                print(f"❌ [WebSocket Manager] Ошибка отправки сообщения пользователю {user_id}: {e}")
-                self.disconnect(user_id)
-                return False
+        if user_id in self.outboxes:
+            outcome = self._enqueue(user_id, envelope)
+        elif await self.broker.publish_user(user_id, self._broker_payload(envelope, "user", user_id=user_id)):
+            outcome = "routed"
         else:
-            print(f"❌ [WebSocket Manager] User {user_id} not found in active connections")
-        return False
+            outcome = "not_connected"
+        
+        self.counters.incr(envelope.type, outcome)
+        return outcome in ("queued", "routed")
+    
+    async def send_to_taxipark(self, message: Union[dict, MessageEnvelope], taxipark_id: int, exclude_user: str = None, user_type: str = None):
+        """Поставить сообщение в очереди всех пользователей таксопарка (опционально только одной роли)"""
+        envelope = MessageEnvelope.wrap(message)
+        if taxipark_id is None:
+            self.counters.incr(envelope.type, "no_recipients")
+            return 0
+        
+        # Остальные воркеры доставят сообщение своим подключенным пользователям
+        await self.broker.publish_taxipark(self._broker_payload(
+            envelope, "taxipark",
+            taxipark_id=taxipark_id, exclude_user=exclude_user, user_type=user_type
+        ))
+        
+        return self._enqueue_taxipark(envelope, taxipark_id, exclude_user, user_type)
     
-    async def send_to_taxipark(self, message: dict, taxipark_id: int, exclude_user: str = None):
-        """Отправить сообщение всем пользователям таксопарка"""
-        print(f"🔍 [WebSocket Manager] send_to_taxipark called with taxipark_id: {taxipark_id} (type: {type(taxipark_id)})")
-        print(f"🔍 [WebSocket Manager] taxipark_connections keys: {list(self.taxipark_connections.keys())}")
+    def _enqueue_taxipark(self, envelope: MessageEnvelope, taxipark_id: int, exclude_user: str = None, user_type: str = None) -> int:
+        """Рассылка подключенным к этому воркеру пользователям таксопарка"""
+        members = self.registry.get_taxipark_members(taxipark_id, user_type)
+        if not members:
+            self.counters.incr(envelope.type, "no_recipients")
+            return 0
+        
+        # Текст кешируется в конверте и сериализуется один раз на всех получателей;
+        # переполнение может отключить получателя во время обхода, поэтому обходим копию
+        started = time.perf_counter()
+        outcomes = [
+            self._enqueue(user_id, envelope)
+            for user_id in list(members)
+            if not (exclude_user and user_id == exclude_user)
+        ]
         
-        if taxipark_id is None or taxipark_id not in self.taxipark_connections:
-            print(f"❌ [WebSocket Manager] Taxipark {taxipark_id} not found in connections")
-            return
+        queued = outcomes.count("queued")
+        dropped = outcomes.count("dropped")
+        overflow = outcomes.count("overflow")
+        self.fanout_metrics.record(time.perf_counter() - started, queued=queued, dropped=dropped, overflow=overflow)
+        self.counters.incr(envelope.type, "queued", queued)
+        self.counters.incr(envelope.type, "dropped", dropped)
+        self.counters.incr(envelope.type, "overflow", overflow)
         
-        sent_count = 0
-        for user_id in self.taxipark_connections[taxipark_id]:
-            if exclude_user and user_id == exclude_user:
-                continue
-            
-            if await self.send_personal_message(message, user_id):
-                sent_count += 1
+        return queued
+    
+    def _broker_payload(self, envelope: MessageEnvelope, kind: str, **route) -> dict:
+        return {
+            "origin": self.broker.worker_id,
+            "kind": kind,
+            "type": envelope.type,
+            "text": envelope.text,
+            **route
+        }
+    
+    async def _on_broker_message(self, payload: dict):
+        """Сообщение от другого воркера: доставляем своим подключенным пользователям"""
+        envelope = MessageEnvelope.from_text(payload["text"], payload.get("type", "unknown"))
         
-        print(f"📤 Сообщение отправлено {sent_count} пользователям таксопарка {taxipark_id}")
-        return sent_count
+        if payload.get("kind") == "user":
+            outcome = self._enqueue(payload["user_id"], envelope)
+            self.counters.incr(envelope.type, outcome)
+        elif payload.get("kind") == "taxipark":
+            self._enqueue_taxipark(envelope, payload.get("taxipark_id"), payload.get("exclude_user"), payload.get("user_type"))
     
-    async def send_to_driver(self, message: dict, driver_id: str):
+    async def send_to_driver(self, message: Union[dict, MessageEnvelope], driver_id: str):
         """Отправить сообщение конкретному водителю"""
         return await self.send_personal_message(message, f"driver_{driver_id}")
     
-    async def send_to_dispatcher(self, message: dict, dispatcher_id: str):
+    async def send_to_dispatcher(self, message: Union[dict, MessageEnvelope], dispatcher_id: str):
         """Отправить сообщение конкретному диспетчеру"""
         return await self.send_personal_message(message, f"dispatcher_{dispatcher_id}")
     
@@ -119,13 +244,24 @@ class WebSocketManager:
     
     def get_connection_count(self) -> int:
         """Получить количество активных соединений"""
-        return len(self.active_connections)
+        return len(self.registry)
     
-    def get_taxipark_connections_count(self, taxipark_id: int) -> int:
+    def get_taxipark_connections_count(self, taxipark_id: int, user_type: str = None) -> int:
         """Получить количество соединений в таксопарке"""
-        if taxipark_id in self.taxipark_connections:
-            return len(self.taxipark_connections[taxipark_id])
-        return 0
+        return len(self.registry.get_taxipark_members(taxipark_id, user_type))
+    
+    def get_role_connections_count(self, user_type: str) -> int:
+        """Получить количество соединений по роли (driver, dispatcher, client)"""
+        return len(self.registry.get_role_members(user_type))
+    
+    def get_outbox_stats(self) -> dict:
+        """Суммарная глубина исходящих очередей и число отброшенных сообщений"""
+        outboxes = list(self.outboxes.values())
+        return {
+            "queued": sum(len(outbox) for outbox in outboxes),
+            "max_depth": max((len(outbox) for outbox in outboxes), default=0),
+            "dropped": sum(outbox.dropped for outbox in outboxes)
+        }
 
 # Глобальный экземпляр менеджера WebSocket
 websocket_manager = WebSocketManager()
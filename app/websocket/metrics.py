@@ -0,0 +1,69 @@
+from collections import deque
+from typing import Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyMetrics:
+    """Задержки по скользящему окну и итоговые исходы операций"""
+
+    def __init__(self, window: int = 1000):
+        # Задержки последних операций, секунды
+        self.latencies = deque(maxlen=window)
+        self.events = 0
+        self.outcomes: Dict[str, int] = {}
+
+    def record(self, latency: float, **outcomes: int):
+        self.latencies.append(latency)
+        self.events += 1
+        for outcome, count in outcomes.items():
+            if count:
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "events": self.events,
+            **self.outcomes,
+            "latency_ms_p50": round(self.percentile(50) * 1000, 2),
+            "latency_ms_p95": round(self.percentile(95) * 1000, 2),
+            "latency_ms_p99": round(self.percentile(99) * 1000, 2),
+        }
+
+
+class MessageCounters:
+    """Счетчики отправок WebSocket по типу сообщения и исходу.
+
+    Заменяют построчное логирование каждой отправки: в лог раз в
+    log_every событий попадает только сводка счетчиков.
+    """
+
+    def __init__(self, log_every: int = 1000):
+        # (message_type, outcome) -> количество
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self.log_every = log_every
+        self._events = 0
+
+    def incr(self, message_type: str, outcome: str, amount: int = 1):
+        if amount <= 0:
+            return
+        key = (message_type, outcome)
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+        self._events += amount
+        if self.log_every and self._events >= self.log_every:
+            self._events = 0
+            logger.info("websocket_counters %s", self.snapshot())
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for (message_type, outcome), count in self.counts.items():
+            result.setdefault(message_type, {})[outcome] = count
+        return result
@@ -0,0 +1,107 @@
+from collections import deque
+from fastapi import WebSocket
+from typing import Awaitable, Callable, Deque, Tuple
+import asyncio
+import time
+
+# Политики переполнения очереди
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_NEVER_DROP = "never_drop"
+
+# Сообщения, которые можно терять при переполнении: следующее сообщение того же
+# типа все равно несет актуальное состояние. Все остальные (предложения заказов,
+# смены статусов) по умолчанию не отбрасываются.
+DROPPABLE_MESSAGE_TYPES = {
+    "driver_location_update": OVERFLOW_DROP_OLDEST,
+    "driver_locations": OVERFLOW_DROP_OLDEST,
+    "location_update_confirmed": OVERFLOW_DROP_OLDEST,
+    "pong": OVERFLOW_DROP_OLDEST,
+}
+
+# (текст, тип сообщения, можно ли отбросить, время постановки в очередь)
+OutboxItem = Tuple[str, str, bool, float]
+
+
+def get_overflow_policy(message_type: str) -> str:
+    return DROPPABLE_MESSAGE_TYPES.get(message_type, OVERFLOW_NEVER_DROP)
+
+
+class ConnectionOutbox:
+    """Исходящая очередь одного WebSocket соединения.
+
+    Обработчики только кладут готовый текст в очередь и сразу возвращаются,
+    а отдельная задача-писатель отправляет сообщения в сокет по порядку.
+    Очередь ограничена maxsize: при переполнении сначала вытесняются самые
+    старые отбрасываемые сообщения. Неотбрасываемые сообщения допускаются
+    сверх maxsize до hard_limit - дальше клиент считается безнадежно
+    отставшим и отключается.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        websocket: WebSocket,
+        deliver: Callable[["ConnectionOutbox", OutboxItem], Awaitable[None]],
+        maxsize: int = 256,
+        hard_limit: int = 1024
+    ):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.hard_limit = max(hard_limit, maxsize)
+        self.dropped = 0
+        self._deliver = deliver
+        self._queue: Deque[OutboxItem] = deque()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def put(self, text: str, message_type: str, policy: str = None) -> str:
+        """Поставить сообщение в очередь. Возвращает исход: queued, dropped, overflow"""
+        if self._closed:
+            return "dropped"
+
+        droppable = (policy or get_overflow_policy(message_type)) == OVERFLOW_DROP_OLDEST
+
+        if len(self._queue) >= self.maxsize and not self._evict_droppable():
+            if droppable:
+                self.dropped += 1
+                return "dropped"
+            if len(self._queue) >= self.hard_limit:
+                return "overflow"
+
+        self._queue.append((text, message_type, droppable, time.perf_counter()))
+        self._wakeup.set()
+        return "queued"
+
+    def close(self):
+        """Остановить писателя; неотправленные сообщения отбрасываются"""
+        self._closed = True
+        self._queue.clear()
+        self._wakeup.set()
+
+    def _evict_droppable(self) -> bool:
+        for index, item in enumerate(self._queue):
+            if item[2]:
+                del self._queue[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _run(self):
+        while not self._closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._deliver(self, self._queue.popleft())
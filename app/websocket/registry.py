@@ -0,0 +1,98 @@
+from fastapi import WebSocket
+from typing import Dict, Optional, Set, Tuple
+
+# Роли пользователей WebSocket
+USER_TYPES = ("driver", "dispatcher", "client")
+
+
+class ConnectionRegistry:
+    """Реестр WebSocket соединений.
+
+    Соединения индексируются по пользователю, по таксопарку и по роли внутри
+    таксопарка. Все индексы - словари и множества, поэтому подключение,
+    отключение и проверка членства выполняются за O(1) независимо от числа
+    соединений в таксопарке.
+    """
+
+    def __init__(self):
+        # user_id -> WebSocket
+        self.connections: Dict[str, WebSocket] = {}
+        # user_id -> (user_type, taxipark_id)
+        self.members: Dict[str, Tuple[str, Optional[int]]] = {}
+        # taxipark_id -> множество user_id
+        self.taxiparks: Dict[int, Set[str]] = {}
+        # (taxipark_id, user_type) -> множество user_id
+        self.taxipark_roles: Dict[Tuple[int, str], Set[str]] = {}
+        # user_type -> множество user_id (по всем таксопаркам)
+        self.roles: Dict[str, Set[str]] = {}
+
+    def add(self, user_id: str, websocket: WebSocket, user_type: str, taxipark_id: int = None) -> Optional[WebSocket]:
+        """Зарегистрировать соединение. Возвращает вытесненный сокет того же пользователя, если он был"""
+        previous = self.connections.get(user_id)
+        if user_id in self.members:
+            self._unindex(user_id)
+
+        self.connections[user_id] = websocket
+        self.members[user_id] = (user_type, taxipark_id)
+        self.roles.setdefault(user_type, set()).add(user_id)
+        if taxipark_id:
+            self.taxiparks.setdefault(taxipark_id, set()).add(user_id)
+            self.taxipark_roles.setdefault((taxipark_id, user_type), set()).add(user_id)
+
+        return previous if previous is not websocket else None
+
+    def remove(self, user_id: str, websocket: WebSocket = None) -> bool:
+        """Удалить соединение пользователя.
+
+        Если передан websocket, соединение удаляется только когда оно все еще
+        текущее - так закрытие старого сокета не выбивает переподключившегося пользователя.
+        """
+        current = self.connections.get(user_id)
+        if current is None or (websocket is not None and current is not websocket):
+            return False
+
+        del self.connections[user_id]
+        self._unindex(user_id)
+        return True
+
+    def get(self, user_id: str) -> Optional[WebSocket]:
+        return self.connections.get(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.connections
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def get_taxipark_members(self, taxipark_id: int, user_type: str = None) -> Set[str]:
+        """Пользователи таксопарка (опционально только одной роли)"""
+        if user_type is None:
+            return self.taxiparks.get(taxipark_id, set())
+        return self.taxipark_roles.get((taxipark_id, user_type), set())
+
+    def get_role_members(self, user_type: str) -> Set[str]:
+        return self.roles.get(user_type, set())
+
+    def get_user_type(self, user_id: str) -> Optional[str]:
+        member = self.members.get(user_id)
+        return member[0] if member else None
+
+    def get_user_taxipark(self, user_id: str) -> Optional[int]:
+        member = self.members.get(user_id)
+        return member[1] if member else None
+
+    def _unindex(self, user_id: str):
+        user_type, taxipark_id = self.members.pop(user_id)
+
+        self._discard(self.roles, user_type, user_id)
+        if taxipark_id:
+            self._discard(self.taxiparks, taxipark_id, user_id)
+            self._discard(self.taxipark_roles, (taxipark_id, user_type), user_id)
+
+    @staticmethod
+    def _discard(index: dict, key, user_id: str):
+        members = index.get(key)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del index[key]
@@ -2,8 +2,14 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPExce
 from sqlalchemy.orm import Session
 from app.database.session import get_db
 from app.websocket.manager import websocket_manager
+from app.websocket.registry import USER_TYPES
+from app.services.location_stream import location_stream, parse_location
+from app.services.location_store import location_store
 from app.core.security import verify_token
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["websocket"])
 
@@ -42,21 +48,21 @@ async def websocket_orders_endpoint(websocket: WebSocket, token: str = None):
             except WebSocketDisconnect:
                 break
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     "type": "error",
                     "message": "Invalid JSON format"
-                }))
+                }, user_id)
             except Exception as e:
                 print(f"Ошибка обработки WebSocket сообщения: {e}")
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     "type": "error",
                     "message": "Internal server error"
-                }))
+                }, user_id)
     
     except WebSocketDisconnect:
         pass
     finally:
-        websocket_manager.disconnect(user_id)
+        websocket_manager.disconnect(user_id, websocket)
 
 async def handle_websocket_message(message: dict, user_id: str, user_type: str, taxipark_id: int):
     """Обработка входящих WebSocket сообщений"""
@@ -81,13 +87,12 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                 from app.models.order import Order
                 from datetime import datetime
                 
-                # Получаем сессию БД
-                from app.database.session import SessionLocal
-                db = SessionLocal()
+                # Асинхронная сессия: коммит не блокирует остальные сокеты
+                from app.database.async_session import AsyncSessionLocal
                 
-                try:
+                async with AsyncSessionLocal() as db:
                     # Находим заказ
-                    order = db.query(Order).filter(Order.id == order_id).first()
+                    order = await db.get(Order, int(order_id))
                     
                     if order:
                         # Обновляем статус
@@ -107,7 +112,10 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                         elif status == "cancelled":
                             order.cancelled_at = now
                         
-                        db.commit()
+                        await db.commit()
+                        
+                        from app.services.driver_geo_index import driver_geo_index
+                        driver_geo_index.on_order_status(order.taxipark_id, order.driver_id, status)
                         
                         # Отправляем обновление диспетчерам
                         await websocket_manager.send_to_taxipark({
@@ -133,9 +141,6 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                             "type": "error",
                             "message": f"Заказ {order_id} не найден"
                         }, user_id)
-                        
-                finally:
-                    db.close()
                     
             except Exception as e:
                 print(f"❌ Ошибка обновления статуса заказа: {e}")
@@ -145,13 +150,13 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                 }, user_id)
     
     elif message_type == "driver_location_update":
-        # Обновление местоположения водителя
-        latitude = message.get("latitude")
-        longitude = message.get("longitude")
+        # Обновление местоположения водителя: копится в потоке координат
+        driver_id = user_id[len("driver_"):] if user_id.startswith("driver_") else user_id
+        location = parse_location(message)
         
-        if latitude and longitude:
-            # TODO: Сохранить местоположение водителя
-            # TODO: Отправить обновление диспетчерам
+        if location:
+            if driver_id.isdigit():
+                location_stream.update(int(driver_id), taxipark_id, *location, message.get("timestamp"))
             
             await websocket_manager.send_personal_message({
                 "type": "location_update_confirmed",
@@ -169,11 +174,10 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                 from app.models.driver import Driver
                 from datetime import datetime
                 
-                from app.database.session import SessionLocal
-                db = SessionLocal()
+                from app.database.async_session import AsyncSessionLocal
                 
-                try:
-                    driver = db.query(Driver).filter(Driver.id == driver_id).first()
+                async with AsyncSessionLocal() as db:
+                    driver = await db.get(Driver, int(driver_id))
                     
                     if driver:
                         old_status = driver.online_status
@@ -181,7 +185,13 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                         if status == 'online':
                             driver.last_online_at = datetime.now()
                         
-                        db.commit()
+                        await db.commit()
+                        
+                        from app.services.driver_geo_index import driver_geo_index
+                        if status == 'online' and driver.is_active:
+                            driver_geo_index.set_online(driver.id, driver.taxipark_id, driver.current_latitude, driver.current_longitude)
+                        else:
+                            driver_geo_index.set_offline(driver.id)
                         
                         await websocket_manager.send_to_taxipark({
                             "type": "driver_status_changed",
@@ -205,9 +215,6 @@ async def handle_websocket_message(message: dict, user_id: str, user_type: str,
                             "type": "error",
                             "message": f"Водитель {driver_id} не найден"
                         }, user_id)
-                        
-                finally:
-                    db.close()
                     
             except Exception as e:
                 print(f"❌ Ошибка обновления статуса водителя: {e}")
@@ -256,21 +263,21 @@ async def websocket_dispatcher_endpoint(websocket: WebSocket, token: str = None)
             except WebSocketDisconnect:
                 break
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     "type": "error",
                     "message": "Invalid JSON format"
-                }))
+                }, f"dispatcher_{dispatcher_id}")
             except Exception as e:
                 print(f"Ошибка обработки WebSocket сообщения диспетчера: {e}")
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     "type": "error",
                     "message": "Internal server error"
-                }))
+                }, f"dispatcher_{dispatcher_id}")
     
     except WebSocketDisconnect:
         pass
     finally:
-        websocket_manager.disconnect(f"dispatcher_{dispatcher_id}")
+        websocket_manager.disconnect(f"dispatcher_{dispatcher_id}", websocket)
 
 async def handle_dispatcher_message(message: dict, dispatcher_id: str, taxipark_id: int):
     """Обработка сообщений от диспетчера"""
@@ -335,25 +342,19 @@ async def websocket_driver_endpoint(websocket: WebSocket, driver_id: str):
                 data = await websocket.receive_text()
                 message = json.loads(data)
                 
-                print(f"🔍 [WebSocket] Получено сообщение от водителя {driver_id}: {message}")
+                logger.debug("[WebSocket] Получено сообщение от водителя %s: %s", driver_id, message)
                 
                 # Обрабатываем различные типы сообщений
                 if message.get('type') == 'ping':
-                    await websocket.send_text(json.dumps({
+                    await websocket_manager.send_personal_message({
                         'type': 'pong',
                         'timestamp': message.get('timestamp')
-                    }))
+                    }, f"driver_{driver_id}")
                 elif message.get('type') == 'location_update':
-                    # Обрабатываем обновление местоположения
-                    await websocket_manager.send_to_taxipark(
-                        {
-                            'type': 'driver_location_update',
-                            'driver_id': driver_id,
-                            'location': message.get('location'),
-                            'timestamp': message.get('timestamp')
-                        },
-                        taxipark_id
-                    )
+                    # Координаты копятся в потоке и уходят диспетчерам пакетом раз в тик
+                    location = parse_location(message)
+                    if location:
+                        location_stream.update(int(driver_id), taxipark_id, *location, message.get('timestamp'))
                 else:
                     # Передаем обработку в общий обработчик
                     await handle_websocket_message(message, f"driver_{driver_id}", "driver", taxipark_id)
@@ -362,17 +363,17 @@ async def websocket_driver_endpoint(websocket: WebSocket, driver_id: str):
                 break
             except Exception as e:
                 print(f"❌ [WebSocket] Ошибка обработки сообщения от водителя {driver_id}: {e}")
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     'type': 'error',
                     'message': str(e)
-                }))
+                }, f"driver_{driver_id}")
                 
     except WebSocketDisconnect:
         print(f"🔍 [WebSocket] Водитель {driver_id} отключился")
     except Exception as e:
         print(f"❌ [WebSocket] Ошибка WebSocket для водителя {driver_id}: {e}")
     finally:
-        websocket_manager.disconnect(f"driver_{driver_id}")
+        websocket_manager.disconnect(f"driver_{driver_id}", websocket)
         print(f"❌ [WebSocket] Водитель {driver_id} отключен")
 
 @router.websocket("/ws/orders/client/{client_phone}")
@@ -410,19 +411,19 @@ async def websocket_client_endpoint(websocket: WebSocket, client_phone: str):
                 print(f"🔍 [WebSocket] Message from client {normalized_phone}: {message}")
                 
                 if message.get('type') == 'ping':
-                    await websocket.send_text(json.dumps({
+                    await websocket_manager.send_personal_message({
                         'type': 'pong',
                         'timestamp': message.get('timestamp')
-                    }))
+                    }, f"client_{normalized_phone}")
                 
             except WebSocketDisconnect:
                 break
             except Exception as e:
                 print(f"❌ [WebSocket] Error processing message from client {normalized_phone}: {e}")
-                await websocket.send_text(json.dumps({
+                await websocket_manager.send_personal_message({
                     'type': 'error',
                     'message': str(e)
-                }))
+                }, f"client_{normalized_phone}")
                 
     except WebSocketDisconnect:
         print(f"🔍 [WebSocket] Client {client_phone} disconnected")
@@ -431,7 +432,7 @@ async def websocket_client_endpoint(websocket: WebSocket, client_phone: str):
     finally:
         from app.api.client.routes import normalize_phone_number
         normalized_phone = normalize_phone_number(client_phone)
-        websocket_manager.disconnect(f"client_{normalized_phone}")
+        websocket_manager.disconnect(f"client_{normalized_phone}", websocket)
         print(f"❌ [WebSocket] Client {client_phone} disconnected")
 
 @router.get("/ws/status")
@@ -441,6 +442,20 @@ async def websocket_status():
         "active_connections": websocket_manager.get_connection_count(),
         "taxipark_connections": {
             str(taxipark_id): websocket_manager.get_taxipark_connections_count(taxipark_id)
-            for taxipark_id in websocket_manager.taxipark_connections.keys()
-        }
+            for taxipark_id in list(websocket_manager.taxipark_connections.keys())
+        },
+        "role_connections": {
+            user_type: websocket_manager.get_role_connections_count(user_type)
+            for user_type in USER_TYPES
+        },
+        "fanout": websocket_manager.fanout_metrics.snapshot(),
+        "delivery": websocket_manager.delivery_metrics.snapshot(),
+        "outboxes": websocket_manager.get_outbox_stats(),
+        "locations": location_stream.get_stats(),
+        "location_store": location_store.get_stats(),
+        "broker": {
+            "backend": type(websocket_manager.broker).__name__,
+            "worker_id": websocket_manager.broker.worker_id
+        },
+        "messages": websocket_manager.counters.snapshot()
     }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Проверка работы с SQLite и PostgreSQL по DATABASE_URL
+- преобразование URL в синхронный и асинхронный драйвер и настройки пула;
+- SQL, который отличается по диалектам (FOR UPDATE SKIP LOCKED, upsert
+  счетчиков), компилируется для обоих;
+- живой прогон на SQLite в памяти: создание таблиц, upsert счетчика, SMS код.
+С --postgres-url (пустая тестовая БД!) живой прогон повторяется на PostgreSQL.
+Код выхода 1, если хотя бы одна проверка не прошла.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.bootstrap import create_app_engine, engine_options, to_async_url, to_sync_url
+from app.database.session import Base
+from app.models import *  # noqa: F401,F403 - все таблицы для create_all
+from app.models.order import Order
+from app.models.order_counter import OrderStatusCounter, increment_row
+from app.models.sms_code import SmsCode
+from app.models.taxipark import TaxiPark
+from app.services.sms_code_service import SmsCodeService
+
+# (DATABASE_URL, синхронный URL, асинхронный URL)
+URLS = (
+    ("sqlite:///./taxi_admin.db", "sqlite:///./taxi_admin.db", "sqlite+aiosqlite:///./taxi_admin.db"),
+    ("sqlite+aiosqlite:///./taxi_admin.db", "sqlite:///./taxi_admin.db", "sqlite+aiosqlite:///./taxi_admin.db"),
+    ("postgresql://u:p@db/taxi", "postgresql+psycopg2://u:p@db/taxi", "postgresql+asyncpg://u:p@db/taxi"),
+    ("postgresql+asyncpg://u:p@db/taxi", "postgresql+psycopg2://u:p@db/taxi", "postgresql+asyncpg://u:p@db/taxi"),
+    ("postgresql+psycopg2://u:p@db/taxi", "postgresql+psycopg2://u:p@db/taxi", "postgresql+asyncpg://u:p@db/taxi"),
+)
+
+failed = 0
+
+
+def check(name: str, ok: bool, details: str = ""):
+    global failed
+    failed += not ok
+    print(f"{'OK  ' if ok else 'FAIL'} {name}{': ' + details if details else ''}")
+
+
+def check_urls():
+    for url, sync_url, async_url in URLS:
+        check(f"to_sync_url({url})", to_sync_url(url) == sync_url, to_sync_url(url))
+        check(f"to_async_url({url})", to_async_url(url) == async_url, to_async_url(url))
+
+    check("пул SQLite файла", engine_options("sqlite:///./taxi_admin.db").get("pool_size") == 5)
+    check("SQLite в памяти - одно соединение", engine_options("sqlite://").get("poolclass") is StaticPool)
+    check("пул PostgreSQL", engine_options("postgresql+psycopg2://u:p@db/taxi").get("pool_pre_ping") is True)
+
+
+def check_dialect_sql():
+    claim = select(Order).where(Order.id == 1).with_for_update(of=Order, skip_locked=True)
+    pg_claim = str(claim.compile(dialect=postgresql.dialect()))
+    sqlite_claim = str(claim.compile(dialect=sqlite.dialect()))
+    check("PostgreSQL: захват заказа FOR UPDATE SKIP LOCKED", "FOR UPDATE OF orders SKIP LOCKED" in pg_claim)
+    check("SQLite: захват заказа без FOR UPDATE", "FOR UPDATE" not in sqlite_claim)
+
+    table = OrderStatusCounter.__table__
+    for dialect, insert in ((postgresql, postgresql.insert), (sqlite, sqlite.insert)):
+        statement = insert(table).values(taxipark_id=1, status="received", day=date.today(), count=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.taxipark_id, table.c.status, table.c.day],
+            set_={"count": table.c.count + statement.excluded.count}
+        )
+        compiled = str(statement.compile(dialect=dialect.dialect()))
+        check(f"{dialect.dialect.name}: SQL upsert счетчика", "ON CONFLICT" in compiled and "DO UPDATE" in compiled)
+
+
+def check_live(url: str):
+    name = url.split(":", 1)[0]
+    engine = create_app_engine(to_sync_url(url))
+    try:
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            taxipark = TaxiPark(name="Проверка URL", city="Бишкек")
+            db.add(taxipark)
+            db.flush()
+
+            day = date(2026, 1, 1)
+            key = {"taxipark_id": taxipark.id, "status": "received", "day": day}
+            increment_row(db.connection(), OrderStatusCounter.__table__, key, {"count": 1})
+            increment_row(db.connection(), OrderStatusCounter.__table__, key, {"count": 2})
+            count = db.execute(select(OrderStatusCounter.count).filter_by(**key)).scalar()
+            check(f"{name}: upsert счетчика", count == 3, f"count={count}")
+
+            phone = "+996000000001"
+            db.add(SmsCode(phone_number=phone, code="1234", expires_at=datetime.now() + timedelta(minutes=5)))
+            db.commit()
+            first = SmsCodeService.consume_code(db, phone, "1234")
+            second = SmsCodeService.consume_code(db, phone, "1234")
+            check(f"{name}: SMS код принимается один раз", first and not second)
+
+            db.query(SmsCode).filter(SmsCode.phone_number == phone).delete()
+            db.query(OrderStatusCounter).filter(OrderStatusCounter.taxipark_id == taxipark.id).delete()
+            db.query(TaxiPark).filter(TaxiPark.id == taxipark.id).delete()
+            db.commit()
+            check(f"{name}: соединение", db.execute(text("SELECT 1")).scalar() == 1)
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--postgres-url", help="пустая тестовая БД PostgreSQL для живого прогона")
+    args = parser.parse_args()
+
+    check_urls()
+    check_dialect_sql()
+    check_live("sqlite://")
+    if args.postgres_url:
+        check_live(args.postgres_url)
+    else:
+        print("SKIP живой прогон на PostgreSQL: --postgres-url не задан")
+
+    print(f"Проверок с ошибкой: {failed}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
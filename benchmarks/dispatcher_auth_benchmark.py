@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов middleware авторизации диспетчера
+Сравнивает запрос с холодным кешем (JWT + запрос к БД) и с кешем принципала
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.principal_cache import dispatcher_principal_cache
+from app.core.security import create_access_token
+from app.database.session import SessionLocal
+from app.middleware.dispatcher_auth import check_dispatcher_auth
+from app.models.administrator import Administrator
+
+REQUESTS = 2000
+
+
+def make_request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/disp/api/dashboard-stats",
+        "raw_path": b"/disp/api/dashboard-stats",
+        "query_string": b"",
+        "headers": [(b"cookie", f"dispatcher_token={token}".encode())],
+        "scheme": "http",
+        "server": ("testserver", 80),
+    })
+
+
+async def call_next(request: Request) -> Response:
+    return Response(status_code=200)
+
+
+async def run(token: str, cached: bool) -> float:
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        if not cached:
+            dispatcher_principal_cache.clear()
+        response = await check_dispatcher_auth(make_request(token), call_next)
+        assert response.status_code == 200
+    return (time.perf_counter() - started) / REQUESTS
+
+
+def main():
+    db = SessionLocal()
+    try:
+        administrator = db.query(Administrator).filter(Administrator.is_active == True).first()
+    finally:
+        db.close()
+
+    if not administrator:
+        print("В БД нет активных администраторов")
+        return
+
+    token = create_access_token(
+        {"sub": str(administrator.id), "role": "dispatcher", "taxipark_id": administrator.taxipark_id},
+        expires_delta=timedelta(hours=1)
+    )
+
+    print(f"Запросов: {REQUESTS}")
+    uncached = asyncio.run(run(token, cached=False))
+    cached = asyncio.run(run(token, cached=True))
+    print(f"без кеша (JWT + БД): {uncached * 1e6:8.1f} мкс/запрос")
+    print(f"с кешем принципала:  {cached * 1e6:8.1f} мкс/запрос  (x{uncached / cached:.1f})")
+    print(f"кеш: {dispatcher_principal_cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
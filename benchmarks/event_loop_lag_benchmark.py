@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки event loop при конкурентных запросах к БД
+Сравнивает синхронную SessionLocal (блокирует цикл) и AsyncSessionLocal
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from app.database.async_session import AsyncSessionLocal, async_engine
+from app.database.session import SessionLocal
+from app.models.order import Order
+
+CONCURRENCY = 50
+QUERIES_PER_TASK = 20
+TICK_SECONDS = 0.005
+
+
+def count_query():
+    return select(Order.driver_id, Order.status, func.count()).group_by(Order.driver_id, Order.status)
+
+
+async def sync_worker():
+    for _ in range(QUERIES_PER_TASK):
+        db = SessionLocal()
+        try:
+            db.execute(count_query()).all()
+        finally:
+            db.close()
+        await asyncio.sleep(0)
+
+
+async def async_worker():
+    for _ in range(QUERIES_PER_TASK):
+        async with AsyncSessionLocal() as db:
+            (await db.execute(count_query())).all()
+
+
+async def measure(worker):
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+    monitor_task = asyncio.ensure_future(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await monitor_task
+
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "qps": CONCURRENCY * QUERIES_PER_TASK / elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] * 1000 if len(lags) > 1 else lags[0] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+        "ticks": len(lags),
+    }
+
+
+async def main():
+    print(f"Задач: {CONCURRENCY}, запросов на задачу: {QUERIES_PER_TASK}, тик монитора: {TICK_SECONDS * 1000:.0f} мс")
+    for name, worker in (("sync SessionLocal", sync_worker), ("AsyncSession", async_worker)):
+        result = await measure(worker)
+        print(
+            f"{name:18s} {result['elapsed']:6.2f} с  {result['qps']:7.0f} запр/с  "
+            f"лаг p50 {result['lag_p50_ms']:6.2f} мс  p99 {result['lag_p99_ms']:7.2f} мс  "
+            f"max {result['lag_max_ms']:7.2f} мс  тиков {result['ticks']}"
+        )
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пакетного расчета расстояний от точки подачи до водителей
+Сравнивает скалярный цикл и векторный расчет app.core.geo на 1k/10k/100k кандидатов
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import geo
+
+PICKUP = (42.8746, 74.5698)  # Бишкек
+SIZES = (1_000, 10_000, 100_000)
+RADIUS_KM = 30.0
+REPEATS = 20
+
+
+def make_candidates(count):
+    random.seed(count)
+    latitudes = [PICKUP[0] + random.uniform(-1.0, 1.0) for _ in range(count)]
+    longitudes = [PICKUP[1] + random.uniform(-1.0, 1.0) for _ in range(count)]
+    return latitudes, longitudes
+
+
+def scalar_loop(latitudes, longitudes):
+    found = []
+    for index, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        distance = geo.haversine_km(PICKUP[0], PICKUP[1], lat, lon)
+        if distance <= RADIUS_KM:
+            found.append((index, distance))
+    found.sort(key=lambda item: item[1])
+    return found
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        func(*args)
+    return (time.perf_counter() - started) / REPEATS
+
+
+def run():
+    print(f"numpy: {'да' if geo.NUMPY_AVAILABLE else 'нет (чистый Python)'}")
+    print(f"{'кандидатов':>12} {'цикл, мс':>12} {'batch, мс':>12} {'batch+bbox, мс':>16} {'водителей/с':>14}")
+
+    for size in SIZES:
+        latitudes, longitudes = make_candidates(size)
+        if geo.NUMPY_AVAILABLE:
+            import numpy as np
+            latitudes, longitudes = np.asarray(latitudes), np.asarray(longitudes)
+
+        loop_time = measure(scalar_loop, latitudes, longitudes)
+        batch_time = measure(geo.within_radius, PICKUP[0], PICKUP[1], latitudes, longitudes, RADIUS_KM, False)
+        bbox_time = measure(geo.within_radius, PICKUP[0], PICKUP[1], latitudes, longitudes, RADIUS_KM, True)
+
+        print(
+            f"{size:>12} {loop_time * 1000:>12.2f} {batch_time * 1000:>12.2f} "
+            f"{bbox_time * 1000:>16.2f} {size / bbox_time:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Проверка числа SQL запросов списков суперадмина
+Вызывает /superadmin/api/drivers и /superadmin/api/taxiparks на БД в памяти
+с малым и большим количеством таксопарков и водителей и считает выполненные
+запросы. Число запросов не должно зависеть от количества строк (нет N+1).
+Код выхода 1, если зависит или превышает MAX_QUERIES.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.session import Base, get_db
+from app.models import *  # noqa: F401,F403 - все таблицы для create_all
+from app.models.administrator import Administrator
+from app.models.driver import Driver
+from app.models.taxipark import TaxiPark
+from main import app
+
+# (таксопарков, водителей на таксопарк)
+SIZES = ((2, 3), (20, 30))
+MAX_QUERIES = 2
+REQUESTS = (
+    ("/superadmin/api/drivers", {}),
+    ("/superadmin/api/drivers", {"per_page": 50}),
+    ("/superadmin/api/drivers", {"per_page": 2, "page": 2, "sort": "taxipark_name", "order": "desc"}),
+    ("/superadmin/api/drivers", {"search": "фамилия1", "is_active": "true"}),
+    ("/superadmin/api/taxiparks", {}),
+    ("/superadmin/api/taxiparks", {"skip": 1, "limit": 5}),
+    ("/superadmin/api/taxiparks", {"city": "Бишкек", "is_active": "true", "sort": "name", "order": "desc"}),
+)
+
+
+def populate(db, taxiparks, drivers_per_taxipark):
+    for i in range(taxiparks):
+        taxipark = TaxiPark(name=f"Парк {i}", city="Бишкек")
+        db.add(taxipark)
+        db.flush()
+        db.add(Administrator(login=f"admin{i}", hashed_password="-", first_name="Дис", last_name="Петчер",
+                             taxipark_id=taxipark.id))
+        db.add_all([
+            Driver(first_name=f"Имя{j}", last_name=f"Фамилия{j}", phone_number=f"+996{i:03d}{j:06d}",
+                   car_model="Nexia", car_number=f"{i:02d}KG{j:03d}", taxipark_id=taxipark.id)
+            for j in range(drivers_per_taxipark)
+        ])
+    db.commit()
+
+
+def count_queries(taxiparks, drivers_per_taxipark):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    populate(db, taxiparks, drivers_per_taxipark)
+    db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    counts = []
+    try:
+        for path, params in REQUESTS:
+            statements.clear()
+            response = client.get(path, params=params)
+            response.raise_for_status()
+            counts.append(len(statements))
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        engine.dispose()
+    return counts
+
+
+def main():
+    results = [count_queries(*size) for size in SIZES]
+    failed = 0
+    for index, (path, params) in enumerate(REQUESTS):
+        counts = [result[index] for result in results]
+        ok = len(set(counts)) == 1 and counts[0] <= MAX_QUERIES
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {path} {params}: запросов {counts}")
+    print(f"Проверок с ошибкой: {failed}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
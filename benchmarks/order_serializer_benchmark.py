@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации заказов
+Сравнивает прежний Order.to_dict (словарь статусов на каждый вызов, order.driver
+при каждом обращении) с app/services/order_serializer.py: кэш на экземпляре и
+проекция колонок для списков. Заказы генерируются в БД в памяти.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.database.session import Base
+from app.models import *  # noqa: F401,F403 - все таблицы для create_all
+from app.models.driver import Driver
+from app.models.order import Order
+from app.models.taxipark import TaxiPark
+from app.services.order_serializer import order_rows_query, serialize_order, serialize_order_row
+
+ORDERS = 2000
+DRIVERS = 50
+# Сколько раз обработчик сериализует один заказ (смена статуса: сообщение клиенту, рассылка, ответ)
+CALLS_PER_ORDER = 3
+ROUNDS = 5
+
+
+def legacy_to_dict(order):
+    """Order.to_dict до order_serializer"""
+    status_map = {
+        'received': 'Получен',
+        'accepted': 'Принят',
+        'navigating_to_a': 'Едет к точке А',
+        'arrived_at_a': 'Прибыл в точку А',
+        'navigating_to_b': 'Едет к точке Б',
+        'completed': 'Выполнен',
+        'cancelled': 'Отменен',
+        'rejected_by_driver': 'Отклонен водителем',
+        'in_progress': 'Выполняется'
+    }
+    if not order.driver:
+        display_name = "Не назначен"
+    elif order.driver.call_sign and order.driver.call_sign.strip():
+        display_name = order.driver.call_sign.strip()
+    else:
+        display_name = f"{order.driver.first_name} {order.driver.last_name}".strip()
+    return {
+        "id": order.id,
+        "order_number": order.order_number,
+        "client_name": order.client_name,
+        "client_phone": order.client_phone,
+        "pickup_address": order.pickup_address,
+        "pickup_latitude": order.pickup_latitude,
+        "pickup_longitude": order.pickup_longitude,
+        "destination_address": order.destination_address,
+        "destination_latitude": order.destination_latitude,
+        "destination_longitude": order.destination_longitude,
+        "price": order.price,
+        "distance": order.distance,
+        "duration": order.duration,
+        "status": order.status,
+        "status_display": status_map.get(order.status, order.status),
+        "driver_id": order.driver_id,
+        "driver_name": f"{order.driver.first_name} {order.driver.last_name}" if order.driver else None,
+        "driver_display_name": display_name,
+        "driver_phone": order.driver.phone_number if order.driver else None,
+        "tariff": order.tariff,
+        "payment_method": order.payment_method,
+        "notes": order.notes,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "accepted_at": order.accepted_at.isoformat() if order.accepted_at else None,
+        "arrived_at_a": order.arrived_at_a.isoformat() if order.arrived_at_a else None,
+        "started_to_b": order.started_to_b.isoformat() if order.started_to_b else None,
+        "completed_at": order.completed_at.isoformat() if order.completed_at else None,
+        "cancelled_at": order.cancelled_at.isoformat() if order.cancelled_at else None
+    }
+
+
+def populate(db):
+    taxipark = TaxiPark(name="Бенчмарк")
+    db.add(taxipark)
+    db.flush()
+    drivers = [
+        Driver(first_name=f"Имя{i}", last_name=f"Фамилия{i}", phone_number=f"+99655500{i:04d}",
+               call_sign=f"позывной{i}" if i % 2 else None, car_model="Nexia", car_number=f"01KG{i:03d}",
+               taxipark_id=taxipark.id)
+        for i in range(DRIVERS)
+    ]
+    db.add_all(drivers)
+    db.flush()
+    statuses = ["received", "accepted", "navigating_to_a", "completed", "cancelled"]
+    started = datetime(2026, 1, 1)
+    db.add_all([
+        Order(order_number=f"B{i:06d}", client_name="Клиент", client_phone="+996700000000",
+              pickup_address="Точка А", destination_address="Точка Б", price=150.0 + i % 7,
+              status=statuses[i % len(statuses)], taxipark_id=taxipark.id,
+              driver_id=drivers[i % DRIVERS].id if i % 10 else None,
+              created_at=started + timedelta(minutes=i), accepted_at=started + timedelta(minutes=i, seconds=30))
+        for i in range(ORDERS)
+    ])
+    db.commit()
+    return taxipark.id
+
+
+def measure(name, function):
+    best = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:42s} {best * 1000:8.2f} мс  ({best / ORDERS * 1e6:6.2f} мкс/заказ)")
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    taxipark_id = populate(db)
+
+    orders = db.query(Order).options(joinedload(Order.driver)).filter(Order.taxipark_id == taxipark_id).all()
+    # Сравниваются и значения, и порядок ключей (== для dict порядок не учитывает)
+    legacy = {order.id: list(legacy_to_dict(order).items()) for order in orders}
+    mismatched = [order.id for order in orders if list(serialize_order(order).items()) != legacy[order.id]]
+    rows = order_rows_query(db).filter(Order.taxipark_id == taxipark_id).all()
+    mismatched += [row.id for row in rows if list(serialize_order_row(row).items()) != legacy[row.id]]
+    print(f"Заказов: {ORDERS}, расхождений формата (с порядком ключей): {len(mismatched)}")
+
+    def legacy_handler():
+        for order in orders:
+            for _ in range(CALLS_PER_ORDER):
+                legacy_to_dict(order)
+
+    def cached_handler():
+        for order in orders:
+            # Новая версия заказа: первый вызов собирает словарь, остальные берут кэш
+            order.__dict__.pop("_serialized", None)
+            for _ in range(CALLS_PER_ORDER):
+                serialize_order(order)
+
+    print(f"\nСериализация загруженных заказов, {CALLS_PER_ORDER} вызова на заказ:")
+    measure("прежний to_dict", legacy_handler)
+    measure("serialize_order", cached_handler)
+
+    def legacy_list():
+        db.expunge_all()
+        query = db.query(Order).options(joinedload(Order.driver)).filter(Order.taxipark_id == taxipark_id)
+        [legacy_to_dict(order) for order in query.order_by(Order.created_at.desc())]
+
+    def projected_list():
+        query = order_rows_query(db).filter(Order.taxipark_id == taxipark_id)
+        [serialize_order_row(row) for row in query.order_by(Order.created_at.desc())]
+
+    print("\nСписок заказов (запрос + сериализация):")
+    measure("ORM + joinedload + прежний to_dict", legacy_list)
+    measure("order_rows_query + serialize_order_row", projected_list)
+
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
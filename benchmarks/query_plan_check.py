@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Проверка планов горячих запросов (EXPLAIN)
+Применяет миграции alembic к копии taxi_admin.db (или к БД из --url) и проверяет,
+что каждый горячий запрос диспетчерской, баланса и фотоконтроля идет по индексу,
+а не полным сканированием таблицы. Код выхода 1, если хотя бы один запрос без индекса.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func, select, text
+
+from app.database.bootstrap import create_app_engine, is_sqlite
+from app.models.order import Order
+from app.models.photo_verification import PhotoVerification
+from app.models.transaction import DriverTransaction
+from app.services.driver_stats import driver_stats_statement
+
+SOURCE_DB = os.path.join(ROOT, "taxi_admin.db")
+
+
+def hot_queries():
+    """(название, индекс, запрос) - запросы в том виде, в каком их строят роуты"""
+    week_ago = datetime.now() - timedelta(days=7)
+    return [
+        # app/api/dispatcher/routes.py: лента заказов и счетчики по статусам
+        ("disp: заказы таксопарка, новые сверху", "ix_orders_taxipark_created",
+         select(Order).where(Order.taxipark_id == 1).order_by(Order.created_at.desc()).limit(50)),
+        ("disp: заказы таксопарка по статусу", "ix_orders_taxipark_status",
+         select(func.count()).select_from(Order).where(Order.taxipark_id == 1, Order.status == "received")),
+        # api_balance.py, api_driver_profile.py: статистика водителя
+        ("balance: выполненные заказы водителя за неделю", "ix_orders_driver_status_created",
+         select(func.count()).select_from(Order).where(
+             Order.driver_id == 1, Order.status == "completed", Order.created_at >= week_ago)),
+        ("balance: статистика водителя (order_rollups)", "ix_order_rollups_driver_bucket",
+         driver_stats_statement(1)),
+        ("balance: транзакции водителя", "ix_transactions_driver_created",
+         select(DriverTransaction).where(DriverTransaction.driver_id == 1)
+         .order_by(DriverTransaction.created_at.desc()).limit(20)),
+        # app/api/dispatcher/routes.py, api_photo_control.py: фотоконтроль
+        ("photo: ожидающие заявки таксопарка", "ix_photo_verifications_taxipark_status",
+         select(func.count()).select_from(PhotoVerification).where(
+             PhotoVerification.taxipark_id == 1, PhotoVerification.status == "pending")),
+        ("photo: последняя заявка водителя", "ix_photo_verifications_driver_created",
+         select(PhotoVerification).where(PhotoVerification.driver_id == 1)
+         .order_by(PhotoVerification.created_at.desc()).limit(1)),
+    ]
+
+
+def upgrade(url):
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    config.cmd_opts = argparse.Namespace(x=[f"url={url}"])
+    command.upgrade(config, "head")
+
+
+def explain(conn, query, sqlite):
+    compiled = query.compile(conn, compile_kwargs={"literal_binds": True})
+    if sqlite:
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+    # На маленьких таблицах PostgreSQL выбирает seq scan, даже если индекс подходит
+    conn.execute(text("SET enable_seqscan = off"))
+    return [row[0] for row in conn.execute(text(f"EXPLAIN {compiled}"))]
+
+
+def check(url):
+    upgrade(url)
+    engine = create_app_engine(url)
+    sqlite = is_sqlite(url)
+    failed = 0
+    with engine.connect() as conn:
+        for name, index, query in hot_queries():
+            plan = explain(conn, query, sqlite)
+            ok = any(index in line for line in plan)
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name:50s} {index}")
+            if not ok:
+                for line in plan:
+                    print(f"       {line}")
+    engine.dispose()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="БД для проверки (например postgresql://user@localhost/taxi_test); "
+                                      "по умолчанию копия taxi_admin.db")
+    args = parser.parse_args()
+
+    if args.url:
+        failed = check(args.url)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plan_check.db")
+            shutil.copyfile(SOURCE_DB, path)
+            failed = check(f"sqlite:///{path}")
+
+    print(f"Запросов без индекса: {failed}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конкурентной записи в SQLite
+Сравнивает прежние настройки движка (журнал DELETE, пул 20+30, pre_ping)
+с app/database/bootstrap.py (WAL, synchronous=NORMAL, busy_timeout, малый пул)
+на копии taxi_admin.db: писатели обновляют координаты, читатели считают заказы
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.database.bootstrap import create_app_engine
+
+SOURCE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "taxi_admin.db")
+WRITERS = 16
+READERS = 8
+TRANSACTIONS_PER_WRITER = 100
+READS_PER_READER = 200
+# Таймаут блокировки sqlite3 для прежней конфигурации (в bootstrap вместо него busy_timeout)
+LEGACY_LOCK_TIMEOUT = 1.0
+
+
+def legacy_engine(url):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": LEGACY_LOCK_TIMEOUT},
+        pool_size=20,
+        max_overflow=30,
+        pool_timeout=60,
+        pool_recycle=3600,
+        pool_pre_ping=True
+    )
+
+
+def copy_database(directory, journal_mode):
+    path = os.path.join(directory, f"bench_{journal_mode.lower()}.db")
+    shutil.copyfile(SOURCE_DB, path)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.close()
+    return path
+
+
+def run(engine, driver_ids):
+    stats = {"locked": 0, "other_errors": 0, "writes": 0, "reads": 0, "write_latencies": []}
+    lock = threading.Lock()
+
+    def record(key, amount=1):
+        with lock:
+            stats[key] += amount
+
+    def writer():
+        for _ in range(TRANSACTIONS_PER_WRITER):
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE drivers SET current_latitude = :lat, current_longitude = :lon WHERE id = :id"),
+                        {"lat": 42.8 + random.random() / 10, "lon": 74.6 + random.random() / 10, "id": random.choice(driver_ids)}
+                    )
+                record("writes")
+                with lock:
+                    stats["write_latencies"].append(time.perf_counter() - started)
+            except OperationalError as e:
+                record("locked" if "locked" in str(e) else "other_errors")
+
+    def reader():
+        for _ in range(READS_PER_READER):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT status, COUNT(*) FROM orders GROUP BY status")).all()
+                    conn.execute(text("SELECT id, current_latitude, current_longitude FROM drivers")).all()
+                record("reads")
+            except OperationalError as e:
+                record("locked" if "locked" in str(e) else "other_errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(WRITERS)]
+    threads += [threading.Thread(target=reader) for _ in range(READERS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def report(name, stats):
+    latencies = sorted(stats["write_latencies"]) or [0.0]
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(
+        f"{name:10s} {stats['elapsed']:6.2f} с  записей {stats['writes']:5d}  чтений {stats['reads']:5d}  "
+        f"'database is locked': {stats['locked']:4d}  прочие ошибки: {stats['other_errors']}  "
+        f"запись p99 {p99 * 1000:7.1f} мс"
+    )
+
+
+def main():
+    conn = sqlite3.connect(SOURCE_DB)
+    driver_ids = [row[0] for row in conn.execute("SELECT id FROM drivers")]
+    conn.close()
+
+    print(f"Писателей: {WRITERS} x {TRANSACTIONS_PER_WRITER}, читателей: {READERS} x {READS_PER_READER}")
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = legacy_engine(f"sqlite:///{copy_database(directory, 'DELETE')}")
+        report("прежний", run(legacy, driver_ids))
+        legacy.dispose()
+
+        tuned = create_app_engine(f"sqlite:///{copy_database(directory, 'DELETE')}")
+        report("bootstrap", run(tuned, driver_ids))
+        tuned.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Стресс-бенчмарк реестра WebSocket соединений
+Имитирует 10k сокетов в нескольких таксопарках и шторм переподключений
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.websocket.registry import ConnectionRegistry
+
+SOCKETS = 10_000
+TAXIPARKS = 5
+DISPATCHERS_PER_PARK = 20
+RECONNECT_ROUNDS = 5
+
+
+class FakeWebSocket:
+    """Заглушка сокета: реестру нужна только идентичность объекта"""
+
+
+def make_users():
+    users = []
+    for index in range(SOCKETS):
+        taxipark_id = index % TAXIPARKS + 1
+        if index < TAXIPARKS * DISPATCHERS_PER_PARK:
+            users.append((f"dispatcher_{index}", "dispatcher", taxipark_id))
+        else:
+            users.append((f"driver_{index}", "driver", taxipark_id))
+    return users
+
+
+def run():
+    registry = ConnectionRegistry()
+    users = make_users()
+
+    started = time.perf_counter()
+    sockets = {}
+    for user_id, user_type, taxipark_id in users:
+        sockets[user_id] = FakeWebSocket()
+        registry.add(user_id, sockets[user_id], user_type, taxipark_id)
+    connect_time = time.perf_counter() - started
+
+    # Шторм переподключений: каждый пользователь получает новый сокет,
+    # а закрытие старого сокета приходит уже после регистрации нового
+    started = time.perf_counter()
+    for _ in range(RECONNECT_ROUNDS):
+        random.shuffle(users)
+        for user_id, user_type, taxipark_id in users:
+            old_socket = sockets[user_id]
+            sockets[user_id] = FakeWebSocket()
+            registry.add(user_id, sockets[user_id], user_type, taxipark_id)
+            registry.remove(user_id, old_socket)
+    reconnect_time = time.perf_counter() - started
+
+    assert len(registry) == SOCKETS, "устаревшие сокеты не должны выбивать новые"
+
+    started = time.perf_counter()
+    for taxipark_id in range(1, TAXIPARKS + 1):
+        registry.get_taxipark_members(taxipark_id, "dispatcher")
+    lookup_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for user_id, _, _ in users:
+        registry.remove(user_id, sockets[user_id])
+    disconnect_time = time.perf_counter() - started
+
+    assert len(registry) == 0 and not registry.taxiparks
+
+    operations = SOCKETS * RECONNECT_ROUNDS
+    print(f"сокетов: {SOCKETS}, таксопарков: {TAXIPARKS}")
+    print(f"подключение:     {connect_time * 1000:8.2f} мс ({connect_time / SOCKETS * 1e6:.2f} мкс/сокет)")
+    print(f"переподключения: {reconnect_time * 1000:8.2f} мс ({reconnect_time / operations * 1e6:.2f} мкс/операция)")
+    print(f"выборка ролей:   {lookup_time * 1000:8.3f} мс")
+    print(f"отключение:      {disconnect_time * 1000:8.2f} мс ({disconnect_time / SOCKETS * 1e6:.2f} мкс/сокет)")
+
+
+if __name__ == "__main__":
+    run()
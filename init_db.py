@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Скрипт для инициализации базы данных
+Скрипт для инициализации базы данных: создает таблицы и применяет миграции alembic.
+Запускается при установке и после каждого обновления, до старта воркеров.
 """
 
 import sys
@@ -9,12 +10,13 @@ import os
 # Добавляем путь к проекту
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database.init_db import init_database
+from app.database.init_db import init_database, upgrade_schema
 
 if __name__ == "__main__":
     print("🚀 Инициализация базы данных...")
     try:
         init_database()
+        upgrade_schema()
         print("✅ База данных успешно инициализирована!")
     except Exception as e:
         print(f"❌ Ошибка при инициализации базы данных: {e}")
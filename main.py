@@ -10,8 +10,14 @@ from app.api.superadmin.routes import router as superadmin_router
 from app.api.dispatcher.routes import router as dispatcher_router
 from app.api.driver.routes import router as driver_router
 from app.websocket.routes import router as websocket_router
-from app.websocket.driver_websocket import driver_websocket_endpoint
+from app.websocket.manager import websocket_manager
+from app.services.location_stream import location_stream
+from app.services.location_store import location_store
+from app.services.presence_reaper import heartbeat_reaper
+from app.services.order_counters import order_counter_reconciler
 from app.middleware.dispatcher_auth import check_dispatcher_auth
+from app.middleware.access_log import AccessLogMiddleware, setup_access_logging, stop_access_logging
+from app.core.config import settings
 
 # Импортируем API endpoints для мобильного приложения
 from api import get_parks, send_sms_code, login_driver, register_driver, check_driver_status
@@ -44,21 +50,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    
-    if request.method == "POST":
-        try:
-            body_bytes = await request.body()
-            if body_bytes:
-                body_str = body_bytes.decode('utf-8')
-                print(f"🌐 Request body: {body_str}")
-        except Exception as e:
-            print(f"🌐 Error reading body: {e}")
-    
-    response = await call_next(request)
-    
-    return response
+setup_access_logging()
+app.add_middleware(
+    AccessLogMiddleware,
+    sample_json_bodies=settings.ACCESS_LOG_SAMPLE_JSON_BODIES,
+    body_sample_rate=settings.ACCESS_LOG_BODY_SAMPLE_RATE,
+    max_body_bytes=settings.ACCESS_LOG_MAX_BODY_BYTES
+)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await websocket_manager.start()
+    location_stream.start()
+    location_store.start()
+    heartbeat_reaper.start()
+    order_counter_reconciler.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await heartbeat_reaper.stop()
+    await order_counter_reconciler.stop()
+    await location_stream.stop()
+    await location_store.stop()
+    await websocket_manager.stop()
+    stop_access_logging()
 
 @app.middleware("http")
 async def dispatcher_auth_middleware(request: Request, call_next):